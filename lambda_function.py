@@ -2,36 +2,170 @@ import os
 import json
 import uuid
 import asyncio
-import nest_asyncio
 
-# Importa as classes de serviço e os novos utilitários
-from services.bedrock_sonic_service import AmazonNovaSonicService
-from utils.audio_processor import AudioProcessor
+# As dependências pesadas (SDK do Bedrock, processamento de áudio, nest_asyncio)
+# são importadas sob demanda, apenas no caminho que o evento realmente usa,
+# para manter o cold start baixo. Meça com: python -m utils.import_profiler lambda_function
 
-from dotenv import load_dotenv
-load_dotenv()
+# Carrega o .env apenas fora do Lambda (no Lambda as variáveis já vêm do ambiente)
+if not os.getenv('AWS_LAMBDA_FUNCTION_NAME'):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # Define o diretório de saída para os arquivos de áudio gerados
 OUTPUT_DIR = os.getenv('OUTPUT_DIR', '/tmp')
 
-# Aplica o nest_asyncio para lidar com loops de eventos existentes
-nest_asyncio.apply()
+def get_event_loop():
+    """
+    Retorna o loop de eventos, aplicando o nest_asyncio somente quando já existe
+    um loop em execução (ex.: notebooks), que é o único caso em que ele é necessário.
+    """
+    loop = asyncio.get_event_loop()
+    if loop.is_running():
+        import nest_asyncio
+        nest_asyncio.apply(loop)
+    return loop
+
+async def close_session(sonic_service):
+    """
+    Encerra a sessão e a tarefa de leitura de respostas, mesmo após falhas.
+
+    Args:
+        sonic_service (AmazonNovaSonicService): Sessão a encerrar.
+    """
+    await sonic_service.end_session()
+    sonic_service.is_active = False
+    if sonic_service.response and not sonic_service.response.done():
+        sonic_service.response.cancel()
+
+async def run_headless_session(sonic_service, event):
+    """
+    Executa uma conversa sem dispositivos de áudio: envia o áudio do evento e
+    monta a resposta do modelo como um .wav em memória (ou em disco, com 'save_output').
+
+    Args:
+        sonic_service (AmazonNovaSonicService): Serviço já configurado.
+        event (dict): Evento Lambda com 'audio_base64' ou 'audio_filepath' e, opcionalmente,
+            'output_format' (ver `utils.audio_codecs.OUTPUT_FORMATS`).
+
+    Returns:
+        dict: Resposta no padrão do API Gateway.
+    """
+    from utils.audio_processor import AudioProcessor
+    from utils.audio_io import AsyncIteratorSource, WavBufferSink, WavFileSink
+
+    # Formato de saída validado antes de abrir a sessão: um erro de digitação não deve
+    # custar uma conversa inteira no Sonic para só então falhar
+    output_format = event.get('output_format', 'wav')
+    if output_format != 'wav':
+        # utils.audio_codecs carrega o NumPy: só é importado quando o formato não é o padrão
+        from utils.audio_codecs import OUTPUT_FORMATS
+
+        if output_format not in OUTPUT_FORMATS:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"output_format inválido: {output_format!r} (use um de {list(OUTPUT_FORMATS)})."})
+            }
+
+    processor = AudioProcessor()
+    # Ingestão em streaming: o PCM é lido (mmap) ou decodificado (base64) chunk a chunk
+    # enquanto é enviado, em tempo real ou tão rápido quanto o stream aceitar
+    source = AsyncIteratorSource(processor.iter_input_audio(event), realtime=event.get('realtime', False))
+
+    # A resposta é montada em memória; com 'save_output' o .wav é gravado em OUTPUT_DIR
+    output_filepath = None
+    if event.get('save_output'):
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        output_filepath = os.path.join(OUTPUT_DIR, f'response_{uuid.uuid4()}.wav')
+        sink = WavFileSink(output_filepath)
+    else:
+        sink = WavBufferSink()
+
+    await sonic_service.start_session()
+    try:
+        await sonic_service.run_turn(
+            source, sink,
+            trailing_silence_ms=event.get('trailing_silence_ms', 1000),
+            response_timeout=event.get('response_timeout', 30),
+        )
+    finally:
+        await close_session(sonic_service)
+
+    return processor.prepare_success_response(
+        output_filepath, sonic_service.transcript.render(),
+        response_audio=None if output_filepath else sink.getvalue(),
+        output_format=output_format,
+    )
+
+async def stream_headless_session(sonic_service, event, audio_chunks=None):
+    """
+    Versão em streaming do modo headless: em vez de um único JSON ao final, gera
+    frames NDJSON (transcrição e áudio) assim que o modelo os produz, para um
+    adaptador de response streaming do Lambda ou um servidor HTTP chunked
+    (ver services/stream_server.py).
+
+    Args:
+        sonic_service (AmazonNovaSonicService): Serviço já configurado (de preferência
+            com jitter_target_ms=0, já que o cliente faz o próprio buffer).
+        event (dict): Evento com 'audio_base64' ou 'audio_filepath'.
+        audio_chunks: Chunks de PCM já abertos com `AudioProcessor.iter_input_audio`
+            (padrão: abertos a partir do evento).
+
+    Yields:
+        bytes: Frames no formato de `utils.response_stream`.
+    """
+    from utils.audio_processor import AudioProcessor
+    from utils.audio_io import AsyncIteratorSource
+    from utils.response_stream import stream_turn
+
+    if audio_chunks is None:
+        audio_chunks = AudioProcessor().iter_input_audio(event)
+    source = AsyncIteratorSource(audio_chunks, realtime=event.get('realtime', False))
+
+    await sonic_service.start_session()
+    try:
+        async for frame in stream_turn(
+            sonic_service, source,
+            trailing_silence_ms=event.get('trailing_silence_ms', 1000),
+            response_timeout=event.get('response_timeout', 30),
+        ):
+            yield frame
+    finally:
+        await close_session(sonic_service)
 
 def lambda_handler(event, context):
     """
     Lambda handler atualizado para streaming bidirecional.
     """
+    from utils.metrics import METRICS, SessionTimeline, print_emf
+
     print('*********** Start Sonic Lambda with Streaming ***************')
-    print(f'[DEBUG] Event: {event}')
+    # Linha do tempo da invocação: os marcos da sessão (abertura, prelúdio, primeiro áudio...)
+    # são medidos a partir daqui e exportados em EMF (métricas no CloudWatch a partir dos logs)
+    mode = 'headless' if event.get('audio_base64') or event.get('audio_filepath') else 'interactive'
+    timeline = SessionTimeline(dimensions={'Mode': mode})
+    METRICS.add_exporter(print_emf)
+    # O áudio em base64 não é impresso: só o repr copiaria o payload inteiro mais uma vez
+    log_event = {key: f'<{len(value)} caracteres>' if key == 'audio_base64' else value for key, value in event.items()}
+    print(f'[DEBUG] Event: {log_event}')
 
     # 2 - Obtem o prompt e o voice_id do evento
     system_prompt = event.get('system_prompt', 'You are a helpful assistant.')
     voice_id = event.get('voice_id', 'matthew')
 
     try:
+        from services.bedrock_sonic_service import AmazonNovaSonicService
+        from services.client_registry import CLIENT_REGISTRY
+
         # 3 - Inicializa o serviço Amazon Nova Sonic Service
-        sonic_service = AmazonNovaSonicService()
-        loop = asyncio.get_event_loop()
+        sonic_service = AmazonNovaSonicService(system_prompt=system_prompt, voice_id=voice_id, timeline=timeline)
+        loop = get_event_loop()
+
+        # 3.1 - Modo headless: o áudio vem no evento e a resposta é coletada sem PyAudio
+        if mode == 'headless':
+            response = loop.run_until_complete(run_headless_session(sonic_service, event))
+            print(f'[DEBUG] Reuso de clientes Bedrock: {CLIENT_REGISTRY.get_metrics()}')
+            return response
 
         # 4 - Inicia a sessão de streaming e as tarefas de reprodução e captura
         loop.run_until_complete(sonic_service.start_session())
@@ -43,6 +177,7 @@ def lambda_handler(event, context):
 
         # 6 - Finaliza a sessão e obtém o áudio gerado
         loop.run_until_complete(sonic_service.end_session())
+        print(f'[DEBUG] Reuso de clientes Bedrock: {CLIENT_REGISTRY.get_metrics()}')
 
         return {
             'statusCode': 200,
@@ -55,6 +190,9 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e), 'message': 'Erro ao processar o streaming.'})
         }
+    finally:
+        # Exporta também as invocações que falharam antes de encerrar a sessão
+        METRICS.record(timeline)
 
 # --- Bloco de Teste Local ---
 if __name__ == "__main__":
@@ -1,15 +1,20 @@
 import os
 import json
-import base64
 from dotenv import load_dotenv
 
+from utils.attachment_cache import ATTACHMENT_CACHE, KIND_TEXT
+
 load_dotenv()
 
 # Carrega o ID do modelo da variável de ambiente
 AMAZON_NOVA_PRO_MODEL_ID = os.getenv('AMAZON_NOVA_PRO_MODEL_ID')
 
+# Tamanho mínimo (tokens estimados, ~4 caracteres por token) de um prefixo para o Bedrock
+# criar um cache point; prefixos menores são enviados como texto comum
+MIN_CACHE_PREFIX_TOKENS = 1_000
+
 class AmazonNovaPro:
-    def __init__(self, prompt, file_path=None, max_tokens=10_000):
+    def __init__(self, prompt, file_path=None, max_tokens=10_000, cache_prefix=None):
         """
         Construtor da classe AmazonNovaPro para configurar o modelo de NLP
         
@@ -17,13 +22,18 @@ class AmazonNovaPro:
             prompt (str): Texto de entrada para o modelo
             file_path (str): Caminho do arquivo a ser carregado (opcional)
             max_tokens (int): Limite máximo de tokens (padrão: 1000)
+            cache_prefix (str): Prefixo estático do prompt, enviado antes de `prompt` e
+                marcado como cache point do Bedrock (opcional)
         """
         self.max_tokens = max_tokens
+        self.cache_prefix = cache_prefix
         self.model_id = AMAZON_NOVA_PRO_MODEL_ID or "amazon.nova-pro-v1:0"
         
         # Carrega o arquivo se fornecido
         self.file_content = None
         self.file_name = None
+        self.file_format = None
+        self.file_note = None
         if file_path:
             self.load_file(file_path)
         
@@ -33,25 +43,48 @@ class AmazonNovaPro:
         print(f"[DEBUG][NOVA_PRO] Foundation Model ID: {self.model_id}")
         print(f"[DEBUG][NOVA_PRO] Request body configurado com sucesso")
 
+    @classmethod
+    def from_template(cls, template, file_path=None, max_tokens=10_000, prompt_cache=True):
+        """
+        Cria o modelo a partir de um PromptTemplate, com o prefixo estático em cache
+
+        As instruções e o formato esperado são iguais para todas as conversas: marcados
+        como cache point, o Bedrock reaproveita esse prefixo entre análises e cobra os
+        tokens lidos do cache com desconto.
+
+        Args:
+            template (PromptTemplate): Template com `get_prompt_parts()`
+            file_path (str): Caminho do arquivo a ser carregado (opcional)
+            max_tokens (int): Limite máximo de tokens
+            prompt_cache (bool): Marca o prefixo como cache point (padrão: True)
+
+        Returns:
+            AmazonNovaPro: Modelo configurado
+        """
+        if not prompt_cache:
+            return cls(template.get_prompt_text(), file_path=file_path, max_tokens=max_tokens)
+        static_prefix, dynamic_text = template.get_prompt_parts()
+        return cls(dynamic_text, file_path=file_path, max_tokens=max_tokens, cache_prefix=static_prefix)
+
     def load_file(self, file_path):
         """
         Carrega arquivo como texto ou base64
         
+        O conteúdo codificado vem do cache de anexos do processo (utils/attachment_cache.py),
+        por hash do conteúdo: o mesmo arquivo anexado a várias análises é lido e codificado
+        uma vez. Imagens e CSVs acima do orçamento chegam reduzidos.
+        
         Args:
             file_path (str): Caminho do arquivo a ser carregado
         """
         try:
             self.file_name = os.path.basename(file_path)
+            attachment = ATTACHMENT_CACHE.load(file_path)
             
-            # Para arquivos de texto
-            if file_path.lower().endswith(('.csv', '.txt', '.json')):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.file_content = f.read()
-            
-            # Para arquivos binários (imagens, PDF, etc.)
-            else:
-                with open(file_path, 'rb') as f:
-                    self.file_content = base64.b64encode(f.read()).decode('utf-8')
+            # Texto (CSV, TXT, JSON) ou base64 (imagens, PDF, etc.)
+            self.file_content = attachment.data
+            self.file_format = attachment.format
+            self.file_note = attachment.note if attachment.kind == KIND_TEXT else None
             
             print(f"[DEBUG][NOVA_PRO] Arquivo carregado: {self.file_name}")
             
@@ -72,20 +105,28 @@ class AmazonNovaPro:
             list: Lista com o conteúdo da mensagem
         """
         content = [{"text": prompt}]
+
+        # Prefixo estático: cache point só quando atinge o mínimo do Bedrock
+        if self.cache_prefix:
+            if len(self.cache_prefix) >= MIN_CACHE_PREFIX_TOKENS * 4:
+                content = [{"text": self.cache_prefix}, {"cachePoint": {"type": "default"}}, {"text": prompt}]
+            else:
+                content = [{"text": self.cache_prefix + prompt}]
         
         # Adiciona arquivo se carregado
         if self.file_content and self.file_name:
             # Para arquivos de texto
             if isinstance(self.file_content, str) and self.file_name.lower().endswith(('.csv', '.txt', '.json')):
+                note = f" {self.file_note}" if self.file_note else ""
                 content.append({
-                    "text": f"\n\nConteúdo do arquivo {self.file_name}:\n{self.file_content}"
+                    "text": f"\n\nConteúdo do arquivo {self.file_name}{note}:\n{self.file_content}"
                 })
             
             # Para imagens
             elif self.file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
                 content.append({
                     "image": {
-                        "format": self._get_image_format(self.file_name),
+                        "format": self.file_format or self._get_image_format(self.file_name),
                         "source": {
                             "bytes": self.file_content
                         }
@@ -1,240 +1,362 @@
 import os
 import asyncio
-import base64
 import json
+import time
 import uuid
-import pyaudio
-from aws_sdk_bedrock_runtime.client import BedrockRuntimeClient, InvokeModelWithBidirectionalStreamOperationInput
+from aws_sdk_bedrock_runtime.client import InvokeModelWithBidirectionalStreamOperationInput
 from aws_sdk_bedrock_runtime.models import InvokeModelWithBidirectionalStreamInputChunk, BidirectionalInputPayloadPart
-from aws_sdk_bedrock_runtime.config import Config
-from smithy_aws_core.identity.environment import EnvironmentCredentialsResolver
+
+from services.client_registry import CLIENT_REGISTRY
+from utils.audio_io import PCMBytesSource
+from utils.audio_capture import MicrophoneSource
+from utils.adaptive_framer import AdaptiveFramer
+from utils.event_encoder import SonicEventEncoder
+from utils.jitter_buffer import JitterBuffer, OVERFLOW_BLOCK
+from utils.metrics import METRICS, SessionTimeline
+from utils.response_decoder import SonicResponseDecoder
+from utils.transcript_store import TranscriptStore, STAGE_FINAL, CHANGE_REPLACED
 
 # Audio configuration
 INPUT_SAMPLE_RATE = 16000
 OUTPUT_SAMPLE_RATE = 24000
 CHANNELS = 1
-FORMAT = pyaudio.paInt16
+SAMPLE_WIDTH = 2
 CHUNK_SIZE = 1024
+# Playback reads the jitter buffer in 20 ms frames
+PLAYBACK_FRAME_BYTES = OUTPUT_SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS * 20 // 1000
+
+DEFAULT_SYSTEM_PROMPT = "You are a friendly assistant. The user and you will engage in a spoken dialog " \
+    "exchanging the transcripts of a natural real-time conversation. Keep your responses short, " \
+    "generally two or three sentences for chatty scenarios."
 
 class AmazonNovaSonicService:
-    def __init__(self, model_id='amazon.nova-sonic-v1:0', region='us-east-1'):
+    def __init__(self, model_id='amazon.nova-sonic-v1:0', region='us-east-1', system_prompt=None, voice_id='matthew',
+                 client=None, record_events_path=None, jitter_target_ms=120, jitter_max_ms=10_000,
+                 overflow_policy=OVERFLOW_BLOCK, frame_target_ms=100, timeline=None, local_barge_in=False):
         self.model_id = model_id
         self.region = region
-        self.client = None
+        self.system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
+        self.voice_id = voice_id
+        # An injected client (e.g. services.local_sonic_stub) bypasses the shared registry
+        self.client = client
+        self.use_registry = client is None
         self.stream = None
         self.response = None
         self.is_active = False
+        # Stream open + prelude time, measured by start_session
+        self.setup_seconds = None
         self.prompt_name = str(uuid.uuid4())
         self.content_name = str(uuid.uuid4())
         self.audio_content_name = str(uuid.uuid4())
-        self.audio_queue = asyncio.Queue()
+        self.encoder = SonicEventEncoder(self.prompt_name, self.content_name, self.audio_content_name)
+        # Per-session latency marks and event/byte counters, recorded into utils.metrics.METRICS on close
+        # (pass a timeline created earlier, e.g. at handler start, to include the time before the service)
+        self.timeline = timeline or SessionTimeline()
+        self.timeline.session_id = self.timeline.session_id or self.prompt_name
+        # Bounded PCM ring buffer between the response stream and the audio sinks
+        self.audio_buffer = JitterBuffer(
+            sample_rate=OUTPUT_SAMPLE_RATE, sample_width=SAMPLE_WIDTH, channels=CHANNELS,
+            target_ms=jitter_target_ms, max_ms=jitter_max_ms, overflow=overflow_policy,
+        )
+        # Upstream audio is regrouped into frames sized from the measured send latency
+        # (frame_target_ms=None sends source chunks as-is)
+        self.framer = AdaptiveFramer(
+            sample_rate=INPUT_SAMPLE_RATE, sample_width=SAMPLE_WIDTH, channels=CHANNELS,
+            target_latency_ms=frame_target_ms,
+        ) if frame_target_ms else None
         self.role = None
-        self.display_assistant_text = False
+        self.text_stage = STAGE_FINAL
+        self.text_content_id = None
+        # Text keyed by contentId; final assistant text replaces the speculative one
+        self.transcript = TranscriptStore()
+        # Callables notified with (role, text) for every transcript line, e.g. response streaming
+        self.text_listeners = []
+        # Set by services.session_manager to interleave send/receive work fairly across sessions
+        self.scheduler = None
+        self.turn_complete = asyncio.Event()
+        # Barge-in: the model's INTERRUPTED signal always flushes pending assistant audio;
+        # local_barge_in also does it as soon as the local VAD hears the user during playback.
+        # Off by default: on open speakers the VAD hears the assistant itself and cuts it off,
+        # so only headset or echo-cancelled callers should opt in
+        self.local_barge_in = local_barge_in
+        self.assistant_audio_id = None
+        self.stale_content_ids = set()
+        self.playback_in_flight = False
+        self._stop_pending = []
+        self.interruptions = {'model': 0, 'local_vad': 0, 'flushed_bytes': 0, 'stale_dropped_bytes': 0}
+        
+        # Response events go through a dispatch table with a fast path for audioOutput
+        self.decoder = SonicResponseDecoder(record_path=record_events_path)
+        self.decoder.register('contentStart', self._on_content_start)
+        self.decoder.register('textOutput', self._on_text_output)
+        self.decoder.register('contentEnd', self._on_content_end)
+        self.decoder.register_audio(self._on_audio_output)
         
     def _initialize_client(self):
-        """Initialize the Bedrock client."""
-        config = Config(
-            endpoint_uri=f"https://bedrock-runtime.{self.region}.amazonaws.com",
-            region=self.region,
-            aws_credentials_identity_resolver=EnvironmentCredentialsResolver(),
-        )
-        self.client = BedrockRuntimeClient(config=config)
+        """Get the Bedrock client, reusing the process-level one on warm invocations."""
+        self.client = CLIENT_REGISTRY.get_client(self.region, self.model_id)
+    
+    async def _open_stream(self):
+        """Open the bidirectional stream, rebuilding the client once on connection failure."""
+        for attempt in range(2):
+            started_at = time.perf_counter()
+            try:
+                stream = await self.client.invoke_model_with_bidirectional_stream(
+                    InvokeModelWithBidirectionalStreamOperationInput(model_id=self.model_id)
+                )
+            except Exception as e:
+                if attempt or not self.use_registry:
+                    raise
+                CLIENT_REGISTRY.report_failure(self.region, self.model_id)
+                print(f"Error opening stream, rebuilding client: {e}")
+                self._initialize_client()
+                continue
+            if self.use_registry:
+                CLIENT_REGISTRY.record_stream_open(self.region, self.model_id, time.perf_counter() - started_at)
+            return stream
     
     async def send_event(self, event_json):
-        """Send an event to the stream."""
+        """Send an event (pre-encoded bytes or JSON string) to the stream."""
+        if isinstance(event_json, str):
+            event_json = event_json.encode('utf-8')
         event = InvokeModelWithBidirectionalStreamInputChunk(
-            value=BidirectionalInputPayloadPart(bytes_=event_json.encode('utf-8'))
+            value=BidirectionalInputPayloadPart(bytes_=event_json)
         )
         await self.stream.input_stream.send(event)
+        self.timeline.sent(len(event_json))
+        if self.scheduler:
+            await self.scheduler.checkpoint(self, 'send')
     
     async def start_session(self):
-        """Start a new session with Nova Sonic."""
+        """Start a new session with Nova Sonic (no-op if already started, e.g. claimed from a SessionPool)."""
+        if self.is_active:
+            return
+        started_at = time.perf_counter()
         if not self.client:
             self._initialize_client()
+        self.timeline.mark('client_init')
             
         # Initialize the stream
-        self.stream = await self.client.invoke_model_with_bidirectional_stream(
-            InvokeModelWithBidirectionalStreamOperationInput(model_id=self.model_id)
-        )
+        self.stream = await self._open_stream()
+        self.timeline.mark('stream_open')
         self.is_active = True
+        await self._send_prelude()
+        self.timeline.mark('prelude_sent')
+        self.setup_seconds = time.perf_counter() - started_at
         
+        # Start processing responses
+        self.response = asyncio.create_task(self._process_responses())
+    
+    async def _send_prelude(self):
+        """Send the setup events that precede any user input."""
         # Send session start event
-        session_start = '''
-        {
-          "event": {
-            "sessionStart": {
-              "inferenceConfiguration": {
-                "maxTokens": 1024,
-                "topP": 0.9,
-                "temperature": 0.7
-              }
-            }
-          }
-        }
-        '''
-        await self.send_event(session_start)
+        await self.send_event(self.encoder.session_start())
         
         # Send prompt start event
-        prompt_start = f'''
-        {{
-          "event": {{
-            "promptStart": {{
-              "promptName": "{self.prompt_name}",
-              "textOutputConfiguration": {{
-                "mediaType": "text/plain"
-              }},
-              "audioOutputConfiguration": {{
-                "mediaType": "audio/lpcm",
-                "sampleRateHertz": 24000,
-                "sampleSizeBits": 16,
-                "channelCount": 1,
-                "voiceId": "matthew",
-                "encoding": "base64",
-                "audioType": "SPEECH"
-              }}
-            }}
-          }}
-        }}
-        '''
-        await self.send_event(prompt_start)
+        await self.send_event(self.encoder.prompt_start(voice_id=self.voice_id, sample_rate=OUTPUT_SAMPLE_RATE))
         
         # Send system prompt
-        text_content_start = f'''
-        {{
-            "event": {{
-                "contentStart": {{
-                    "promptName": "{self.prompt_name}",
-                    "contentName": "{self.content_name}",
-                    "type": "TEXT",
-                    "interactive": false,
-                    "role": "SYSTEM",
-                    "textInputConfiguration": {{
-                        "mediaType": "text/plain"
-                    }}
-                }}
-            }}
-        }}
-        '''
-        await self.send_event(text_content_start)
-        
-        system_prompt = "You are a friendly assistant. The user and you will engage in a spoken dialog " \
-            "exchanging the transcripts of a natural real-time conversation. Keep your responses short, " \
-            "generally two or three sentences for chatty scenarios."
-        
-
-
-        text_input = f'''
-        {{
-            "event": {{
-                "textInput": {{
-                    "promptName": "{self.prompt_name}",
-                    "contentName": "{self.content_name}",
-                    "content": "{system_prompt}"
-                }}
-            }}
-        }}
-        '''
-        await self.send_event(text_input)
-        
-        text_content_end = f'''
-        {{
-            "event": {{
-                "contentEnd": {{
-                    "promptName": "{self.prompt_name}",
-                    "contentName": "{self.content_name}"
-                }}
-            }}
-        }}
-        '''
-        await self.send_event(text_content_end)
-        
-        # Start processing responses
-        self.response = asyncio.create_task(self._process_responses())
+        await self.send_event(self.encoder.text_content_start(role="SYSTEM"))
+        await self.send_event(self.encoder.text_input(self.system_prompt))
+        await self.send_event(self.encoder.text_content_end())
     
     async def start_audio_input(self):
         """Start audio input stream."""
-        audio_content_start = f'''
-        {{
-            "event": {{
-                "contentStart": {{
-                    "promptName": "{self.prompt_name}",
-                    "contentName": "{self.audio_content_name}",
-                    "type": "AUDIO",
-                    "interactive": true,
-                    "role": "USER",
-                    "audioInputConfiguration": {{
-                        "mediaType": "audio/lpcm",
-                        "sampleRateHertz": 16000,
-                        "sampleSizeBits": 16,
-                        "channelCount": 1,
-                        "audioType": "SPEECH",
-                        "encoding": "base64"
-                    }}
-                }}
-            }}
-        }}
-        '''
-        await self.send_event(audio_content_start)
+        await self.send_event(self.encoder.audio_content_start(sample_rate=INPUT_SAMPLE_RATE))
     
     async def send_audio_chunk(self, audio_bytes):
         """Send an audio chunk to the stream."""
         if not self.is_active:
             return
             
-        blob = base64.b64encode(audio_bytes)
-        audio_event = f'''
-        {{
-            "event": {{
-                "audioInput": {{
-                    "promptName": "{self.prompt_name}",
-                    "contentName": "{self.audio_content_name}",
-                    "content": "{blob.decode('utf-8')}"
-                }}
-            }}
-        }}
-        '''
-        await self.send_event(audio_event)
+        await self.send_event(self.encoder.encode_audio(audio_bytes))
+        self.timeline.mark('first_audio_sent')
+    
+    async def _send_framed(self, chunk):
+        """Send a source chunk through the adaptive framer, timing each audioInput event."""
+        if not self.framer:
+            await self.send_audio_chunk(chunk)
+            return
+        for frame in self.framer.push(chunk):
+            started_at = time.perf_counter()
+            await self.send_audio_chunk(frame)
+            self.framer.record_send(time.perf_counter() - started_at, len(frame))
     
     async def end_audio_input(self):
         """End audio input stream."""
-        audio_content_end = f'''
-        {{
-            "event": {{
-                "contentEnd": {{
-                    "promptName": "{self.prompt_name}",
-                    "contentName": "{self.audio_content_name}"
-                }}
-            }}
-        }}
-        '''
-        await self.send_event(audio_content_end)
+        await self.send_event(self.encoder.audio_content_end())
+        self.timeline.mark('audio_input_end')
+    
+    async def _flush_framer(self):
+        """Send the partial frame held by the adaptive framer, if any."""
+        remainder = self.framer.flush() if self.framer else b''
+        if remainder:
+            started_at = time.perf_counter()
+            await self.send_audio_chunk(remainder)
+            self.framer.record_send(time.perf_counter() - started_at, len(remainder))
+    
+    async def stream_audio(self, source, trailing_silence_ms=0, vad=None):
+        """Send every chunk of an audio source, framed by contentStart/contentEnd.
+
+        `trailing_silence_ms` of silence is appended after the source so the
+        model detects the end of the user turn without a live microphone.
+        An optional `vad` (utils.vad.VoiceActivityDetector) drops silent audio
+        before it is framed and sent.
+        """
+        await self.start_audio_input()
+        try:
+            async for chunk in source:
+                if not self.is_active:
+                    break
+                if vad is None:
+                    await self._send_framed(chunk)
+                    continue
+                received_at = time.perf_counter()
+                was_active = vad.active
+                parts = vad.process(chunk)
+                if self.local_barge_in and vad.active and not was_active and self.assistant_speaking():
+                    self.interrupt('local_vad', speech_onset=received_at)
+                for part in parts:
+                    await self._send_framed(part)
+                if not vad.active:
+                    # Do not hold the tail of an utterance (or a keep-alive) in the framer during silence
+                    await self._flush_framer()
+            
+            if vad is not None:
+                for part in vad.flush():
+                    await self._send_framed(part)
+
+            if trailing_silence_ms and self.is_active:
+                silence = bytes(INPUT_SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS * trailing_silence_ms // 1000)
+                async for chunk in PCMBytesSource(silence, realtime=getattr(source, 'realtime', False)):
+                    await self._send_framed(chunk)
+        finally:
+            if self.framer:
+                await self._flush_framer()
+                print(f"Audio input framing: {self.framer.stats()}")
+            if vad is not None:
+                print(f"Voice activity detection: {vad.stats()}")
+            await self.end_audio_input()
+    
+    async def run_turn(self, source, sink, trailing_silence_ms=0, response_timeout=30):
+        """Push one utterance from an audio source and collect the reply into a sink."""
+        self.turn_complete.clear()
+        drain_task = asyncio.create_task(self.drain_audio(sink))
+        try:
+            await self.stream_audio(source, trailing_silence_ms=trailing_silence_ms)
+            await asyncio.wait_for(self.turn_complete.wait(), timeout=response_timeout)
+            await drain_task
+        finally:
+            if not drain_task.done():
+                drain_task.cancel()
+                await asyncio.gather(drain_task, return_exceptions=True)
     
     async def end_session(self):
-        """End the session."""
+        """End the session and record its timeline."""
         if not self.is_active:
             return
             
-        prompt_end = f'''
-        {{
-            "event": {{
-                "promptEnd": {{
-                    "promptName": "{self.prompt_name}"
-                }}
-            }}
-        }}
-        '''
-        await self.send_event(prompt_end)
-        
-        session_end = '''
-        {
-            "event": {
-                "sessionEnd": {}
-            }
-        }
-        '''
-        await self.send_event(session_end)
-        # close the stream
-        await self.stream.input_stream.close()
+        try:
+            await self.send_event(self.encoder.prompt_end())
+            await self.send_event(self.encoder.session_end())
+            # close the stream
+            await self.stream.input_stream.close()
+        finally:
+            self.timeline.mark('session_close')
+            METRICS.record(self.timeline)
+    
+    def memory_usage(self):
+        """Approximate bytes held by this session's buffers (audio ring, framer, transcript)."""
+        usage = self.audio_buffer.stats()['allocated_bytes']
+        if self.framer:
+            usage += len(self.framer._pending)
+        return usage + self.transcript.chars
+    
+    def assistant_speaking(self):
+        """Whether assistant audio is being generated, buffered or played."""
+        return self.assistant_audio_id is not None or self.playback_in_flight or self.audio_buffer.depth_ms > 0
+    
+    def interrupt(self, reason, speech_onset=None):
+        """Barge-in: drop buffered assistant audio now and discard the rest of the interrupted content.
+
+        Playback stops after at most the frame already handed to the device. The time from
+        the interruption (and from `speech_onset`, when the local VAD saw the user start
+        speaking) to that point is recorded in the session timeline.
+        """
+        interrupted_at = time.perf_counter()
+        if self.assistant_audio_id:
+            self.stale_content_ids.add(self.assistant_audio_id)
+        self.interruptions[reason] += 1
+        self.interruptions['flushed_bytes'] += self.audio_buffer.flush()
+        self._stop_pending.append(('InterruptStopLatency', interrupted_at))
+        if speech_onset is not None:
+            self._stop_pending.append(('BargeInLatency', speech_onset))
+        if not self.playback_in_flight:
+            self._playback_stopped()
+    
+    def _playback_stopped(self):
+        """Record the pending interruption latencies once no assistant frame is playing."""
+        stopped_at = time.perf_counter()
+        for name, started_at in self._stop_pending:
+            self.timeline.record_value(name, (stopped_at - started_at) * 1000)
+        self._stop_pending.clear()
+    
+    def _on_content_start(self, content_start):
+        """Track the role and generation stage of the content being received."""
+        self.role = content_start['role']
+        if self.role == "ASSISTANT" and content_start.get('type') == 'AUDIO':
+            self.assistant_audio_id = content_start.get('contentId')
+        if content_start.get('type') == 'TEXT':
+            self.text_content_id = content_start.get('contentId')
+            # Speculative text arrives ahead of the audio, final text after it
+            self.text_stage = STAGE_FINAL
+            if 'additionalModelFields' in content_start:
+                additional_fields = json.loads(content_start['additionalModelFields'])
+                self.text_stage = additional_fields.get('generationStage', STAGE_FINAL)
+    
+    def _on_text_output(self, text_output):
+        """Print and keep the transcript text."""
+        text = text_output['content']
+        if self.role == "ASSISTANT" and text.startswith('{') and '"interrupted"' in text:
+            # Barge-in marker sent in the assistant text ahead of the INTERRUPTED contentEnd
+            if self.assistant_audio_id not in self.stale_content_ids:
+                self.interrupt('model')
+            return
+        if self.role not in ("USER", "ASSISTANT"):
+            return
+        _, change = self.transcript.add(
+            text_output.get('contentId', self.text_content_id), self.role, self.text_stage, text
+        )
+        self.timeline.mark('first_text_output')
+        if change == CHANGE_REPLACED:
+            # Final version of speculative text that was already shown
+            return
+        print(f"{self.role.title()}: {text}")
+        for listener in self.text_listeners:
+            listener(self.role, text)
+    
+    async def _on_content_end(self, content_end):
+        """Detect the end (or interruption) of the assistant's spoken turn."""
+        if self.role == "ASSISTANT" and content_end.get('type') == 'AUDIO':
+            content_id = content_end.get('contentId')
+            if content_end.get('stopReason') == 'INTERRUPTED' and content_id not in self.stale_content_ids:
+                self.interrupt('model')
+            if content_id == self.assistant_audio_id:
+                self.assistant_audio_id = None
+        if (self.role == "ASSISTANT" and content_end.get('type') == 'AUDIO'
+                and content_end.get('stopReason') == 'END_TURN'):
+            self.timeline.mark('response_end')
+            self.turn_complete.set()
+            self.audio_buffer.end_turn()
+    
+    async def _on_audio_output(self, audio_bytes, content_id):
+        """Buffer decoded response audio (blocks here when the buffer applies backpressure)."""
+        if content_id in self.stale_content_ids:
+            # In-flight audio of an interrupted generation
+            self.interruptions['stale_dropped_bytes'] += len(audio_bytes)
+            return
+        self.timeline.mark('first_audio_output')
+        await self.audio_buffer.put(audio_bytes)
     
     async def _process_responses(self):
         """Process responses from the stream."""
@@ -242,47 +364,50 @@ class AmazonNovaSonicService:
             while self.is_active:
                 output = await self.stream.await_output()
                 result = await output[1].receive()
+                if result is None:
+                    break
                 
                 if result.value and result.value.bytes_:
-                    response_data = result.value.bytes_.decode('utf-8')
-                    json_data = json.loads(response_data)
-                    
-                    if 'event' in json_data:
-                        # Handle content start event
-                        if 'contentStart' in json_data['event']:
-                            content_start = json_data['event']['contentStart'] 
-                            # set role
-                            self.role = content_start['role']
-                            # Check for speculative content
-                            if 'additionalModelFields' in content_start:
-                                additional_fields = json.loads(content_start['additionalModelFields'])
-                                if additional_fields.get('generationStage') == 'SPECULATIVE':
-                                    self.display_assistant_text = True
-                                else:
-                                    self.display_assistant_text = False
-                                
-                        # Handle text output event
-                        elif 'textOutput' in json_data['event']:
-                            text = json_data['event']['textOutput']['content']    
-                           
-                            if (self.role == "ASSISTANT" and self.display_assistant_text):
-                                print(f"Assistant: {text}")
-                            elif self.role == "USER":
-                                print(f"User: {text}")
-                        
-                        # Handle audio output
-                        elif 'audioOutput' in json_data['event']:
-                            audio_content = json_data['event']['audioOutput']['content']
-                            audio_bytes = base64.b64decode(audio_content)
-                            await self.audio_queue.put(audio_bytes)
+                    self.timeline.received(len(result.value.bytes_))
+                    await self.decoder.dispatch(result.value.bytes_)
+                if self.scheduler:
+                    await self.scheduler.checkpoint(self, 'receive')
         except Exception as e:
             print(f"Error processing responses: {e}")
+        finally:
+            # Unblock audio consumers once the response stream is over
+            self.turn_complete.set()
+            self.audio_buffer.close()
+            self.decoder.close()
+    
+    async def drain_audio(self, sink, stop_on_turn_end=True):
+        """Write response audio to a sink (no audio device needed)."""
+        try:
+            while True:
+                audio_data = await self.audio_buffer.read(PLAYBACK_FRAME_BYTES)
+                if audio_data is None:
+                    break
+                if not audio_data:
+                    # End of the assistant turn
+                    if stop_on_turn_end:
+                        break
+                    continue
+                self.playback_in_flight = True
+                try:
+                    await sink.write(audio_data)
+                finally:
+                    self.playback_in_flight = False
+                if self._stop_pending:
+                    self._playback_stopped()
+        finally:
+            await sink.close()
     
     async def play_audio(self):
         """Play audio responses."""
+        import pyaudio
         p = pyaudio.PyAudio()
         stream = p.open(
-            format=FORMAT,
+            format=pyaudio.paInt16,
             channels=CHANNELS,
             rate=OUTPUT_SAMPLE_RATE,
             output=True
@@ -290,11 +415,24 @@ class AmazonNovaSonicService:
         
         try:
             while self.is_active:
-                audio_data = await self.audio_queue.get()
-                stream.write(audio_data)
+                audio_data = await self.audio_buffer.read(PLAYBACK_FRAME_BYTES)
+                if audio_data is None:
+                    break
+                if not audio_data:
+                    continue
+                # The device write blocks for a whole frame, keep it off the event loop
+                self.playback_in_flight = True
+                try:
+                    await asyncio.to_thread(stream.write, audio_data)
+                finally:
+                    self.playback_in_flight = False
+                if self._stop_pending:
+                    self._playback_stopped()
         except Exception as e:
             print(f"Error playing audio: {e}")
         finally:
+            if self.interruptions['model'] or self.interruptions['local_vad']:
+                print(f"Barge-in: {self.interruptions}")
             stream.stop_stream()
             stream.close()
             p.terminate()
@@ -302,33 +440,23 @@ class AmazonNovaSonicService:
 
     async def capture_audio(self):
         """Capture audio from microphone and send to Nova Sonic."""
-        p = pyaudio.PyAudio()
-        stream = p.open(
-            format=FORMAT,
-            channels=CHANNELS,
-            rate=INPUT_SAMPLE_RATE,
-            input=True,
-            frames_per_buffer=CHUNK_SIZE
-        )
+        # NumPy is only needed on the microphone path, keep it out of the Lambda cold start
+        from utils.vad import VoiceActivityDetector
+        
+        # Callback mode: PyAudio reads the device on its own thread, so the event loop never blocks
+        source = MicrophoneSource(chunk_frames=CHUNK_SIZE, sample_rate=INPUT_SAMPLE_RATE, channels=CHANNELS)
+        # Silent audio is not uploaded; short keep-alives hold the stream open between utterances
+        vad = VoiceActivityDetector(sample_rate=INPUT_SAMPLE_RATE)
         
         print("Starting audio capture. Speak into your microphone...")
         print("Press Enter to stop...")
         
-        await self.start_audio_input()
-        
         try:
-            while self.is_active:
-                audio_data = stream.read(CHUNK_SIZE, exception_on_overflow=False)
-                await self.send_audio_chunk(audio_data)
-                await asyncio.sleep(0.01)
+            await self.stream_audio(source, vad=vad)
         except Exception as e:
             print(f"Error capturing audio: {e}")
         finally:
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            print("Audio capture stopped.")
-            await self.end_audio_input()
+            print(f"Audio capture stopped. {source.stats()}")
 
 async def main():
     # Create Nova Sonic client
@@ -0,0 +1,155 @@
+import time
+
+from aws_sdk_bedrock_runtime.client import BedrockRuntimeClient
+from aws_sdk_bedrock_runtime.config import Config
+from smithy_aws_core.identity.environment import EnvironmentCredentialsResolver
+
+# Tempo máximo de vida de um cliente antes de ser reconstruído (segundos)
+DEFAULT_MAX_CLIENT_AGE = 45 * 60
+
+
+def build_bedrock_client(region):
+    """
+    Cria um novo BedrockRuntimeClient com credenciais do ambiente.
+
+    Args:
+        region (str): Região AWS do endpoint do Bedrock Runtime.
+
+    Returns:
+        BedrockRuntimeClient: Cliente configurado.
+    """
+    config = Config(
+        endpoint_uri=f"https://bedrock-runtime.{region}.amazonaws.com",
+        region=region,
+        aws_credentials_identity_resolver=EnvironmentCredentialsResolver(),
+    )
+    return BedrockRuntimeClient(config=config)
+
+
+class BedrockClientRegistry:
+    """
+    Registro de clientes do Bedrock no nível do processo.
+
+    Como o container do Lambda é reaproveitado entre invocações "quentes", o cliente
+    (com sua configuração, credenciais e conexões HTTP já estabelecidas) é guardado
+    por região/modelo e reutilizado, evitando repetir o setup e o handshake TLS.
+    """
+
+    def __init__(self, factory=build_bedrock_client, max_age_seconds=DEFAULT_MAX_CLIENT_AGE):
+        """
+        Args:
+            factory (callable): Função que recebe a região e cria um cliente.
+            max_age_seconds (float): Idade máxima de um cliente antes de ser reconstruído.
+        """
+        self.factory = factory
+        self.max_age_seconds = max_age_seconds
+        self._entries = {}
+        self._metrics = {
+            'invocations': 0,
+            'reused': 0,
+            'created': 0,
+            'rebuilt': 0,
+            'failures': 0,
+            'cold_setup_seconds': 0.0,
+            'cold_opens': 0,
+            'warm_open_seconds': 0.0,
+            'warm_opens': 0,
+        }
+
+    def _is_healthy(self, entry) -> bool:
+        """Verifica se um cliente registrado ainda pode ser reutilizado."""
+        return entry['healthy'] and (time.monotonic() - entry['created_at']) < self.max_age_seconds
+
+    def get_client(self, region, model_id):
+        """
+        Retorna o cliente da região/modelo, reutilizando-o quando estiver saudável.
+
+        Args:
+            region (str): Região AWS.
+            model_id (str): ID do modelo que usará o cliente.
+
+        Returns:
+            BedrockRuntimeClient: Cliente pronto para uso.
+        """
+        key = (region, model_id)
+        self._metrics['invocations'] += 1
+
+        entry = self._entries.get(key)
+        if entry and self._is_healthy(entry):
+            self._metrics['reused'] += 1
+            entry['uses'] += 1
+            return entry['client']
+
+        if entry:
+            print(f"[DEBUG][REGISTRY] Reconstruindo cliente para {key} (expirado ou com falha).")
+            self._metrics['rebuilt'] += 1
+
+        start = time.perf_counter()
+        client = self.factory(region)
+        self._entries[key] = {
+            'client': client,
+            'created_at': time.monotonic(),
+            'build_seconds': time.perf_counter() - start,
+            'healthy': True,
+            'uses': 1,
+            'stream_opens': 0,
+        }
+        self._metrics['created'] += 1
+        return client
+
+    def record_stream_open(self, region, model_id, seconds):
+        """
+        Registra o tempo de abertura de um stream para estimar o setup economizado.
+
+        A primeira abertura de um cliente novo inclui a conexão e o handshake TLS;
+        as seguintes reaproveitam as conexões já abertas.
+
+        Args:
+            region (str): Região AWS.
+            model_id (str): ID do modelo.
+            seconds (float): Duração da abertura do stream.
+        """
+        entry = self._entries.get((region, model_id))
+        if not entry:
+            return
+
+        if entry['stream_opens'] == 0:
+            self._metrics['cold_setup_seconds'] += entry['build_seconds'] + seconds
+            self._metrics['cold_opens'] += 1
+        else:
+            self._metrics['warm_open_seconds'] += seconds
+            self._metrics['warm_opens'] += 1
+        entry['stream_opens'] += 1
+
+    def report_failure(self, region, model_id):
+        """
+        Marca o cliente como não saudável após uma falha de conexão, para que a
+        próxima chamada a `get_client` o reconstrua.
+
+        Args:
+            region (str): Região AWS.
+            model_id (str): ID do modelo.
+        """
+        entry = self._entries.get((region, model_id))
+        if entry:
+            entry['healthy'] = False
+        self._metrics['failures'] += 1
+
+    def get_metrics(self) -> dict:
+        """
+        Retorna as métricas de reuso do registro.
+
+        Returns:
+            dict: Contadores de reuso e estimativa do tempo de setup economizado.
+        """
+        metrics = dict(self._metrics)
+        avg_cold = metrics['cold_setup_seconds'] / metrics['cold_opens'] if metrics['cold_opens'] else 0.0
+        avg_warm = metrics['warm_open_seconds'] / metrics['warm_opens'] if metrics['warm_opens'] else 0.0
+
+        metrics['reuse_rate'] = metrics['reused'] / metrics['invocations'] if metrics['invocations'] else 0.0
+        metrics['setup_seconds_saved'] = max(avg_cold - avg_warm, 0.0) * metrics['warm_opens']
+        return metrics
+
+
+# Registro único do processo, compartilhado pelas invocações quentes
+CLIENT_REGISTRY = BedrockClientRegistry()
@@ -0,0 +1,225 @@
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+
+from services.nova_pro_invoker import CHARS_PER_TOKEN, estimate_tokens
+from utils.rate_limiter import TokenBucket
+
+# Seções do HTML de resumo pedidas pelo PromptTemplate
+SUMMARY_SECTIONS = ('Session Information', 'Key Topics Discussed', 'Overall Sentiment',
+                    'Action Items / Follow-ups', 'Data Visualization', 'Conversation References')
+# Tempo de vida de um prefixo no cache de prompt (renovado a cada leitura), como no Bedrock
+PROMPT_CACHE_TTL = 300
+
+
+class LocalClientError(Exception):
+    """Equivalente local do botocore ClientError (`response['Error']['Code']`)."""
+
+    def __init__(self, code, message):
+        super().__init__(f"An error occurred ({code}): {message}")
+        self.response = {'Error': {'Code': code, 'Message': message}}
+
+
+def synthetic_summary(prompt_text, output_tokens):
+    """
+    Gera um resumo HTML determinístico com as seções do PromptTemplate.
+
+    Args:
+        prompt_text (str): Texto do prompt (usado como semente).
+        output_tokens (int): Tamanho aproximado da resposta, em tokens.
+
+    Returns:
+        str: HTML do resumo.
+    """
+    rng = random.Random(len(prompt_text))
+    words = re.findall(r'[A-Za-z]{4,}', prompt_text[-4000:]) or ['conversation']
+    per_section = max(1, output_tokens // len(SUMMARY_SECTIONS))
+    parts = ['<html><head><title>Conversation Summary</title></head><body>']
+    for section in SUMMARY_SECTIONS:
+        items = []
+        budget = per_section
+        while budget > 0:
+            item = ' '.join(rng.choice(words) for _ in range(8))
+            items.append(f'<li>{item}</li>')
+            budget -= estimate_tokens(items[-1])
+        parts.append(f'<h2>{section}</h2><ul>{"".join(items)}</ul>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+class LocalEventStream:
+    """
+    Equivalente local do EventStream do boto3: itera eventos `{'chunk': {'bytes': ...}}`
+    no formato de streaming do Nova, com o ritmo de geração do stub. `close` interrompe
+    a geração (como fechar a conexão HTTP). `on_finish` é chamado uma vez, ao fim do
+    stream ou no `close`.
+    """
+
+    def __init__(self, events, delays, on_finish=None):
+        self._events = events
+        self._delays = delays
+        self._closed = threading.Event()
+        self._on_finish = on_finish
+
+    def __iter__(self):
+        try:
+            for event, delay in zip(self._events, self._delays):
+                if delay and self._closed.wait(delay):
+                    return
+                if self._closed.is_set():
+                    return
+                yield {'chunk': {'bytes': json.dumps(event).encode('utf-8')}}
+        finally:
+            self._finish()
+
+    def _finish(self):
+        on_finish, self._on_finish = self._on_finish, None
+        if on_finish:
+            on_finish()
+
+    def close(self):
+        self._closed.set()
+        self._finish()
+
+
+class LocalNovaProClient:
+    """
+    Substituto local do cliente boto3 `bedrock-runtime` para o Nova Pro.
+
+    Implementa `invoke_model` e `invoke_model_with_response_stream` com latência
+    proporcional aos tokens gerados e cotas de requisições e tokens por minuto: acima da
+    cota, responde ThrottlingException como o Bedrock. Como ele, cada chamada reserva
+    entrada + max_new_tokens e, ao terminar, devolve à cota o que não foi gerado.
+    Simula também o cache de prompt: o texto antes de um `cachePoint` é gravado no cache
+    na primeira chamada e lido (sem custo de prefill) nas seguintes, com o uso reportado
+    em `cacheReadInputTokenCount`/`cacheWriteInputTokenCount`. Seguro entre
+    threads (o invocador chama de um pool de threads).
+    """
+
+    def __init__(self, first_token_latency=0.2, output_tokens_per_s=400, output_tokens=300,
+                 rpm_limit=None, tpm_limit=None, error_rate=0.0, seed=0, prefill_tokens_per_s=0):
+        """
+        Args:
+            first_token_latency (float): Segundos até o primeiro token.
+            output_tokens_per_s (float): Vazão de geração (0 = instantânea).
+            output_tokens (int): Tokens aproximados de cada resposta.
+            rpm_limit (int): Cota de requisições por minuto (None = sem limite).
+            tpm_limit (int): Cota de tokens (entrada + max_new_tokens) por minuto.
+            error_rate (float): Fração de chamadas com ServiceUnavailableException aleatório.
+            seed (int): Semente dos erros aleatórios.
+            prefill_tokens_per_s (float): Vazão de leitura da entrada não cacheada (0 = instantânea).
+        """
+        self.first_token_latency = first_token_latency
+        self.output_tokens_per_s = output_tokens_per_s
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.prefill_tokens_per_s = prefill_tokens_per_s
+        self._prompt_cache = {}
+        self._rpm = TokenBucket.per_minute(rpm_limit) if rpm_limit else None
+        self._tpm = TokenBucket.per_minute(tpm_limit, burst_seconds=10) if tpm_limit else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def _admit(self, input_tokens, max_tokens):
+        with self._lock:
+            self.calls += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                raise LocalClientError('ServiceUnavailableException', 'Service unavailable (local).')
+        if self._rpm and not self._rpm.try_acquire(1):
+            with self._lock:
+                self.throttled += 1
+            raise LocalClientError('ThrottlingException', 'Too many requests, please wait before trying again.')
+        if self._tpm and not self._tpm.try_acquire(input_tokens + max_tokens):
+            with self._lock:
+                self.throttled += 1
+            raise LocalClientError('ThrottlingException', 'Too many tokens, please wait before trying again.')
+
+    def _settle(self, unused_tokens):
+        """Devolve à cota de tokens o max_new_tokens não gerado, ao fim da chamada (como o Bedrock)."""
+        if self._tpm and unused_tokens > 0:
+            self._tpm.adjust(-unused_tokens)
+
+    def _cached_prefix_tokens(self, blocks):
+        """Tokens antes do último cachePoint e se já estavam no cache: (tokens, hit)."""
+        points = [index for index, block in enumerate(blocks) if 'cachePoint' in block]
+        if not points:
+            return 0, False
+        prefix = ''.join(block.get('text', '') for block in blocks[:points[-1]])
+        key = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._prompt_cache.get(key, 0) > now
+            self._prompt_cache[key] = now + PROMPT_CACHE_TTL
+        return estimate_tokens(prefix), hit
+
+    def _generate(self, body):
+        request = json.loads(body)
+        blocks = [block for message in request.get('messages', []) for block in message.get('content', [])]
+        prompt_text = ''.join(block.get('text', '') for block in blocks)
+        input_tokens = estimate_tokens(prompt_text)
+        max_tokens = request.get('inferenceConfig', {}).get('max_new_tokens', 1000)
+        self._admit(input_tokens, max_tokens)
+        text = synthetic_summary(prompt_text, min(self.output_tokens, max_tokens))
+        cached_tokens, hit = self._cached_prefix_tokens(blocks)
+        usage = {
+            'inputTokens': input_tokens - cached_tokens,
+            'outputTokens': estimate_tokens(text),
+            'cacheReadInputTokenCount': cached_tokens if hit else 0,
+            'cacheWriteInputTokenCount': 0 if hit else cached_tokens,
+        }
+        usage['totalTokens'] = input_tokens + usage['outputTokens']
+        return text, usage, max_tokens - usage['outputTokens']
+
+    def invoke_model(self, modelId, body, contentType='application/json', accept='application/json'):
+        """Equivalente local de `bedrock-runtime.invoke_model` (síncrono, como o boto3)."""
+        text, usage, unused_tokens = self._generate(body)
+        # Tokens lidos do cache não passam pelo prefill
+        prefill_tokens = usage['inputTokens'] + usage['cacheWriteInputTokenCount']
+        prefill = prefill_tokens / self.prefill_tokens_per_s if self.prefill_tokens_per_s else 0
+        generation = usage['outputTokens'] / self.output_tokens_per_s if self.output_tokens_per_s else 0
+        time.sleep(self.first_token_latency + prefill + generation)
+        self._settle(unused_tokens)
+        payload = {
+            'output': {'message': {'role': 'assistant', 'content': [{'text': text}]}},
+            'stopReason': 'end_turn',
+            'usage': usage,
+        }
+        return {'body': io.BytesIO(json.dumps(payload).encode('utf-8')), 'contentType': 'application/json'}
+
+    def invoke_model_with_response_stream(self, modelId, body, contentType='application/json',
+                                          accept='application/json'):
+        """
+        Equivalente local de `bedrock-runtime.invoke_model_with_response_stream`.
+
+        Cotas e erros são verificados na chamada, como no Bedrock; o texto chega em deltas
+        de alguns tokens, no ritmo de `output_tokens_per_s`, depois da latência inicial.
+        """
+        text, usage, unused_tokens = self._generate(body)
+        prefill_tokens = usage['inputTokens'] + usage['cacheWriteInputTokenCount']
+        prefill = prefill_tokens / self.prefill_tokens_per_s if self.prefill_tokens_per_s else 0
+        # Deltas de ~4 tokens, quebrados em espaços quando possível
+        deltas = []
+        while text:
+            cut = text.find(' ', 16)
+            cut = 32 if cut == -1 or cut > 32 else cut + 1
+            deltas.append(text[:cut])
+            text = text[cut:]
+        events = [{'messageStart': {'role': 'assistant'}}]
+        events += [{'contentBlockDelta': {'delta': {'text': delta}, 'contentBlockIndex': 0}} for delta in deltas]
+        events += [{'contentBlockStop': {'contentBlockIndex': 0}}, {'messageStop': {'stopReason': 'end_turn'}},
+                   {'metadata': {'usage': usage, 'metrics': {}}}]
+        delays = [self.first_token_latency + prefill]
+        # Ritmo pela fração de tokens de cada delta (arredondar cada um para cima atrasaria o total)
+        delays += [len(delta) / CHARS_PER_TOKEN / self.output_tokens_per_s if self.output_tokens_per_s else 0
+                   for delta in deltas]
+        delays += [0, 0, 0]
+        return {'body': LocalEventStream(events, delays, lambda: self._settle(unused_tokens)),
+                'contentType': 'application/json'}
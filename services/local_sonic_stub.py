@@ -0,0 +1,240 @@
+import asyncio
+import base64
+import json
+import math
+import struct
+import uuid
+
+# Formato do áudio de saída simulado (igual ao do Nova Sonic)
+OUTPUT_SAMPLE_RATE = 24000
+SAMPLE_WIDTH = 2
+
+
+def synthetic_pcm(duration_ms, sample_rate=OUTPUT_SAMPLE_RATE, frequency=220.0, amplitude=8000):
+    """
+    Gera um tom senoidal PCM de 16 bits, usado como fala sintética.
+
+    Args:
+        duration_ms (int): Duração do áudio em milissegundos.
+        sample_rate (int): Taxa de amostragem em Hz.
+        frequency (float): Frequência do tom em Hz.
+        amplitude (int): Amplitude de pico das amostras.
+
+    Returns:
+        bytes: PCM mono de 16 bits (little-endian).
+    """
+    n_samples = sample_rate * duration_ms // 1000
+    step = 2 * math.pi * frequency / sample_rate
+    samples = (int(amplitude * math.sin(step * i)) for i in range(n_samples))
+    return struct.pack(f'<{n_samples}h', *samples)
+
+
+class _Payload:
+    """Equivalente local de BidirectionalOutputPayloadPart."""
+
+    def __init__(self, bytes_):
+        self.bytes_ = bytes_
+
+
+class _OutputChunk:
+    """Equivalente local do chunk de saída do stream (`result.value.bytes_`)."""
+
+    def __init__(self, bytes_):
+        self.value = _Payload(bytes_)
+
+
+class _OutputReceiver:
+    """Lado de saída do stream: entrega os eventos na ordem em que foram gerados."""
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    async def receive(self):
+        """Retorna o próximo evento, ou None quando o stream foi encerrado."""
+        return await self._queue.get()
+
+
+class _InputSender:
+    """Lado de entrada do stream: repassa os eventos enviados pelo serviço."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def send(self, chunk):
+        if self._stream.client.send_latency:
+            await asyncio.sleep(self._stream.client.send_latency)
+        await self._stream._handle_input(chunk.value.bytes_)
+
+    async def close(self):
+        await self._stream._close()
+
+
+class LocalSonicStream:
+    """
+    Stream bidirecional local que valida o protocolo de entrada do Nova Sonic
+    (sessionStart → promptStart → contentStart/textInput/audioInput/contentEnd →
+    promptEnd → sessionEnd) e responde com eventos roteirizados.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.events_in = 0
+        self.events_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.audio_bytes_in = 0
+        self.audio_bytes_out = 0
+        self.errors = []
+
+        self._output = asyncio.Queue()
+        self.input_stream = _InputSender(self)
+        self._receiver = _OutputReceiver(self._output)
+        self._prompt_name = None
+        self._open_contents = {}
+        self._session_started = False
+        self._responses = []
+        self._closed = False
+
+    async def await_output(self):
+        """Retorna a tupla (saída inicial, receptor), como o SDK."""
+        return None, self._receiver
+
+    def _protocol_error(self, message):
+        self.errors.append(message)
+        raise ValueError(f"[LOCAL_SONIC] Violação de protocolo: {message}")
+
+    async def _handle_input(self, payload):
+        if self._closed:
+            self._protocol_error("evento enviado após o fechamento do stream")
+
+        self.events_in += 1
+        self.bytes_in += len(payload)
+        event = json.loads(payload)['event']
+        (name, body), = event.items()
+
+        if name == 'sessionStart':
+            self._session_started = True
+        elif not self._session_started:
+            self._protocol_error(f"{name} antes de sessionStart")
+        elif name == 'promptStart':
+            self._prompt_name = body['promptName']
+        elif name in ('contentStart', 'textInput', 'audioInput', 'contentEnd', 'promptEnd'):
+            if body.get('promptName') != self._prompt_name:
+                self._protocol_error(f"{name} com promptName desconhecido")
+            self._handle_content(name, body)
+
+    def _handle_content(self, name, body):
+        content_name = body.get('contentName')
+
+        if name == 'contentStart':
+            self._open_contents[content_name] = body
+        elif name in ('textInput', 'audioInput'):
+            if content_name not in self._open_contents:
+                self._protocol_error(f"{name} sem contentStart para {content_name}")
+            if name == 'audioInput':
+                self.audio_bytes_in += len(body['content']) * 3 // 4
+        elif name == 'contentEnd':
+            content = self._open_contents.pop(content_name, None)
+            if content is None:
+                self._protocol_error(f"contentEnd sem contentStart para {content_name}")
+            # Fim da fala do usuário: dispara a resposta roteirizada
+            if content.get('type') == 'AUDIO' and content.get('role') == 'USER':
+                self._responses.append(asyncio.create_task(self._respond()))
+
+    async def _emit(self, event):
+        payload = json.dumps({'event': event}).encode('utf-8')
+        self.events_out += 1
+        self.bytes_out += len(payload)
+        await self._output.put(_OutputChunk(payload))
+
+    async def _emit_text(self, role, stage, text):
+        content_id = str(uuid.uuid4())
+        await self._emit({'contentStart': {
+            'promptName': self._prompt_name, 'contentId': content_id, 'type': 'TEXT', 'role': role,
+            'additionalModelFields': json.dumps({'generationStage': stage}),
+        }})
+        await self._emit({'textOutput': {'promptName': self._prompt_name, 'contentId': content_id,
+                                         'role': role, 'content': text}})
+        await self._emit({'contentEnd': {'promptName': self._prompt_name, 'contentId': content_id,
+                                         'type': 'TEXT', 'stopReason': 'END_TURN'}})
+
+    async def _respond(self):
+        client = self.client
+        await self._emit_text('USER', 'FINAL', client.user_transcript)
+        await self._emit_text('ASSISTANT', 'SPECULATIVE', client.assistant_text)
+
+        await asyncio.sleep(client.first_audio_latency)
+
+        content_id = str(uuid.uuid4())
+        await self._emit({'contentStart': {
+            'promptName': self._prompt_name, 'contentId': content_id, 'type': 'AUDIO', 'role': 'ASSISTANT',
+            'additionalModelFields': json.dumps({'generationStage': 'FINAL'}),
+        }})
+
+        chunk_bytes = OUTPUT_SAMPLE_RATE * SAMPLE_WIDTH * client.audio_chunk_ms // 1000
+        chunk_b64 = base64.b64encode(synthetic_pcm(client.audio_chunk_ms)).decode('utf-8')
+        n_chunks = max(1, client.response_ms // client.audio_chunk_ms)
+        chunk_interval = (client.audio_chunk_ms / 1000 / client.realtime_factor) if client.realtime_factor else 0
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        for index in range(n_chunks):
+            await self._emit({'audioOutput': {'promptName': self._prompt_name, 'contentId': content_id,
+                                              'content': chunk_b64}})
+            self.audio_bytes_out += chunk_bytes
+            delay = started_at + (index + 1) * chunk_interval - loop.time()
+            await asyncio.sleep(max(delay, 0))
+
+        await self._emit({'contentEnd': {'promptName': self._prompt_name, 'contentId': content_id,
+                                         'type': 'AUDIO', 'stopReason': 'END_TURN'}})
+        await self._emit_text('ASSISTANT', 'FINAL', client.assistant_text)
+        await self._emit({'completionEnd': {'promptName': self._prompt_name}})
+
+    async def _close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for task in self._responses:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*self._responses, return_exceptions=True)
+        await self._output.put(None)
+
+
+class LocalSonicClient:
+    """
+    Substituto local de BedrockRuntimeClient para o Nova Sonic.
+
+    Implementa apenas `invoke_model_with_bidirectional_stream`, com latência até o
+    primeiro áudio e vazão de saída configuráveis, para testes de carga sem Bedrock.
+    """
+
+    def __init__(self, first_audio_latency=0.3, response_ms=2000, audio_chunk_ms=40, realtime_factor=1.0,
+                 open_latency=0.05, send_latency=0.0, user_transcript="hello there", assistant_text="Hi! How can I help you today?"):
+        """
+        Args:
+            first_audio_latency (float): Segundos entre o fim da fala do usuário e o primeiro audioOutput.
+            response_ms (int): Duração total do áudio de resposta, em milissegundos.
+            audio_chunk_ms (int): Duração de cada evento audioOutput, em milissegundos.
+            realtime_factor (float): Velocidade de emissão em múltiplos do tempo real (0 = sem limite).
+            open_latency (float): Segundos para abrir o stream (simula conexão).
+            send_latency (float): Segundos de cada envio de evento (simula a ida ao servidor).
+            user_transcript (str): Transcrição devolvida para a fala do usuário.
+            assistant_text (str): Texto da resposta do assistente.
+        """
+        self.first_audio_latency = first_audio_latency
+        self.response_ms = response_ms
+        self.audio_chunk_ms = audio_chunk_ms
+        self.realtime_factor = realtime_factor
+        self.open_latency = open_latency
+        self.send_latency = send_latency
+        self.user_transcript = user_transcript
+        self.assistant_text = assistant_text
+        self.streams = []
+
+    async def invoke_model_with_bidirectional_stream(self, operation_input):
+        """Abre um stream local, como o método homônimo do BedrockRuntimeClient."""
+        await asyncio.sleep(self.open_latency)
+        stream = LocalSonicStream(self)
+        self.streams.append(stream)
+        return stream
@@ -0,0 +1,350 @@
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import time
+
+from services.nova_pro_invoker import NovaProInvoker, NovaProError, billed_input_tokens, estimate_request_tokens
+from utils.metrics import percentile
+from utils.rate_limiter import TokenBucket
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class BatchCheckpoint:
+    """
+    Progresso de um lote em JSON Lines: uma linha por job concluído ou com falha.
+
+    Cada resultado é gravado (e descarregado) assim que termina, então um lote
+    interrompido pode ser retomado: `load` devolve os jobs já concluídos, que o
+    executor pula. Jobs com falha são tentados de novo na próxima execução.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Arquivo .jsonl do checkpoint (criado se não existir).
+        """
+        self.path = path
+
+    def load(self) -> dict:
+        """
+        Returns:
+            dict: job_id -> registro, apenas dos jobs concluídos.
+        """
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma interrupção no meio da escrita
+                    continue
+                if record.get('status') == STATUS_DONE:
+                    done[record['job_id']] = record
+        return done
+
+    def write(self, record):
+        """Acrescenta um registro ao checkpoint."""
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class NovaProBatchExecutor:
+    """
+    Executa muitas análises do Nova Pro em paralelo, dentro das cotas do Bedrock.
+
+    - Concorrência limitada: `concurrency` workers consomem os jobs sob demanda
+      (a lista de jobs pode ser um gerador; nada é materializado de uma vez).
+    - Cotas: token buckets de requisições (RPM) e tokens (TPM) por minuto. Cada chamada
+      reserva os tokens de entrada estimados + max_new_tokens, como o Bedrock, e o
+      saldo é corrigido com o uso real da resposta.
+    - Novas tentativas com backoff exponencial e jitter completo em throttling e erros
+      transitórios.
+    - Checkpoint opcional: jobs concluídos são gravados à medida que terminam e
+      pulados quando o lote é executado de novo.
+    - Cache de prompt: jobs de PromptTemplate marcam o prefixo estático (instruções e
+      formato esperado) como cache point do Bedrock.
+    - Cache de resultados (se o invocador tiver um): jobs já respondidos voltam do
+      cache sem consumir cota.
+    """
+
+    def __init__(self, invoker=None, concurrency=8, rpm=None, tpm=None, max_retries=6, backoff_base=0.5,
+                 backoff_cap=30.0, checkpoint_path=None, max_tokens=10_000, prompt_cache=True):
+        """
+        Args:
+            invoker (NovaProInvoker): Invocador (padrão: Bedrock com `concurrency` conexões).
+            concurrency (int): Chamadas simultâneas.
+            rpm (int): Cota de requisições por minuto (None = sem limite local).
+            tpm (int): Cota de tokens por minuto (None = sem limite local).
+            max_retries (int): Novas tentativas por job em erros transitórios.
+            backoff_base (float): Espera base do backoff, em segundos.
+            backoff_cap (float): Espera máxima do backoff, em segundos.
+            checkpoint_path (str): Arquivo .jsonl de checkpoint (opcional).
+            max_tokens (int): max_new_tokens dos jobs criados a partir de prompts.
+            prompt_cache (bool): Usa cache point no prefixo estático dos PromptTemplate.
+        """
+        self.invoker = invoker or NovaProInvoker(max_workers=concurrency)
+        self.concurrency = concurrency
+        self.requests_bucket = TokenBucket.per_minute(rpm) if rpm else None
+        self.tokens_bucket = TokenBucket.per_minute(tpm, burst_seconds=10) if tpm else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.checkpoint = BatchCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.max_tokens = max_tokens
+        self.prompt_cache = prompt_cache
+        self._reset_stats()
+
+    def fork(self):
+        """
+        Executor para um lote independente que divide as cotas com este.
+
+        Usa o mesmo invocador, os mesmos token buckets e a mesma configuração, mas tem
+        estatísticas próprias e nenhum checkpoint: chamadas internas (ex.: os trechos do
+        MapReduceSummarizer) não são puladas por um checkpoint de outro lote nem zeram
+        o relatório de um `run` concorrente.
+
+        Returns:
+            NovaProBatchExecutor: Novo executor.
+        """
+        forked = copy.copy(self)
+        forked.checkpoint = None
+        forked._reset_stats()
+        return forked
+
+    def _reset_stats(self):
+        self._stats = {'submitted': 0, 'done': 0, 'cached': 0, 'skipped': 0, 'failed': 0, 'retries': 0,
+                       'throttled': 0, 'saved_latency_s': 0.0,
+                       'input_tokens': 0, 'output_tokens': 0, 'cache_read_tokens': 0, 'cache_write_tokens': 0,
+                       'billed_input_tokens': 0.0}
+        self._latencies = []
+        self._errors = {}
+
+    def _to_model(self, payload):
+        """Aceita um AmazonNovaPro, um PromptTemplate (ou objeto com get_prompt_text) ou um texto."""
+        if hasattr(payload, 'get_request_body'):
+            return payload
+        from models.amazon_nova_pro import AmazonNovaPro
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            # O construtor imprime o model id a cada instância; em lote isso só polui o log
+            if hasattr(payload, 'get_prompt_parts'):
+                return AmazonNovaPro.from_template(payload, max_tokens=self.max_tokens,
+                                                   prompt_cache=self.prompt_cache)
+            prompt = payload.get_prompt_text() if hasattr(payload, 'get_prompt_text') else payload
+            return AmazonNovaPro(prompt, max_tokens=self.max_tokens)
+
+    def _backoff(self, attempt):
+        """Backoff exponencial com jitter completo."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _run_job(self, job_id, payload):
+        model = self._to_model(payload)
+        # Resultado já gravado no cache de resultados: não consome cota nem chama o modelo
+        cached = await self.invoker.lookup(model)
+        if cached is not None:
+            return {**cached, 'attempts': 0}
+        reserved = estimate_request_tokens(model.get_request_body()) + model.max_tokens
+        for attempt in range(self.max_retries + 1):
+            if self.requests_bucket:
+                await self.requests_bucket.acquire(1)
+            if self.tokens_bucket:
+                await self.tokens_bucket.acquire(reserved)
+            try:
+                result = await self.invoker.invoke(model, use_cache=False)
+            except NovaProError as e:
+                if self.tokens_bucket:
+                    # Chamada recusada não consome a cota de tokens
+                    self.tokens_bucket.adjust(-reserved)
+                if e.throttled:
+                    self._stats['throttled'] += 1
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                self._stats['retries'] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if self.tokens_bucket:
+                used = (result['input_tokens'] + result['cache_read_tokens'] + result['cache_write_tokens']
+                        + result['output_tokens'])
+                self.tokens_bucket.adjust(used - reserved)
+            return {**result, 'attempts': attempt + 1}
+
+    async def _worker(self, jobs, on_result):
+        for job_id, payload in jobs:
+            try:
+                result = await self._run_job(job_id, payload)
+            except Exception as e:
+                self._stats['failed'] += 1
+                code = getattr(e, 'code', type(e).__name__)
+                self._errors[code] = self._errors.get(code, 0) + 1
+                record = {'job_id': job_id, 'status': STATUS_FAILED, 'error': str(e)}
+            else:
+                self._stats['done'] += 1
+                if result['cached']:
+                    # Servido pelo cache de resultados: nada cobrado, latência fora dos percentis
+                    self._stats['cached'] += 1
+                    self._stats['saved_latency_s'] += result['saved_latency_s']
+                else:
+                    self._stats['input_tokens'] += result['input_tokens']
+                    self._stats['output_tokens'] += result['output_tokens']
+                    self._stats['cache_read_tokens'] += result['cache_read_tokens']
+                    self._stats['cache_write_tokens'] += result['cache_write_tokens']
+                    self._stats['billed_input_tokens'] += billed_input_tokens(result)
+                    self._latencies.append(result['latency_s'])
+                record = {'job_id': job_id, 'status': STATUS_DONE, 'finished_at': time.time(), **result}
+            if self.checkpoint:
+                self.checkpoint.write(record)
+            if on_result:
+                on_result(record)
+
+    async def run(self, jobs, on_result=None) -> dict:
+        """
+        Executa um lote.
+
+        Args:
+            jobs (iterable): Pares (job_id, AmazonNovaPro | PromptTemplate | str).
+            on_result (callable): Chamado com o registro de cada job (concluído ou com falha).
+
+        Returns:
+            dict: Contagens, vazão (jobs/min, tokens/s), latências p50/p99 e erros.
+        """
+        self._reset_stats()
+        finished = self.checkpoint.load() if self.checkpoint else {}
+
+        def pending():
+            for job_id, payload in jobs:
+                if job_id in finished:
+                    self._stats['skipped'] += 1
+                    continue
+                self._stats['submitted'] += 1
+                yield job_id, payload
+
+        # Um único iterador compartilhado: cada worker pega o próximo job quando fica livre
+        shared = pending()
+        started_at = time.perf_counter()
+        await asyncio.gather(*(self._worker(shared, on_result) for _ in range(self.concurrency)))
+        return self.report(time.perf_counter() - started_at)
+
+    def report(self, elapsed) -> dict:
+        """Relatório do último lote executado em `elapsed` segundos."""
+        tokens = self._stats['input_tokens'] + self._stats['output_tokens']
+        return {
+            **self._stats,
+            'elapsed_s': elapsed,
+            'jobs_per_min': self._stats['done'] / elapsed * 60 if elapsed else 0.0,
+            'tokens_per_s': tokens / elapsed if elapsed else 0.0,
+            'output_tokens_per_s': self._stats['output_tokens'] / elapsed if elapsed else 0.0,
+            'latency_p50_s': percentile(self._latencies, 50),
+            'latency_p99_s': percentile(self._latencies, 99),
+            'rate_limit_wait_s': sum(bucket.waited_seconds for bucket in (self.requests_bucket, self.tokens_bucket)
+                                     if bucket),
+            'errors': dict(self._errors),
+        }
+
+
+def conversation_jobs(input_dir, expected_output_format_path):
+    """
+    Gera um job por transcrição (.txt) de um diretório, com o PromptTemplate de resumo.
+
+    Args:
+        input_dir (str): Diretório com uma conversa por arquivo.
+        expected_output_format_path (str): Formato HTML esperado (ver PromptTemplate).
+
+    Yields:
+        tuple: (nome do arquivo, PromptTemplate).
+    """
+    from template.prompt_template import PromptTemplate
+
+    for name in sorted(os.listdir(input_dir)):
+        if not name.endswith('.txt'):
+            continue
+        with open(os.path.join(input_dir, name), 'r', encoding='utf-8') as file:
+            conversation = file.read()
+        yield name, PromptTemplate(conversation, expected_output_format_path, session_id=name)
+
+
+def synthetic_jobs(count, turns=40):
+    """Conversas sintéticas para testar o lote contra o stub local."""
+    rng = random.Random(0)
+    topics = ['billing', 'delivery', 'refund', 'password', 'upgrade', 'cancellation', 'invoice', 'warranty']
+    for index in range(count):
+        lines = []
+        for turn in range(turns):
+            topic = rng.choice(topics)
+            lines.append(f"User: I have a question about my {topic}, it has been a problem for {turn} days.")
+            lines.append(f"Assistant: I understand the {topic} issue, let me check that for you right away.")
+        yield f'conversation-{index:05d}', '\n'.join(lines)
+
+
+def main(argv=None):
+    """
+    Análise em lote de conversas com o Nova Pro.
+
+    Exemplos:
+        python -m services.nova_pro_batch --local --jobs 200 --concurrency 16 --rpm 600 --tpm 400000
+        python -m services.nova_pro_batch --input-dir conversas/ --output-dir resumos/ --checkpoint lote.jsonl
+    """
+    parser = argparse.ArgumentParser(description="Executor em lote de análises do Amazon Nova Pro.")
+    parser.add_argument('--input-dir', help="Diretório com uma transcrição .txt por conversa.")
+    parser.add_argument('--format-path', default='expected_output_format.html',
+                        help="Formato HTML esperado do resumo (PromptTemplate).")
+    parser.add_argument('--output-dir', help="Onde gravar o HTML de cada resumo (opcional).")
+    parser.add_argument('--checkpoint', help="Arquivo .jsonl de progresso; jobs concluídos são pulados.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Chamadas simultâneas.")
+    parser.add_argument('--rpm', type=int, help="Cota de requisições por minuto.")
+    parser.add_argument('--tpm', type=int, help="Cota de tokens por minuto.")
+    parser.add_argument('--max-tokens', type=int, default=2000, help="max_new_tokens de cada análise.")
+    parser.add_argument('--local', action='store_true', help="Usa o stub local em vez do Bedrock.")
+    parser.add_argument('--jobs', type=int, default=100, help="Conversas sintéticas (sem --input-dir).")
+    parser.add_argument('--no-prompt-cache', action='store_true', help="Desliga o cache point do prefixo estático.")
+    parser.add_argument('--result-cache', help="Arquivo SQLite do cache de resultados (reexecuções não chamam o modelo).")
+    args = parser.parse_args(argv)
+
+    client = None
+    if args.local:
+        from services.local_nova_pro_stub import LocalNovaProClient
+        # O stub aplica cotas um pouco maiores que as locais, como uma conta com folga
+        client = LocalNovaProClient(rpm_limit=args.rpm and int(args.rpm * 1.1),
+                                    tpm_limit=args.tpm and int(args.tpm * 1.1))
+    result_cache = None
+    if args.result_cache:
+        from services.nova_pro_result_cache import NovaProResultCache
+        result_cache = NovaProResultCache(args.result_cache)
+    invoker = NovaProInvoker(client=client, max_workers=args.concurrency, result_cache=result_cache)
+
+    if args.input_dir:
+        jobs = conversation_jobs(args.input_dir, args.format_path)
+    else:
+        jobs = synthetic_jobs(args.jobs)
+
+    def on_result(record):
+        if args.output_dir and record['status'] == STATUS_DONE:
+            os.makedirs(args.output_dir, exist_ok=True)
+            name = os.path.splitext(record['job_id'])[0] + '.html'
+            with open(os.path.join(args.output_dir, name), 'w', encoding='utf-8') as file:
+                file.write(record['text'])
+
+    executor = NovaProBatchExecutor(invoker, concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm,
+                                    checkpoint_path=args.checkpoint, max_tokens=args.max_tokens,
+                                    prompt_cache=not args.no_prompt_cache)
+    report = asyncio.run(executor.run(jobs, on_result))
+    executor.invoker.close()
+
+    print("--- Lote do Nova Pro ---")
+    for key, value in report.items():
+        print(f"  {key:<22} {value:.2f}" if isinstance(value, float) else f"  {key:<22} {value}")
+    if invoker.result_cache:
+        print(f"--- Cache de resultados ---\n  {invoker.result_cache.get_metrics()}")
+        invoker.result_cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import asyncio
+import concurrent.futures
+import json
+import os
+import time
+
+# Erros do Bedrock que valem nova tentativa (com backoff)
+THROTTLING_CODES = {'ThrottlingException', 'TooManyRequestsException'}
+RETRYABLE_CODES = THROTTLING_CODES | {
+    'ServiceUnavailableException', 'InternalServerException', 'ModelNotReadyException', 'ModelTimeoutException',
+}
+# Aproximação de caracteres por token para texto em inglês/português (estimativa de cota)
+CHARS_PER_TOKEN = 4
+# Preço relativo dos tokens lidos do cache de prompt do Nova (desconto de 75%); a escrita
+# no cache não tem custo adicional
+CACHE_READ_PRICE_RATIO = 0.25
+
+
+def estimate_tokens(text) -> int:
+    """
+    Estima a quantidade de tokens de um texto (sem tokenizador, ~4 caracteres por token).
+
+    Args:
+        text (str): Texto.
+
+    Returns:
+        int: Tokens estimados (mínimo 1 para texto não vazio).
+    """
+    return -(-len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def estimate_request_tokens(request_body) -> int:
+    """
+    Estima os tokens de entrada de um corpo de requisição do Nova Pro (blocos de texto).
+
+    Args:
+        request_body (dict): Corpo gerado por `AmazonNovaPro.get_request_body`.
+
+    Returns:
+        int: Tokens de entrada estimados.
+    """
+    blocks = [block for message in request_body.get('messages', []) for block in message.get('content', [])]
+    blocks += request_body.get('system', [])
+    return sum(estimate_tokens(block.get('text', '')) for block in blocks)
+
+
+def billed_input_tokens(result) -> float:
+    """
+    Tokens de entrada equivalentes cobrados, considerando o desconto do cache de prompt.
+
+    Args:
+        result (dict): Resultado de `NovaProInvoker.invoke`.
+
+    Returns:
+        float: Tokens de entrada sem cache + escritos no cache + lidos do cache com desconto.
+    """
+    return (result['input_tokens'] + result['cache_write_tokens']
+            + result['cache_read_tokens'] * CACHE_READ_PRICE_RATIO)
+
+
+class NovaProError(Exception):
+    """Falha de uma chamada ao Nova Pro, com o código de erro do Bedrock."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.retryable = code in RETRYABLE_CODES
+        self.throttled = code in THROTTLING_CODES
+
+
+def as_nova_pro_error(error):
+    """
+    Converte um erro do cliente (botocore ClientError ou equivalente) em NovaProError.
+
+    Returns:
+        NovaProError | None: Erro convertido, ou None se não for um erro do Bedrock.
+    """
+    details = getattr(error, 'response', {}).get('Error', {})
+    if details.get('Code'):
+        return NovaProError(details['Code'], details.get('Message', str(error)))
+    return None
+
+
+def build_bedrock_runtime_client(region, max_connections):
+    """
+    Cria o cliente boto3 do Bedrock Runtime para o Nova Pro.
+
+    As novas tentativas do botocore ficam desligadas: quem chama (ex.: o executor de
+    lotes) aplica o próprio backoff e os limites de cota.
+    """
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client('bedrock-runtime', region_name=region, config=Config(
+        max_pool_connections=max_connections, retries={'max_attempts': 1, 'mode': 'standard'},
+        read_timeout=300,
+    ))
+
+
+class NovaProInvoker:
+    """
+    Ponto único de invocação do Amazon Nova Pro (InvokeModel).
+
+    O cliente boto3 é síncrono: cada chamada roda em um pool de threads próprio, do
+    tamanho da concorrência desejada, para não bloquear o loop de eventos. Um cliente
+    injetado (ex.: services/local_nova_pro_stub.py) substitui o Bedrock em testes.
+
+    Com um cache de resultados (services/nova_pro_result_cache.py), requisições idênticas
+    a uma já respondida devolvem o resultado gravado, sem chamar o modelo.
+    """
+
+    def __init__(self, client=None, region=None, max_workers=16, result_cache=None):
+        """
+        Args:
+            client: Cliente com `invoke_model` (boto3 ou stub); padrão: bedrock-runtime.
+            region (str): Região AWS (padrão: AWS_REGION ou us-east-1).
+            max_workers (int): Chamadas simultâneas (threads e conexões HTTP).
+            result_cache (NovaProResultCache): Cache de resultados; padrão: o arquivo SQLite
+                de NOVA_PRO_RESULT_CACHE_PATH, se definido.
+        """
+        self.region = region or os.getenv('AWS_REGION', 'us-east-1')
+        self.client = client or build_bedrock_runtime_client(self.region, max_workers)
+        if result_cache is None and os.getenv('NOVA_PRO_RESULT_CACHE_PATH'):
+            from services.nova_pro_result_cache import NovaProResultCache
+
+            result_cache = NovaProResultCache(os.getenv('NOVA_PRO_RESULT_CACHE_PATH'))
+        self.result_cache = result_cache
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix='nova-pro')
+
+    def _invoke_sync(self, model_id, body):
+        try:
+            response = self.client.invoke_model(
+                modelId=model_id, body=body, contentType='application/json', accept='application/json',
+            )
+        except Exception as e:
+            error = as_nova_pro_error(e)
+            if error:
+                raise error from e
+            raise
+        return json.loads(response['body'].read())
+
+    def _lookup_sync(self, key):
+        started_at = time.perf_counter()
+        result = self.result_cache.get(key)
+        if result is not None:
+            result = {**result, 'cached': True, 'saved_latency_s': result['latency_s'],
+                      'latency_s': time.perf_counter() - started_at}
+        return result
+
+    async def lookup(self, model):
+        """
+        Consulta o cache de resultados, sem chamar o modelo.
+
+        Args:
+            model (AmazonNovaPro): Modelo com a requisição já configurada.
+
+        Returns:
+            dict | None: Resultado gravado (com `cached=True` e `saved_latency_s`), ou None.
+        """
+        if self.result_cache is None:
+            return None
+        from services.nova_pro_result_cache import request_key
+
+        key = request_key(model.get_model_id(), model.get_request_body())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._lookup_sync, key)
+
+    async def invoke(self, model, use_cache=True) -> dict:
+        """
+        Executa uma requisição do Nova Pro.
+
+        Args:
+            model (AmazonNovaPro): Modelo com a requisição já configurada.
+            use_cache (bool): Consulta o cache de resultados antes de chamar o modelo
+                (False quando quem chama já consultou com `lookup`). O resultado é gravado
+                no cache de qualquer forma.
+
+        Returns:
+            dict: Texto gerado, motivo de parada, tokens de entrada/saída (e de cache,
+                quando presentes), latência em segundos e se veio do cache de resultados.
+
+        Raises:
+            NovaProError: Se o Bedrock recusar a chamada.
+        """
+        request_body = model.get_request_body()
+        model_id = model.get_model_id()
+        loop = asyncio.get_running_loop()
+        key = None
+        if self.result_cache is not None:
+            from services.nova_pro_result_cache import request_key
+
+            key = request_key(model_id, request_body)
+            if use_cache:
+                cached = await loop.run_in_executor(self._executor, self._lookup_sync, key)
+                if cached is not None:
+                    return cached
+
+        body = json.dumps(request_body)
+        started_at = time.perf_counter()
+        payload = await loop.run_in_executor(self._executor, self._invoke_sync, model_id, body)
+        result = self.parse_response(payload, time.perf_counter() - started_at)
+        if key is not None:
+            await loop.run_in_executor(self._executor, self.result_cache.put, key, model_id, result)
+        return {**result, 'cached': False}
+
+    @staticmethod
+    def parse_response(payload, latency_s) -> dict:
+        """Extrai texto e uso de tokens da resposta do InvokeModel do Nova."""
+        message = payload.get('output', {}).get('message', {})
+        usage = payload.get('usage', {})
+        return {
+            'text': ''.join(block.get('text', '') for block in message.get('content', [])),
+            'stop_reason': payload.get('stopReason'),
+            'input_tokens': usage.get('inputTokens', 0),
+            'output_tokens': usage.get('outputTokens', 0),
+            'cache_read_tokens': usage.get('cacheReadInputTokenCount', 0),
+            'cache_write_tokens': usage.get('cacheWriteInputTokenCount', 0),
+            'latency_s': latency_s,
+        }
+
+    def close(self):
+        """Libera o pool de threads."""
+        self._executor.shutdown(wait=False)
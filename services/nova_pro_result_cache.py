@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Motivos de parada cujas respostas podem ser reaproveitadas: só respostas completas
+# (filtradas, sem motivo conhecido ou truncadas em max_tokens não são gravadas)
+CACHEABLE_STOP_REASONS = {'end_turn', 'stop_sequence'}
+# Resposta cortada pelo limite de saída: só gravada com `cache_truncated=True`
+TRUNCATED_STOP_REASON = 'max_tokens'
+# Intervalo mínimo entre atualizações de last_access de uma mesma entrada (leitores não viram escritores)
+TOUCH_INTERVAL_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    model_id TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    latency_s REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total_bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM results));
+"""
+
+
+def request_key(model_id, request_body) -> str:
+    """
+    Chave de cache de uma requisição do Nova Pro.
+
+    Hash do model id, da configuração de inferência e do conteúdo (prompt compilado e
+    anexos). Blocos de texto consecutivos são unidos e os `cachePoint` descartados, então
+    o prompt com ou sem cache de prompt (prefixo + sufixo ou texto único do
+    `PromptTemplate.get_prompt_text()`) gera a mesma chave.
+
+    Args:
+        model_id (str): ID do modelo.
+        request_body (dict): Corpo gerado por `AmazonNovaPro.get_request_body`.
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal.
+    """
+    messages = []
+    for message in request_body.get('messages', []):
+        content = []
+        for block in message.get('content', []):
+            if 'cachePoint' in block:
+                continue
+            if 'text' in block and content and 'text' in content[-1]:
+                content[-1] = {'text': content[-1]['text'] + block['text']}
+            else:
+                content.append(block)
+        messages.append({'role': message.get('role'), 'content': content})
+    normalized = {key: value for key, value in request_body.items() if key != 'messages'}
+    normalized['messages'] = messages
+    digest = hashlib.sha256(model_id.encode('utf-8') + b'\0')
+    digest.update(json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class NovaProResultCache:
+    """
+    Cache persistente (SQLite) dos resultados do Nova Pro.
+
+    Reexecutar o pipeline de resumo sobre conversas que não mudaram devolve o resultado
+    gravado em vez de pagar a chamada de novo. O banco usa WAL, então vários leitores
+    (threads do invocador ou outros processos) consultam em paralelo com um escritor.
+
+    - TTL: entradas mais antigas que `ttl_seconds` são ignoradas e removidas.
+    - Limite de tamanho: acima de `max_bytes`, as entradas menos acessadas são
+      despejadas até 90% do limite. O total fica numa tabela de uma linha, atualizada
+      na mesma transação de cada gravação, então vale entre processos sem somar a tabela.
+    - Métricas: taxa de acerto, latência e tokens economizados.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_bytes=256 * 1024 * 1024, cache_truncated=False):
+        """
+        Args:
+            path (str): Arquivo SQLite (criado se não existir).
+            ttl_seconds (float): Validade de um resultado, em segundos (None = sem validade).
+            max_bytes (int): Tamanho máximo somado dos resultados gravados.
+            cache_truncated (bool): Grava também respostas cortadas em max_tokens.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.cacheable_stop_reasons = set(CACHEABLE_STOP_REASONS)
+        if cache_truncated:
+            self.cacheable_stop_reasons.add(TRUNCATED_STOP_REASON)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Conexões de todas as threads (fechadas juntas em `close`) e geração atual
+        self._connections = []
+        self._generation = 0
+        self._metrics = {'lookups': 0, 'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0,
+                         'latency_saved_s': 0.0, 'input_tokens_saved': 0, 'output_tokens_saved': 0}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        self._total_bytes = connection.execute('SELECT total_bytes FROM stats').fetchone()[0]
+
+    def _connection(self):
+        """Conexão da thread atual (cada conexão SQLite é usada por uma única thread)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.generation != self._generation:
+            # check_same_thread=False só para que `close` possa fechá-la de outra thread
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with self._lock:
+                self._connections.append(connection)
+                self._local.generation = self._generation
+            self._local.connection = connection
+        return connection
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._metrics[name] += delta
+
+    def get(self, key):
+        """
+        Busca um resultado gravado.
+
+        Args:
+            key (str): Chave de `request_key`.
+
+        Returns:
+            dict | None: Resultado (como devolvido pelo invocador), ou None se ausente/expirado.
+        """
+        connection = self._connection()
+        row = connection.execute('SELECT result, latency_s, created_at, last_access FROM results WHERE key = ?',
+                                 (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._count(lookups=1, misses=1)
+            return None
+        result, latency_s, created_at, last_access = row
+        if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+            self._count(lookups=1, misses=1, expired=1)
+            return None
+        if now - last_access > TOUCH_INTERVAL_SECONDS:
+            connection.execute('UPDATE results SET last_access = ? WHERE key = ?', (now, key))
+        result = json.loads(result)
+        self._count(lookups=1, hits=1, latency_saved_s=latency_s, input_tokens_saved=result.get('input_tokens', 0),
+                    output_tokens_saved=result.get('output_tokens', 0))
+        return result
+
+    def put(self, key, model_id, result):
+        """
+        Grava um resultado (se o motivo de parada permitir reaproveitá-lo).
+
+        O total de bytes é atualizado na mesma transação e relido da tabela `stats`:
+        inclui as gravações de outros processos sem percorrer a tabela de resultados.
+
+        Args:
+            key (str): Chave de `request_key`.
+            model_id (str): ID do modelo.
+            result (dict): Resultado do invocador.
+        """
+        if result.get('stop_reason') not in self.cacheable_stop_reasons:
+            return
+        payload = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            previous = connection.execute('SELECT size FROM results WHERE key = ?', (key,)).fetchone()
+            connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (key, model_id, payload, len(payload), result.get('latency_s', 0.0), now, now))
+            connection.execute('UPDATE stats SET total_bytes = total_bytes + ?',
+                               (len(payload) - (previous[0] if previous else 0),))
+            total = connection.execute('SELECT total_bytes FROM stats').fetchone()[0]
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        with self._lock:
+            self._metrics['stores'] += 1
+            self._total_bytes = total
+        if total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove entradas expiradas e as menos acessadas até 90% de `max_bytes`.
+
+        Só aqui a tabela é somada: o total em `stats` é recalculado, corrigindo qualquer
+        desvio (ex.: gravações de uma versão anterior do cache).
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            removed = 0
+            if self.ttl_seconds is not None:
+                removed += connection.execute('DELETE FROM results WHERE created_at < ?',
+                                              (time.time() - self.ttl_seconds,)).rowcount
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            target = self.max_bytes * 0.9
+            if total > target:
+                victims = []
+                for key, size in connection.execute('SELECT key, size FROM results ORDER BY last_access'):
+                    if total <= target:
+                        break
+                    victims.append((key,))
+                    total -= size
+                connection.executemany('DELETE FROM results WHERE key = ?', victims)
+                removed += len(victims)
+            connection.execute('UPDATE stats SET total_bytes = ?', (total,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        with self._lock:
+            self._total_bytes = total
+            self._metrics['evictions'] += removed
+
+    def get_metrics(self) -> dict:
+        """
+        Returns:
+            dict: Consultas, acertos, gravações, despejos, taxa de acerto e economia.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['bytes'] = self._total_bytes
+        metrics['hit_rate'] = metrics['hits'] / metrics['lookups'] if metrics['lookups'] else 0.0
+        return metrics
+
+    def close(self):
+        """Fecha as conexões de todas as threads (um uso posterior abre conexões novas)."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for connection in connections:
+            connection.close()
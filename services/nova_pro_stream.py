@@ -0,0 +1,310 @@
+import asyncio
+import html
+import json
+import re
+import threading
+import time
+
+from services.nova_pro_invoker import NovaProError, NovaProInvoker, as_nova_pro_error, estimate_tokens
+from utils.metrics import percentile
+
+# Início de uma seção do resumo e fim do documento HTML
+SECTION_START = re.compile(r'<h2[\s>]', re.I)
+DOCUMENT_END = re.compile(r'</body\s*>|</html\s*>', re.I)
+SECTION_TITLE = re.compile(r'<h2[^>]*>(.*?)</h2\s*>', re.I | re.S)
+
+EVENT_TEXT = 'text'
+EVENT_SECTION = 'section'
+EVENT_DONE = 'done'
+
+
+class HtmlSectionParser:
+    """
+    Separa, à medida que o texto chega, as seções `<h2>` completas do resumo HTML.
+
+    Uma seção está completa quando começa a próxima `<h2>` ou o documento termina
+    (`</body>`/`</html>`); a busca retoma de onde parou, sem reler o texto já visto.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._section_start = None
+        self._scan_from = 0
+
+    def _complete(self, end):
+        section = self._buffer[self._section_start:end]
+        match = SECTION_TITLE.search(section)
+        # Mesmo tratamento de parse_sections (nova_pro_summarizer): 'Q&amp;A' vira 'Q&A'
+        title = html.unescape(re.sub(r'<[^>]+>', '', match.group(1))).strip() if match else ''
+        return {'title': title, 'html': section.strip()}
+
+    def feed(self, text) -> list:
+        """
+        Acrescenta um delta de texto.
+
+        Args:
+            text (str): Delta recebido do modelo.
+
+        Returns:
+            list: Seções completadas por este delta ({'title', 'html'}).
+        """
+        self._buffer += text
+        sections = []
+        while True:
+            start = self._scan_from
+            next_section = SECTION_START.search(self._buffer, start)
+            end = DOCUMENT_END.search(self._buffer, start)
+            if end and (next_section is None or end.start() < next_section.start()):
+                if self._section_start is not None:
+                    sections.append(self._complete(end.start()))
+                    self._section_start = None
+                self._scan_from = end.end()
+                continue
+            if next_section is None:
+                # Mantém os últimos caracteres: uma tag pode ter chegado partida entre deltas
+                self._scan_from = max(self._scan_from, len(self._buffer) - 8)
+                return sections
+            if self._section_start is not None:
+                sections.append(self._complete(next_section.start()))
+            self._section_start = next_section.start()
+            self._scan_from = next_section.end()
+
+    def close(self) -> list:
+        """
+        Fecha o texto (fim do stream) e devolve a última seção, se ficou aberta.
+
+        Returns:
+            list: Seção pendente, ou lista vazia.
+        """
+        if self._section_start is None:
+            return []
+        section = self._complete(len(self._buffer))
+        self._section_start = None
+        return [section]
+
+    @property
+    def text(self) -> str:
+        """Texto recebido até agora."""
+        return self._buffer
+
+
+class NovaProStreamInvoker(NovaProInvoker):
+    """
+    Invocação do Nova Pro em streaming (InvokeModelWithResponseStream).
+
+    O stream do boto3 é síncrono: uma thread do pool lê os eventos e os repassa ao loop
+    por uma fila. `stream` devolve, conforme chegam, os deltas de texto e as seções HTML
+    completas, e por fim um evento com o uso de tokens, o tempo até o primeiro token
+    (TTFT) e a vazão de geração. O consumidor pode parar quando as seções de que precisa
+    chegaram (`until_sections`, ou simplesmente saindo do `async for`): o stream é
+    fechado e o modelo para de gerar.
+    """
+
+    def __init__(self, client=None, region=None, max_workers=16, result_cache=None):
+        """
+        Args:
+            client: Cliente com `invoke_model_with_response_stream` (boto3 ou stub).
+            region (str): Região AWS (padrão: AWS_REGION ou us-east-1).
+            max_workers (int): Streams simultâneos.
+            result_cache (NovaProResultCache): Cache de resultados (ver NovaProInvoker).
+        """
+        super().__init__(client=client, region=region, max_workers=max_workers, result_cache=result_cache)
+        self._ttfts = []
+        self._rates = []
+        self.streams = 0
+        self.cancelled = 0
+
+    def _stream_sync(self, model_id, body, emit, stop):
+        """Lê o stream na thread do pool e repassa cada evento do Nova (dict) com `emit`."""
+        try:
+            response = self.client.invoke_model_with_response_stream(
+                modelId=model_id, body=body, contentType='application/json', accept='application/json',
+            )
+            events = response['body']
+            try:
+                for event in events:
+                    if stop.is_set():
+                        break
+                    chunk = event.get('chunk')
+                    if chunk is None:
+                        # Exceção no meio do stream (ex.: throttlingException, modelStreamErrorException)
+                        name, details = next(iter(event.items()))
+                        raise NovaProError(name[:1].upper() + name[1:], details.get('message', ''))
+                    emit(json.loads(chunk['bytes']))
+            finally:
+                close = getattr(events, 'close', None)
+                if close:
+                    close()
+        except Exception as e:
+            emit(as_nova_pro_error(e) or e)
+        finally:
+            emit(None)
+
+    def _replay(self, result):
+        """Eventos de um resultado do cache: o texto inteiro de uma vez e as seções."""
+        parser = HtmlSectionParser()
+        events = [{'type': EVENT_TEXT, 'text': result['text']}]
+        sections = parser.feed(result['text']) + parser.close()
+        events += [{'type': EVENT_SECTION, **section} for section in sections]
+        events.append({'type': EVENT_DONE, **result, 'ttft_s': result['latency_s'], 'tokens_per_s': 0.0,
+                       'cancelled': False})
+        return events
+
+    async def stream(self, model, until_sections=None):
+        """
+        Executa uma requisição em streaming.
+
+        Args:
+            model (AmazonNovaPro): Modelo com a requisição já configurada.
+            until_sections (iterable): Títulos de seções (ex.: 'Key Topics Discussed'); quando
+                todas chegam, o stream é cancelado. Padrão: ler até o fim.
+
+        Yields:
+            dict: `{'type': 'text', 'text'}` a cada delta, `{'type': 'section', 'title',
+                'html'}` a cada seção completa e, por último, `{'type': 'done', ...}` com
+                texto, motivo de parada, tokens, latência, `ttft_s`, `tokens_per_s`,
+                `cancelled` e `cached`.
+
+        Raises:
+            NovaProError: Se o Bedrock recusar a chamada ou interromper o stream.
+        """
+        wanted = set(until_sections or ())
+        request_body = model.get_request_body()
+        model_id = model.get_model_id()
+        loop = asyncio.get_running_loop()
+        key = None
+        if self.result_cache is not None:
+            from services.nova_pro_result_cache import request_key
+
+            key = request_key(model_id, request_body)
+            cached = await loop.run_in_executor(self._executor, self._lookup_sync, key)
+            if cached is not None:
+                for event in self._replay(cached):
+                    yield event
+                return
+
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def emit(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        parser = HtmlSectionParser()
+        started_at = time.perf_counter()
+        first_token_at = None
+        stop_reason, usage = None, {}
+        seen = set()
+        cancelled = False
+        self.streams += 1
+        loop.run_in_executor(self._executor, self._stream_sync, model_id, json.dumps(request_body), emit, stop)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if 'contentBlockDelta' in item:
+                    text = item['contentBlockDelta'].get('delta', {}).get('text', '')
+                    if not text:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    yield {'type': EVENT_TEXT, 'text': text}
+                    for section in parser.feed(text):
+                        seen.add(section['title'])
+                        yield {'type': EVENT_SECTION, **section}
+                    if wanted and wanted <= seen:
+                        cancelled = True
+                        break
+                elif 'messageStop' in item:
+                    stop_reason = item['messageStop'].get('stopReason')
+                elif 'metadata' in item:
+                    usage = item['metadata'].get('usage', {})
+                elif 'amazon-bedrock-invocationMetrics' in item and not usage:
+                    metrics = item['amazon-bedrock-invocationMetrics']
+                    usage = {'inputTokens': metrics.get('inputTokenCount', 0),
+                             'outputTokens': metrics.get('outputTokenCount', 0)}
+        finally:
+            # Consumidor saiu (cancelamento, erro ou break): fecha o stream na thread
+            stop.set()
+
+        if not cancelled:
+            for section in parser.close():
+                yield {'type': EVENT_SECTION, **section}
+        finished_at = time.perf_counter()
+        output_tokens = usage.get('outputTokens') or estimate_tokens(parser.text)
+        generation = finished_at - first_token_at if first_token_at else 0.0
+        result = {
+            'text': parser.text,
+            'stop_reason': stop_reason,
+            'input_tokens': usage.get('inputTokens', 0),
+            'output_tokens': output_tokens,
+            'cache_read_tokens': usage.get('cacheReadInputTokenCount', 0),
+            'cache_write_tokens': usage.get('cacheWriteInputTokenCount', 0),
+            'latency_s': finished_at - started_at,
+        }
+        if key is not None and not cancelled:
+            await loop.run_in_executor(self._executor, self.result_cache.put, key, model_id, result)
+        ttft = first_token_at - started_at if first_token_at else None
+        tokens_per_s = output_tokens / generation if generation else 0.0
+        if ttft is not None:
+            self._ttfts.append(ttft)
+            self._rates.append(tokens_per_s)
+        self.cancelled += cancelled
+        yield {'type': EVENT_DONE, **result, 'ttft_s': ttft, 'tokens_per_s': tokens_per_s,
+               'cancelled': cancelled, 'cached': False}
+
+    def stream_report(self) -> dict:
+        """
+        Returns:
+            dict: Streams, cancelados, TTFT p50/p99 e vazão de geração p50 (tokens/s).
+        """
+        return {
+            'streams': self.streams,
+            'cancelled': self.cancelled,
+            'ttft_p50_s': percentile(self._ttfts, 50),
+            'ttft_p99_s': percentile(self._ttfts, 99),
+            'tokens_per_s_p50': percentile(self._rates, 50),
+        }
+
+
+async def _benchmark():
+    import contextlib
+    import io
+
+    from models.amazon_nova_pro import AmazonNovaPro
+    from services.local_nova_pro_stub import LocalNovaProClient
+
+    client = LocalNovaProClient(first_token_latency=0.4, output_tokens_per_s=150, output_tokens=900)
+    invoker = NovaProStreamInvoker(client=client, max_workers=4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = AmazonNovaPro("User: my refund is late\nAssistant: I will check the refund status today.",
+                              max_tokens=2_000)
+
+    start = time.perf_counter()
+    await invoker.invoke(model)
+    print(f"Sem streaming: resumo completo em {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    async for event in invoker.stream(model):
+        if event['type'] == EVENT_SECTION:
+            print(f"  {(time.perf_counter() - start) * 1000:6.0f} ms  seção: {event['title']}")
+        elif event['type'] == EVENT_DONE:
+            print(f"Streaming: TTFT {event['ttft_s'] * 1000:.0f} ms, {event['tokens_per_s']:.0f} tokens/s, "
+                  f"total {event['latency_s'] * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    needed = {'Key Topics Discussed', 'Overall Sentiment'}
+    async for event in invoker.stream(model, until_sections=needed):
+        if event['type'] == EVENT_DONE:
+            print(f"Cancelado após {sorted(needed)}: {(time.perf_counter() - start) * 1000:.0f} ms, "
+                  f"{event['output_tokens']} tokens gerados (cancelled={event['cancelled']})")
+    await asyncio.sleep(0.1)
+    print(f"Chamadas ao stub: {client.calls}; {invoker.stream_report()}")
+    invoker.close()
+
+
+if __name__ == "__main__":
+    # Benchmark contra o stub local: python -m services.nova_pro_stream
+    asyncio.run(_benchmark())
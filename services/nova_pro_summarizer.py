@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import time
+
+from services.nova_pro_batch import NovaProBatchExecutor, STATUS_DONE
+from services.nova_pro_invoker import estimate_tokens
+
+# Início de um turno na transcrição: rótulo curto seguido de ":" (ex.: "User:", "Assistant:")
+TURN_START = re.compile(r'^[ \t]*[A-Za-z][\w .\-]{0,30}:\s')
+# Seções que o map extrai de cada trecho e o reduce combina no HTML final
+PARTIAL_SECTIONS = ('Key Topics Discussed', 'Overall Sentiment', 'Action Items / Follow-ups')
+# Versão dos prompts de map: muda a chave do cache quando as instruções mudam
+MAP_PROMPT_VERSION = 'map-v1'
+
+
+def split_turns(conversation_data) -> list:
+    """
+    Divide uma transcrição em turnos (linhas de continuação ficam no turno anterior).
+
+    Args:
+        conversation_data (str | TranscriptStore): Texto da conversa ou transcrição da sessão.
+
+    Returns:
+        list: Turnos, cada um com suas linhas (sem a quebra final).
+    """
+    if hasattr(conversation_data, 'render'):
+        conversation_data = conversation_data.render()
+    turns = []
+    for line in conversation_data.splitlines():
+        if not line.strip():
+            continue
+        if turns and not TURN_START.match(line):
+            turns[-1] += '\n' + line
+        else:
+            turns.append(line)
+    return turns
+
+
+def _split_oversized(turn, max_tokens):
+    """Quebra um turno maior que o limite em pedaços, preferindo fronteiras de palavra."""
+    max_chars = max_tokens * 4
+    pieces = []
+    while estimate_tokens(turn) > max_tokens:
+        cut = turn.rfind(' ', 0, max_chars)
+        cut = cut if cut > max_chars // 2 else max_chars
+        pieces.append(turn[:cut])
+        turn = turn[cut:].lstrip()
+    if turn:
+        pieces.append(turn)
+    return pieces
+
+
+def chunk_turns(turns, max_tokens) -> list:
+    """
+    Agrupa turnos consecutivos em trechos de até `max_tokens` tokens estimados.
+
+    O empacotamento é guloso a partir do início: acrescentar turnos ao fim da conversa
+    só altera o último trecho (e cria novos), então os anteriores mantêm o mesmo
+    conteúdo e o mesmo hash no cache. Um turno sozinho maior que o limite é quebrado.
+
+    Args:
+        turns (list): Turnos, como devolvidos por `split_turns`.
+        max_tokens (int): Tokens máximos por trecho.
+
+    Returns:
+        list: Trechos de texto.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for turn in turns:
+        for piece in _split_oversized(turn, max_tokens):
+            tokens = estimate_tokens(piece) + 1
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append('\n'.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def parse_sections(summary_html) -> dict:
+    """
+    Extrai os itens (<li>) de cada seção parcial de um resumo HTML.
+
+    Args:
+        summary_html (str): Resposta do modelo, com <h2>Seção</h2> seguido de <ul>.
+
+    Returns:
+        dict: título da seção -> lista de itens em texto puro.
+    """
+    sections = {title: [] for title in PARTIAL_SECTIONS}
+    parts = re.split(r'<h[23][^>]*>(.*?)</h[23]>', summary_html, flags=re.S | re.I)
+    # re.split com grupo: [antes, título1, corpo1, título2, corpo2, ...]
+    for title, body in zip(parts[1::2], parts[2::2]):
+        title = html.unescape(re.sub(r'<[^>]+>', '', title)).strip()
+        if title not in sections:
+            continue
+        for item in re.findall(r'<li[^>]*>(.*?)</li>', body, flags=re.S | re.I):
+            text = html.unescape(re.sub(r'<[^>]+>', '', item)).strip()
+            if text:
+                sections[title].append(text)
+    return sections
+
+
+def format_sections(sections) -> str:
+    """Serializa as seções parciais em texto compacto (entrada do reduce)."""
+    lines = []
+    for title in PARTIAL_SECTIONS:
+        lines.append(f"{title}:")
+        lines.extend(f"- {item}" for item in sections.get(title, []))
+    return '\n'.join(lines)
+
+
+def build_map_prompt(chunk, index, total, session_id) -> str:
+    """
+    Prompt de map: análise parcial de um trecho, só com as seções que o reduce combina.
+
+    Args:
+        chunk (str): Trecho da conversa (ou resumos parciais, num reduce em níveis).
+        index (int): Posição do trecho (a partir de 1).
+        total (int): Quantidade de trechos.
+        session_id (str): Identificador da sessão.
+
+    Returns:
+        str: Prompt do trecho.
+    """
+    sections = '\n'.join(f"               - {title}" for title in PARTIAL_SECTIONS)
+    return f"""
+        <context>
+            You are an expert analyst. You are reading part {index} of {total} of a long conversation.
+            Other parts are analyzed separately and your notes will be merged with theirs later.
+        </context>
+
+        <instructions>
+            1. Analyze ONLY the conversation data below; do not assume anything about the other parts.
+            2. Output HTML with exactly these <h2> sections, in this order, each with a <ul> of short <li> items:
+{sections}
+            3. Keep every item self-contained and factual, so it can be merged with other notes.
+            4. Do not include any other sections, <img> tags or commentary.
+        </instructions>
+
+        <session_identifier>
+            {session_id}
+        </session_identifier>
+
+        <conversation_data>
+            {chunk}
+        </conversation_data>
+        """
+
+
+class ChunkSummaryCache:
+    """
+    Cache dos resumos parciais, por hash do trecho (e do modelo e prompt de map).
+
+    Em memória, com persistência opcional em JSON Lines: reprocessar uma conversa que
+    ganhou turnos novos só chama o modelo para os trechos que mudaram.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): Arquivo .jsonl para persistir o cache entre execuções (opcional).
+        """
+        self.path = path
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._entries[record['key']] = record['sections']
+
+    @staticmethod
+    def key(model_id, max_tokens, text) -> str:
+        """Chave do trecho: hash do modelo, limite de saída, versão do prompt e conteúdo."""
+        digest = hashlib.sha256(f"{MAP_PROMPT_VERSION}\0{model_id}\0{max_tokens}\0".encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Returns:
+            dict | None: Seções do trecho, se já resumido.
+        """
+        sections = self._entries.get(key)
+        if sections is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return sections
+
+    def put(self, key, sections):
+        """Guarda (e persiste) as seções de um trecho."""
+        self._entries[key] = sections
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps({'key': key, 'sections': sections}, ensure_ascii=False) + '\n')
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MapReduceSummarizer:
+    """
+    Resumo de conversas maiores que a janela de contexto (ou caras demais numa chamada só).
+
+    - Split: a conversa é dividida em turnos e agrupada em trechos de até `chunk_tokens`.
+    - Map: cada trecho é resumido em paralelo (NovaProBatchExecutor: concorrência, cotas
+      e retries) nas seções Key Topics, Sentiment e Action Items.
+    - Reduce: as notas parciais são combinadas no HTML final do PromptTemplate; se não
+      couberem em `reduce_tokens`, são agrupadas e resumidas de novo (reduce em níveis).
+
+    Os resumos parciais ficam em cache por hash do trecho, então acrescentar turnos a uma
+    conversa já resumida só reprocessa o fim. Conversas que cabem em um trecho seguem
+    direto para uma única chamada com o PromptTemplate, como antes.
+    """
+
+    def __init__(self, executor=None, expected_output_format_path='expected_output_format.html',
+                 chunk_tokens=12_000, reduce_tokens=24_000, map_max_tokens=1_500, max_tokens=10_000,
+                 cache=None):
+        """
+        Args:
+            executor (NovaProBatchExecutor): Executor das chamadas (padrão: Bedrock, 8 simultâneas).
+                Cotas e invocador são compartilhados; o checkpoint dele não é usado.
+            expected_output_format_path (str): Formato HTML esperado do resumo final.
+            chunk_tokens (int): Tokens máximos de conversa por trecho do map.
+            reduce_tokens (int): Tokens máximos de notas parciais por chamada de reduce.
+            map_max_tokens (int): max_new_tokens de cada resumo parcial.
+            max_tokens (int): max_new_tokens do resumo final.
+            cache (ChunkSummaryCache): Cache dos resumos parciais (padrão: em memória).
+        """
+        self.executor = executor or NovaProBatchExecutor()
+        self.expected_output_format_path = expected_output_format_path
+        self.chunk_tokens = chunk_tokens
+        self.reduce_tokens = reduce_tokens
+        self.map_max_tokens = map_max_tokens
+        self.max_tokens = max_tokens
+        self.cache = cache if cache is not None else ChunkSummaryCache()
+        self.last_report = {}
+
+    def _model(self, prompt, max_tokens):
+        from models.amazon_nova_pro import AmazonNovaPro
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            return AmazonNovaPro(prompt, max_tokens=max_tokens)
+
+    async def _invoke_one(self, executor, job_id, model):
+        """Executa uma única chamada pelo executor (mesmas cotas e retries do map)."""
+        records = []
+        await executor.run([(job_id, model)], records.append)
+        record = records[0]
+        if record['status'] != STATUS_DONE:
+            raise RuntimeError(f"Falha na chamada {job_id}: {record['error']}")
+        return record
+
+    async def _map(self, executor, texts, session_id, stats) -> list:
+        """Resume cada texto em seções parciais, em paralelo, reaproveitando o cache."""
+        model_id = self._model('', self.map_max_tokens).get_model_id()
+        keys = [ChunkSummaryCache.key(model_id, self.map_max_tokens, text) for text in texts]
+        results = {key: self.cache.get(key) for key in keys}
+        missing = {key: index for index, key in enumerate(keys) if results[key] is None}
+        stats['map_calls'] += len(missing)
+        stats['cache_hits'] += len(keys) - len(missing)
+
+        if missing:
+            jobs = ((key, self._model(build_map_prompt(texts[index], index + 1, len(texts), session_id),
+                                      self.map_max_tokens))
+                    for key, index in missing.items())
+            failures = []
+
+            def on_result(record):
+                if record['status'] != STATUS_DONE:
+                    failures.append(record)
+                    return
+                stats['input_tokens'] += record['input_tokens']
+                stats['output_tokens'] += record['output_tokens']
+                sections = parse_sections(record['text'])
+                self.cache.put(record['job_id'], sections)
+                results[record['job_id']] = sections
+
+            await executor.run(jobs, on_result)
+            if failures:
+                raise RuntimeError(f"{len(failures)} trecho(s) sem resumo: {failures[0]['error']}")
+        return [results[key] for key in keys]
+
+    async def summarize(self, conversation_data, session_id) -> dict:
+        """
+        Gera o resumo HTML de uma conversa de qualquer tamanho.
+
+        Args:
+            conversation_data (str | TranscriptStore): Conversa a resumir.
+            session_id (str): Identificador da sessão (vai para o prompt).
+
+        Returns:
+            dict: `html` (resumo final) e `report` (trechos, chamadas, cache, tokens, tempo).
+        """
+        from template.prompt_template import PromptTemplate
+
+        started_at = time.perf_counter()
+        stats = {'turns': 0, 'chunks': 0, 'levels': 0, 'map_calls': 0, 'cache_hits': 0,
+                 'input_tokens': 0, 'output_tokens': 0}
+        turns = split_turns(conversation_data)
+        chunks = chunk_turns(turns, self.chunk_tokens)
+        stats['turns'], stats['chunks'] = len(turns), len(chunks)
+        # Um executor por resumo: sem o checkpoint do executor compartilhado (que pularia
+        # os trechos sem devolver o resultado) e sem zerar as estatísticas de outro resumo
+        executor = self.executor.fork()
+
+        if len(chunks) <= 1:
+            # Cabe numa chamada: mesmo caminho de antes, sem map-reduce
+            notes = '\n'.join(chunks)
+        else:
+            partials = await self._map(executor, chunks, session_id, stats)
+            stats['levels'] = 1
+            notes = [format_sections(sections) for sections in partials]
+            # Reduce em níveis: agrupa notas até caberem numa única chamada final
+            while sum(estimate_tokens(text) for text in notes) > self.reduce_tokens and len(notes) > 1:
+                groups = chunk_turns(notes, self.reduce_tokens)
+                if len(groups) >= len(notes):
+                    break
+                notes = [format_sections(sections) for sections in await self._map(executor, groups, session_id, stats)]
+                stats['levels'] += 1
+            notes = (f"The conversation is too long for a single analysis. Below are analyst notes for its "
+                     f"{len(chunks)} consecutive parts, in order. Merge them into one summary: deduplicate topics, "
+                     f"weigh the overall sentiment across parts (later parts reflect the final state), and keep "
+                     f"every distinct action item.\n\n"
+                     + '\n\n'.join(f"Part {index}:\n{text}" for index, text in enumerate(notes, 1)))
+
+        from models.amazon_nova_pro import AmazonNovaPro
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            template = PromptTemplate(notes, self.expected_output_format_path, session_id)
+            # Instruções e formato esperado como cache point, iguais em todos os resumos
+            model = AmazonNovaPro.from_template(template, max_tokens=self.max_tokens,
+                                                prompt_cache=executor.prompt_cache)
+        record = await self._invoke_one(executor, f'{session_id}:reduce', model)
+        stats['input_tokens'] += record['input_tokens']
+        stats['output_tokens'] += record['output_tokens']
+        stats['elapsed_s'] = time.perf_counter() - started_at
+        self.last_report = stats
+        return {'html': record['text'], 'report': stats}
+
+
+def synthetic_conversation(turns, seed=0):
+    """Conversa sintética longa (turnos User/Assistant) para testar contra o stub local."""
+    import random
+
+    rng = random.Random(seed)
+    topics = ['billing', 'delivery', 'refund', 'password', 'upgrade', 'cancellation', 'invoice', 'warranty']
+    lines = []
+    for turn in range(turns):
+        topic = rng.choice(topics)
+        lines.append(f"User: About the {topic} from order {rng.randint(1000, 9999)}, it is still not resolved "
+                     f"after {turn} days and I need an update on what happens next.")
+        lines.append(f"Assistant: I understand the {topic} issue. I opened ticket {rng.randint(10000, 99999)} "
+                     f"and the team will follow up within two business days.")
+    return '\n'.join(lines)
+
+
+async def _benchmark(args):
+    from services.local_nova_pro_stub import LocalNovaProClient
+    from services.nova_pro_invoker import NovaProInvoker
+
+    invoker = NovaProInvoker(client=LocalNovaProClient(output_tokens=400), max_workers=args.concurrency)
+    executor = NovaProBatchExecutor(invoker, concurrency=args.concurrency)
+    summarizer = MapReduceSummarizer(executor, args.format_path, chunk_tokens=args.chunk_tokens,
+                                     cache=ChunkSummaryCache(args.cache))
+    conversation = synthetic_conversation(args.turns)
+
+    print(f"Conversa: {args.turns * 2} turnos, ~{estimate_tokens(conversation)} tokens estimados")
+    first = await summarizer.summarize(conversation, 'benchmark')
+    print(f"Primeira execução:   {first['report']}")
+    extended = conversation + '\n' + synthetic_conversation(args.append, seed=1)
+    second = await summarizer.summarize(extended, 'benchmark')
+    print(f"Após +{args.append * 2} turnos:  {second['report']}")
+    sections = parse_sections(second['html'])
+    print("Itens no HTML final: " + ', '.join(f"{title}={len(items)}" for title, items in sections.items()))
+    invoker.close()
+
+
+if __name__ == "__main__":
+    # Benchmark contra o stub local: python -m services.nova_pro_summarizer --turns 3000
+    parser = argparse.ArgumentParser(description="Resumo map-reduce de conversas longas (stub local).")
+    parser.add_argument('--turns', type=int, default=3000, help="Pares de turnos User/Assistant.")
+    parser.add_argument('--append', type=int, default=20, help="Pares de turnos acrescentados na 2ª execução.")
+    parser.add_argument('--chunk-tokens', type=int, default=12_000, help="Tokens por trecho do map.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Resumos parciais simultâneos.")
+    parser.add_argument('--format-path', default='expected_output_format.html', help="Formato HTML esperado.")
+    parser.add_argument('--cache', help="Arquivo .jsonl para persistir os resumos parciais.")
+    asyncio.run(_benchmark(parser.parse_args()))
@@ -0,0 +1,276 @@
+import asyncio
+import collections
+import time
+import uuid
+
+from services.bedrock_sonic_service import AmazonNovaSonicService
+
+
+class SessionRejected(Exception):
+    """Sessão recusada pelo controle de admissão (fila cheia ou tempo de espera esgotado)."""
+
+
+class FairScheduler:
+    """
+    Intercala o trabalho de envio e recebimento das sessões que dividem o loop.
+
+    Cada sessão chama `checkpoint` a cada evento enviado ou recebido; a cada `quantum`
+    eventos em uma direção ela cede o loop (`sleep(0)`), indo para o fim da fila de
+    tarefas prontas. Assim uma sessão com um upload grande ou uma resposta longa não
+    monopoliza o loop, e envio e recebimento têm contadores separados.
+    """
+
+    def __init__(self, quantum=4):
+        """
+        Args:
+            quantum (int): Eventos seguidos por sessão e direção antes de ceder o loop.
+        """
+        self.quantum = quantum
+        self.yields = 0
+        self._counts = {}
+
+    async def checkpoint(self, session, direction):
+        """
+        Registra um evento da sessão e cede o loop ao completar o quantum.
+
+        Args:
+            session: Sessão que fez o trabalho.
+            direction (str): 'send' ou 'receive'.
+        """
+        key = (id(session), direction)
+        count = self._counts.get(key, 0) + 1
+        if count < self.quantum:
+            self._counts[key] = count
+            return
+        self._counts[key] = 0
+        self.yields += 1
+        await asyncio.sleep(0)
+
+    def forget(self, session):
+        """Remove os contadores de uma sessão encerrada."""
+        for direction in ('send', 'receive'):
+            self._counts.pop((id(session), direction), None)
+
+
+class SessionManager:
+    """
+    Gerencia muitas conversas Nova Sonic concorrentes em um único loop de eventos.
+
+    - Admissão: no máximo `max_sessions` sessões ativas; as demais esperam em fila
+      (até `max_queued`, por até `queue_timeout` segundos) ou são recusadas com
+      `SessionRejected`.
+    - Limite por cliente: cada cliente tem no máximo `max_per_client` sessões ativas.
+      Quando uma vaga abre, a fila é servida em rodízio entre clientes, então um
+      cliente com muitos pedidos na fila não atrasa os demais.
+    - Escalonamento justo: as sessões compartilham um `FairScheduler`.
+    - Limpeza: ao terminar, falhar ou ser cancelada, a sessão é encerrada, a tarefa
+      de respostas é cancelada e a vaga é liberada.
+    """
+
+    def __init__(self, service_factory=AmazonNovaSonicService, max_sessions=200, max_queued=1000,
+                 max_per_client=4, queue_timeout=10.0, scheduler_quantum=4, pool=None):
+        """
+        Args:
+            service_factory (callable): Cria um AmazonNovaSonicService a partir de kwargs.
+            max_sessions (int): Sessões ativas simultâneas no processo.
+            max_queued (int): Sessões aguardando vaga antes de começar a recusar.
+            max_per_client (int): Sessões ativas simultâneas por cliente.
+            queue_timeout (float): Tempo máximo de espera por uma vaga, em segundos.
+            scheduler_quantum (int): Eventos por sessão antes de ceder o loop.
+            pool (SessionPool): Se informado, as sessões vêm já iniciadas do pool
+                (services/session_pool.py) em vez da fábrica.
+        """
+        self.service_factory = service_factory
+        self.max_sessions = max_sessions
+        self.max_queued = max_queued
+        self.max_per_client = max_per_client
+        self.queue_timeout = queue_timeout
+        self.scheduler = FairScheduler(scheduler_quantum)
+        self.pool = pool
+
+        self._active = 0
+        self._active_by_client = collections.Counter()
+        self._waiting = collections.OrderedDict()  # client_id -> deque de futures, em ordem de rodízio
+        self._queued = 0
+        self._sessions = {}
+        self._counters = {'admitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'cancelled': 0,
+                          'peak_active': 0, 'peak_queued': 0}
+
+    def _has_slot(self, client_id) -> bool:
+        return self._active < self.max_sessions and self._active_by_client[client_id] < self.max_per_client
+
+    def _reserve(self, client_id):
+        self._active += 1
+        self._active_by_client[client_id] += 1
+        self._counters['admitted'] += 1
+        self._counters['peak_active'] = max(self._counters['peak_active'], self._active)
+
+    def _release(self, client_id):
+        self._active -= 1
+        self._active_by_client[client_id] -= 1
+        if not self._active_by_client[client_id]:
+            del self._active_by_client[client_id]
+        self._grant()
+
+    def _grant(self):
+        """Entrega as vagas livres aos clientes em espera, em rodízio."""
+        while self._active < self.max_sessions and self._waiting:
+            client_id = next((client for client in self._waiting
+                              if self._active_by_client[client] < self.max_per_client), None)
+            if client_id is None:
+                return
+            waiters = self._waiting[client_id]
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(client_id)
+            else:
+                del self._waiting[client_id]
+            if waiter.done():
+                continue
+            self._queued -= 1
+            self._reserve(client_id)
+            waiter.set_result(None)
+
+    async def _admit(self, client_id):
+        """Reserva uma vaga para o cliente, esperando na fila se necessário."""
+        if self._has_slot(client_id) and not self._waiting:
+            self._reserve(client_id)
+            return
+        if self._queued >= self.max_queued:
+            self._counters['rejected'] += 1
+            raise SessionRejected(f"Fila de sessões cheia ({self._queued} aguardando).")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(client_id, collections.deque()).append(waiter)
+        self._queued += 1
+        self._counters['peak_queued'] = max(self._counters['peak_queued'], self._queued)
+        self._grant()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A vaga foi concedida no mesmo instante: devolve
+                self._release(client_id)
+            else:
+                waiter.cancel()
+                self._queued -= 1
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._counters['rejected'] += 1
+            raise SessionRejected(f"Nenhuma vaga em {self.queue_timeout} s.") from None
+
+    async def run(self, client_id, handler, **service_kwargs):
+        """
+        Executa uma conversa gerenciada.
+
+        Args:
+            client_id (str): Identificador do cliente (para o limite por cliente).
+            handler (callable): Corrotina que recebe o serviço já iniciado e conduz a conversa.
+            **service_kwargs: Parâmetros repassados para a fábrica do serviço (com pool,
+                apenas system_prompt e voice_id).
+
+        Returns:
+            O retorno de `handler`.
+
+        Raises:
+            SessionRejected: Se a sessão não for admitida.
+        """
+        await self._admit(client_id)
+        session_id = str(uuid.uuid4())
+        service = None
+        try:
+            if self.pool:
+                service = await self.pool.acquire(**service_kwargs)
+            else:
+                service = self.service_factory(**service_kwargs)
+            service.scheduler = self.scheduler
+            self._sessions[session_id] = (client_id, service, time.monotonic())
+            await service.start_session()
+            result = await handler(service)
+            self._counters['completed'] += 1
+            return result
+        except asyncio.CancelledError:
+            self._counters['cancelled'] += 1
+            raise
+        except Exception:
+            self._counters['failed'] += 1
+            raise
+        finally:
+            self._sessions.pop(session_id, None)
+            if service is not None:
+                await self._cleanup(service)
+            self._release(client_id)
+
+    async def _cleanup(self, service):
+        """Encerra a sessão sem propagar falhas (o stream pode já estar quebrado)."""
+        try:
+            await asyncio.wait_for(service.end_session(), timeout=2)
+        except Exception as e:
+            print(f"[WARNING][SESSIONS] Falha ao encerrar a sessão: {e}")
+        service.is_active = False
+        if service.response and not service.response.done():
+            service.response.cancel()
+            await asyncio.gather(service.response, return_exceptions=True)
+        self.scheduler.forget(service)
+
+    def stats(self) -> dict:
+        """
+        Retorna o estado atual do gerenciador.
+
+        Returns:
+            dict: Sessões ativas e em fila, por cliente, memória estimada de cada sessão
+                ativa e contadores acumulados.
+        """
+        now = time.monotonic()
+        sessions = [
+            {'session_id': session_id, 'client_id': client_id, 'age_s': round(now - started_at, 1),
+             'memory_bytes': service.memory_usage()}
+            for session_id, (client_id, service, started_at) in self._sessions.items()
+        ]
+        return {
+            'active': self._active,
+            'queued': self._queued,
+            'active_by_client': dict(self._active_by_client),
+            'queued_by_client': {client: sum(not waiter.done() for waiter in waiters)
+                                 for client, waiters in self._waiting.items()},
+            'memory_bytes': sum(session['memory_bytes'] for session in sessions),
+            'sessions': sessions,
+            'scheduler_yields': self.scheduler.yields,
+            **self._counters,
+        }
+
+
+# --- Bloco de Teste ---
+# Muitas sessões de poucos clientes contra o stream local, com limite de vagas.
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    from services.local_sonic_stub import LocalSonicClient, synthetic_pcm
+    from utils.audio_io import PCMBytesSource, CallbackSink, INPUT_SAMPLE_RATE
+
+    async def demo(sessions=60, clients=3, max_sessions=16):
+        client = LocalSonicClient(response_ms=1000, realtime_factor=4)
+        utterance = synthetic_pcm(1000, sample_rate=INPUT_SAMPLE_RATE)
+        manager = SessionManager(lambda **kw: AmazonNovaSonicService(client=client, **kw),
+                                 max_sessions=max_sessions, max_per_client=8, queue_timeout=60)
+        snapshots = []
+
+        async def conversation(service):
+            await service.run_turn(PCMBytesSource(utterance), CallbackSink(lambda _: None))
+            snapshots.append(manager.stats())
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = await asyncio.gather(*(manager.run(f"client-{i % clients}", conversation)
+                                             for i in range(sessions)), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, BaseException)]
+        stats = manager.stats()
+        print(f"--- SessionManager: {sessions} sessões, {clients} clientes, {max_sessions} vagas ---")
+        print(f"  concluídas={stats['completed']} falhas={len(failures)} recusadas={stats['rejected']}")
+        print(f"  pico ativas={stats['peak_active']} pico na fila={stats['peak_queued']} "
+              f"yields do escalonador={stats['scheduler_yields']}")
+        print(f"  memória das sessões ativas (pico): "
+              f"{max(snapshot['memory_bytes'] for snapshot in snapshots) / 1024:.0f} KB")
+        print(f"  ao final: ativas={stats['active']} na fila={stats['queued']}")
+
+    asyncio.run(demo())
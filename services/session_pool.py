@@ -0,0 +1,246 @@
+import asyncio
+import collections
+import time
+
+from services.bedrock_sonic_service import AmazonNovaSonicService, DEFAULT_SYSTEM_PROMPT
+from utils.metrics import percentile
+
+# Idade máxima de uma sessão ociosa no pool: bem abaixo dos timeouts do lado do
+# servidor para streams sem entrada de áudio, que derrubariam a sessão antes do uso
+DEFAULT_MAX_IDLE_SECONDS = 45
+
+
+class SessionPool:
+    """
+    Pool de sessões Nova Sonic pré-aquecidas.
+
+    Cada conversa paga a abertura do stream e cinco envios sequenciais (sessionStart,
+    promptStart e contentStart/textInput/contentEnd do prompt de sistema) antes do
+    primeiro áudio do usuário. O pool mantém `size` sessões por configuração
+    (system_prompt, voice_id) com esse prelúdio já enviado; `acquire` entrega uma
+    delas imediatamente e repõe o pool em segundo plano. Sessões ociosas há mais de
+    `max_idle_seconds`, ou cujo stream já terminou, são descartadas antes do uso.
+
+    Serve para processos de vida longa (services/stream_server.py, SessionManager):
+    as sessões só são repostas enquanto o loop de eventos está rodando.
+    """
+
+    def __init__(self, service_factory=AmazonNovaSonicService, size=2, configs=None,
+                 max_idle_seconds=DEFAULT_MAX_IDLE_SECONDS, check_interval=5.0):
+        """
+        Args:
+            service_factory (callable): Cria um serviço a partir de system_prompt e voice_id.
+            size (int): Sessões prontas mantidas por configuração.
+            configs (list[dict]): Configurações aquecidas desde o início, cada uma com
+                'system_prompt' e/ou 'voice_id'.
+            max_idle_seconds (float): Tempo máximo de uma sessão pronta sem uso.
+            check_interval (float): Intervalo da verificação de sessões expiradas.
+        """
+        self.service_factory = service_factory
+        self.size = size
+        self.max_idle_seconds = max_idle_seconds
+        self.check_interval = check_interval
+
+        self._ready = {}  # (system_prompt, voice_id) -> deque de (sessão, pronta_em)
+        for config in configs or []:
+            self._ready.setdefault(self._key(config.get('system_prompt'), config.get('voice_id', 'matthew')),
+                                   collections.deque())
+        self._refills = {}
+        self._maintenance = None
+        self._setup_seconds = collections.deque(maxlen=512)
+        self._metrics = {'hits': 0, 'misses': 0, 'warmed': 0, 'evicted': 0, 'warm_failures': 0,
+                         'setup_saved_seconds': 0.0}
+
+    @staticmethod
+    def _key(system_prompt, voice_id):
+        return system_prompt or DEFAULT_SYSTEM_PROMPT, voice_id
+
+    async def start(self):
+        """Aquece as configurações registradas e inicia a verificação periódica."""
+        for key in self._ready:
+            self._schedule_refill(key)
+        self._maintenance = asyncio.create_task(self._maintain())
+
+    def warm(self, system_prompt=None, voice_id='matthew'):
+        """Passa a manter sessões prontas para mais uma configuração."""
+        key = self._key(system_prompt, voice_id)
+        self._ready.setdefault(key, collections.deque())
+        self._schedule_refill(key)
+
+    async def acquire(self, system_prompt=None, voice_id='matthew'):
+        """
+        Retorna uma sessão iniciada para a configuração, do pool se houver uma pronta.
+
+        Args:
+            system_prompt (str): Prompt de sistema (None usa o padrão do serviço).
+            voice_id (str): Voz da resposta.
+
+        Returns:
+            AmazonNovaSonicService: Sessão com o prelúdio já enviado.
+        """
+        key = self._key(system_prompt, voice_id)
+        ready = self._ready.get(key)
+        while ready:
+            service, ready_at = ready.popleft()
+            if self._is_usable(service, ready_at):
+                self._metrics['hits'] += 1
+                self._metrics['setup_saved_seconds'] += service.setup_seconds
+                self._schedule_refill(key)
+                return service
+            await self._evict(service)
+
+        self._metrics['misses'] += 1
+        if ready is not None:
+            self._schedule_refill(key)
+        return await self._start_session(key)
+
+    def _is_usable(self, service, ready_at) -> bool:
+        """Uma sessão pronta só é entregue se o stream segue aberto e não expirou."""
+        return (service.is_active and service.response is not None and not service.response.done()
+                and time.monotonic() - ready_at < self.max_idle_seconds)
+
+    async def _start_session(self, key):
+        system_prompt, voice_id = key
+        service = self.service_factory(system_prompt=system_prompt, voice_id=voice_id)
+        try:
+            await service.start_session()
+        except (Exception, asyncio.CancelledError):
+            # Falha ou cancelamento (close) no meio da abertura: o stream já aberto não pode vazar
+            await self._close(service)
+            raise
+        self._setup_seconds.append(service.setup_seconds)
+        return service
+
+    def _schedule_refill(self, key):
+        task = self._refills.get(key)
+        if task is None or task.done():
+            self._refills[key] = asyncio.create_task(self._refill(key))
+
+    async def _refill(self, key):
+        """Completa o pool da configuração, uma sessão por vez."""
+        ready = self._ready[key]
+        while len(ready) < self.size:
+            try:
+                service = await self._start_session(key)
+            except Exception as e:
+                # Tenta de novo na próxima verificação periódica
+                self._metrics['warm_failures'] += 1
+                print(f"[WARNING][POOL] Falha ao aquecer sessão: {e}")
+                return
+            ready.append((service, time.monotonic()))
+            self._metrics['warmed'] += 1
+
+    async def _maintain(self):
+        """Descarta sessões expiradas e repõe o pool periodicamente."""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                # acquire/warm/_refill alteram o dicionário e as filas durante os awaits
+                for key, ready in list(self._ready.items()):
+                    usable, stale = [], []
+                    while ready:
+                        service, ready_at = ready.popleft()
+                        (usable if self._is_usable(service, ready_at) else stale).append((service, ready_at))
+                    # As mais antigas voltam à frente, antes das repostas durante os despejos
+                    ready.extendleft(reversed(usable))
+                    for service, _ in stale:
+                        await self._evict(service)
+                    self._schedule_refill(key)
+            except Exception as e:
+                print(f"[WARNING][POOL] Falha na verificação periódica: {e}")
+
+    async def _evict(self, service):
+        self._metrics['evicted'] += 1
+        await self._close(service)
+
+    @staticmethod
+    async def _close(service):
+        try:
+            await asyncio.wait_for(service.end_session(), timeout=2)
+        except Exception as e:
+            print(f"[WARNING][POOL] Falha ao encerrar sessão: {e}")
+        service.is_active = False
+        if service.response and not service.response.done():
+            service.response.cancel()
+            await asyncio.gather(service.response, return_exceptions=True)
+
+    async def close(self):
+        """Interrompe a reposição e encerra todas as sessões prontas."""
+        tasks = [task for task in [self._maintenance, *self._refills.values()] if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for ready in self._ready.values():
+            while ready:
+                await self._close(ready.popleft()[0])
+
+    def stats(self) -> dict:
+        """
+        Retorna as métricas do pool.
+
+        Returns:
+            dict: Acertos, faltas, taxa de acerto, sessões prontas, descartes e o tempo de
+                setup (abertura + prelúdio) medido e economizado pelos acertos.
+        """
+        requests = self._metrics['hits'] + self._metrics['misses']
+        setup = list(self._setup_seconds)
+        return {
+            **self._metrics,
+            'hit_rate': self._metrics['hits'] / requests if requests else 0.0,
+            'ready': sum(len(ready) for ready in self._ready.values()),
+            'configs': len(self._ready),
+            'setup_p50_ms': percentile(setup, 50) * 1000,
+            'setup_p99_ms': percentile(setup, 99) * 1000,
+        }
+
+
+# --- Bloco de Benchmark ---
+# Tempo até a sessão estar pronta para o áudio do usuário, com e sem pool.
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    from services.local_sonic_stub import LocalSonicClient, synthetic_pcm
+    from utils.audio_io import PCMBytesSource, CallbackSink, INPUT_SAMPLE_RATE
+
+    async def conversations(acquire, requests, utterance):
+        ready_ms = []
+        for _ in range(requests):
+            started_at = time.perf_counter()
+            service = await acquire()
+            ready_ms.append((time.perf_counter() - started_at) * 1000)
+            await service.run_turn(PCMBytesSource(utterance), CallbackSink(lambda _: None))
+            await SessionPool._close(service)
+            await asyncio.sleep(0.2)  # intervalo entre pedidos, quando o pool se repõe
+        return ready_ms
+
+    async def benchmark(requests=20):
+        # Latências de rede simuladas: abertura do stream e cada envio de evento
+        client = LocalSonicClient(open_latency=0.08, send_latency=0.015, response_ms=400, realtime_factor=0,
+                                  first_audio_latency=0.05)
+        utterance = synthetic_pcm(300, sample_rate=INPUT_SAMPLE_RATE)
+
+        def factory(**kwargs):
+            return AmazonNovaSonicService(client=client, jitter_target_ms=0, **kwargs)
+
+        async def cold():
+            service = factory()
+            await service.start_session()
+            return service
+
+        pool = SessionPool(factory, size=2, configs=[{}])
+        await pool.start()
+        await asyncio.sleep(0.5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cold_ms = await conversations(cold, requests, utterance)
+            pooled_ms = await conversations(pool.acquire, requests, utterance)
+        await pool.close()
+
+        stats = pool.stats()
+        print(f"--- SessionPool: {requests} conversas sequenciais (stream local) ---")
+        print(f"  sem pool: pronto em p50 {percentile(cold_ms, 50):.1f} ms | p99 {percentile(cold_ms, 99):.1f} ms")
+        print(f"  com pool: pronto em p50 {percentile(pooled_ms, 50):.1f} ms | p99 {percentile(pooled_ms, 99):.1f} ms")
+        print(f"  hit_rate={stats['hit_rate']:.2f} warmed={stats['warmed']} evicted={stats['evicted']} "
+              f"setup economizado={stats['setup_saved_seconds'] * 1000:.0f} ms")
+
+    asyncio.run(benchmark())
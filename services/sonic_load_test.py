@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+import tracemalloc
+
+from services.bedrock_sonic_service import AmazonNovaSonicService, INPUT_SAMPLE_RATE
+from services.local_sonic_stub import LocalSonicClient, synthetic_pcm
+from utils.audio_io import PCMBytesSource, CallbackSink
+from utils.metrics import percentile
+
+
+class _TimedSource:
+    """
+    Envolve uma fonte de áudio e mede quanto tempo o serviço leva para consumir
+    (codificar e enviar) cada chunk entregue.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.realtime = source.realtime
+        self.send_latencies = []
+        self.finished_at = None
+
+    async def __aiter__(self):
+        async for chunk in self.source:
+            started_at = time.perf_counter()
+            yield chunk
+            self.send_latencies.append(time.perf_counter() - started_at)
+        self.finished_at = time.perf_counter()
+
+
+async def run_session(client, utterance, realtime):
+    """
+    Executa uma sessão completa pelo código real do AmazonNovaSonicService.
+
+    Args:
+        client (LocalSonicClient): Cliente local compartilhado pelas sessões.
+        utterance (bytes): PCM de 16 kHz enviado como fala do usuário.
+        realtime (bool): Se True, envia o áudio no ritmo do tempo real.
+
+    Returns:
+        dict: Medições da sessão.
+    """
+    started_at = time.perf_counter()
+    first_audio_at = None
+    audio_bytes = 0
+
+    def on_audio(pcm_bytes):
+        nonlocal first_audio_at, audio_bytes
+        if first_audio_at is None:
+            first_audio_at = time.perf_counter()
+        audio_bytes += len(pcm_bytes)
+
+    service = AmazonNovaSonicService(client=client)
+    await service.start_session()
+    stream = service.stream
+    setup_done_at = time.perf_counter()
+
+    source = _TimedSource(PCMBytesSource(utterance, realtime=realtime))
+    try:
+        await service.run_turn(source, CallbackSink(on_audio))
+    finally:
+        await service.end_session()
+        service.is_active = False
+        if service.response and not service.response.done():
+            service.response.cancel()
+        finished_at = time.perf_counter()
+
+    return {
+        'setup': setup_done_at - started_at,
+        'ttfa': (first_audio_at - source.finished_at) if first_audio_at else None,
+        'duration': finished_at - started_at,
+        'events': stream.events_in + stream.events_out,
+        'audio_bytes': audio_bytes,
+        'send_latencies': source.send_latencies,
+        'framing': service.framer.stats() if service.framer else None,
+    }
+
+
+async def run_load_test(sessions=20, utterance_ms=2000, realtime=False, client=None):
+    """
+    Executa N sessões concorrentes contra o stream local e agrega as métricas.
+
+    Args:
+        sessions (int): Quantidade de sessões simultâneas.
+        utterance_ms (int): Duração da fala sintética de cada sessão.
+        realtime (bool): Se True, envia o áudio no ritmo do tempo real.
+        client (LocalSonicClient): Cliente local (opcional; usa a configuração padrão).
+
+    Returns:
+        dict: Relatório com tempo até o primeiro áudio, vazão de eventos, latências
+            p50/p99 e memória por sessão.
+    """
+    client = client or LocalSonicClient()
+    utterance = synthetic_pcm(utterance_ms, sample_rate=INPUT_SAMPLE_RATE)
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started_at = time.perf_counter()
+    results = await asyncio.gather(*(run_session(client, utterance, realtime) for _ in range(sessions)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    completed = [result for result in results if isinstance(result, dict)]
+    failures = [result for result in results if not isinstance(result, dict)]
+    ttfa = [result['ttfa'] for result in completed if result['ttfa'] is not None]
+    setup = [result['setup'] for result in completed]
+    send_latencies = [latency for result in completed for latency in result['send_latencies']]
+    total_events = sum(result['events'] for result in completed)
+    framing = [result['framing'] for result in completed if result['framing']]
+
+    return {
+        'sessions': sessions,
+        'completed': len(completed),
+        'failed': len(failures),
+        'errors': sorted({repr(failure) for failure in failures})[:5],
+        'elapsed_s': elapsed,
+        'events_per_s': total_events / elapsed if elapsed else 0.0,
+        'ttfa_p50_ms': percentile(ttfa, 50) * 1000,
+        'ttfa_p99_ms': percentile(ttfa, 99) * 1000,
+        'setup_p50_ms': percentile(setup, 50) * 1000,
+        'setup_p99_ms': percentile(setup, 99) * 1000,
+        'send_p50_ms': percentile(send_latencies, 50) * 1000,
+        'send_p99_ms': percentile(send_latencies, 99) * 1000,
+        'frame_ms_p50': percentile([stats['frame_ms'] for stats in framing], 50),
+        'upstream_kb_per_session': sum(stats['bytes_sent'] for stats in framing) / max(len(framing), 1) / 1024,
+        'memory_per_session_kb': (peak - baseline) / max(sessions, 1) / 1024,
+    }
+
+
+def main(argv=None):
+    """
+    Teste de carga local do AmazonNovaSonicService.
+
+    Exemplo:
+        python -m services.sonic_load_test --sessions 100 --realtime-factor 4
+    """
+    parser = argparse.ArgumentParser(description="Teste de carga do Nova Sonic contra um stream local.")
+    parser.add_argument('--sessions', type=int, default=20, help="Sessões simultâneas.")
+    parser.add_argument('--utterance-ms', type=int, default=2000, help="Duração da fala de cada sessão.")
+    parser.add_argument('--realtime', action='store_true', help="Envia o áudio no ritmo do tempo real.")
+    parser.add_argument('--first-audio-latency', type=float, default=0.3,
+                        help="Latência simulada até o primeiro áudio (s).")
+    parser.add_argument('--response-ms', type=int, default=2000, help="Duração do áudio de resposta.")
+    parser.add_argument('--realtime-factor', type=float, default=1.0,
+                        help="Vazão da resposta em múltiplos do tempo real (0 = sem limite).")
+    args = parser.parse_args(argv)
+
+    client = LocalSonicClient(first_audio_latency=args.first_audio_latency, response_ms=args.response_ms,
+                              realtime_factor=args.realtime_factor)
+    # Silencia as transcrições impressas por cada sessão
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = asyncio.run(run_load_test(args.sessions, args.utterance_ms, args.realtime, client))
+
+    print("--- Teste de carga local do Nova Sonic ---")
+    for key, value in report.items():
+        print(f"  {key:<24} {value:.2f}" if isinstance(value, float) else f"  {key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import time
+
+from utils.audio_io import wav_header, INPUT_SAMPLE_RATE
+from utils.audio_processor import LAMBDA_PAYLOAD_LIMIT_BYTES
+from utils.response_stream import CONTENT_TYPE, FRAME_AUDIO, FRAME_END, FRAME_ERROR, FRAME_TRANSCRIPT, encode_frame
+
+
+class StreamingServer:
+    """
+    Servidor HTTP/1.1 mínimo (asyncio puro) que expõe o modo de streaming do handler:
+    cada POST recebe o evento Lambda em JSON e responde com os frames NDJSON de
+    `stream_headless_session` em Transfer-Encoding: chunked, um chunk por frame.
+
+    Serve para testes locais e como alvo de um adaptador HTTP de response streaming
+    do Lambda. O áudio vem só inline ('audio_base64'): um cliente da rede não pode
+    apontar 'audio_filepath' para arquivos da máquina do servidor.
+    """
+
+    def __init__(self, service_factory, host='127.0.0.1', port=8080, pool=None,
+                 max_body_bytes=LAMBDA_PAYLOAD_LIMIT_BYTES):
+        """
+        Args:
+            service_factory (callable): Recebe o evento e retorna um AmazonNovaSonicService.
+            host (str): Endereço de escuta.
+            port (int): Porta de escuta (0 escolhe uma porta livre).
+            pool (SessionPool): Se informado, as sessões vêm pré-aquecidas do pool.
+            max_body_bytes (int): Tamanho máximo do corpo do POST (padrão: o payload do Lambda).
+        """
+        self.service_factory = service_factory
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.max_body_bytes = max_body_bytes
+        self._server = None
+
+    async def start(self):
+        """Inicia o servidor (e o pool) e atualiza `port` com a porta efetiva."""
+        if self.pool:
+            await self.pool.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Encerra o servidor."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.pool:
+            await self.pool.close()
+
+    @staticmethod
+    def _write_error(writer, status, message):
+        """Resposta de erro antes do início do stream: JSON com a mensagem."""
+        body = json.dumps({'error': message}).encode('utf-8')
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body)
+
+    async def _handle(self, reader, writer):
+        from lambda_function import close_session, stream_headless_session
+        from utils.audio_processor import AudioProcessor
+
+        service = frames = None
+        streaming = False
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if not request_line.startswith(b'POST'):
+                writer.write(b'HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                return
+            try:
+                length = int(headers.get('content-length', 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._write_error(writer, '400 Bad Request', "Content-Length inválido.")
+                return
+            if length > self.max_body_bytes:
+                self._write_error(writer, '413 Payload Too Large',
+                                  f"Corpo maior que o limite de {self.max_body_bytes} bytes.")
+                return
+            body = await reader.readexactly(length)
+            # Evento e áudio são validados antes do status: erros do pedido ainda viram um 400
+            try:
+                event = json.loads(body or b'{}')
+                if not isinstance(event, dict):
+                    raise ValueError("O corpo deve ser um objeto JSON (evento Lambda).")
+                if 'audio_filepath' in event:
+                    raise ValueError("'audio_filepath' não é aceito via HTTP; envie o áudio em 'audio_base64'.")
+                if not event.get('audio_base64'):
+                    raise ValueError("Nenhum áudio fornecido. É necessário 'audio_base64'.")
+                audio_chunks = AudioProcessor().iter_input_audio(event)
+            except ValueError as e:
+                print(f"[WARNING][STREAM] Pedido inválido: {e}")
+                self._write_error(writer, '400 Bad Request', str(e))
+                return
+
+            writer.write(f'HTTP/1.1 200 OK\r\nContent-Type: {CONTENT_TYPE}\r\n'
+                         f'Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+            streaming = True
+            if self.pool:
+                service = await self.pool.acquire(event.get('system_prompt'), event.get('voice_id', 'matthew'))
+            else:
+                service = self.service_factory(event)
+            frames = stream_headless_session(service, event, audio_chunks=audio_chunks)
+            async for frame in frames:
+                writer.write(b'%x\r\n%b\r\n' % (len(frame), frame))
+                await writer.drain()
+            writer.write(b'0\r\n\r\n')
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            print(f"[WARNING][STREAM] Conexão encerrada pelo cliente: {e}")
+        except Exception as e:
+            print(f"[WARNING][STREAM] Falha ao processar o pedido: {e}")
+            # Depois dos cabeçalhos o status já foi enviado: o erro vai como frame e o stream é terminado
+            with contextlib.suppress(ConnectionError):
+                if streaming:
+                    frame = encode_frame(FRAME_ERROR, message=str(e))
+                    writer.write(b'%x\r\n%b\r\n0\r\n\r\n' % (len(frame), frame))
+                else:
+                    self._write_error(writer, '500 Internal Server Error', "Erro interno do servidor.")
+                await writer.drain()
+        finally:
+            # Sessões (do pool ou não) são de uso único: encerra mesmo se o stream não terminou
+            if frames is not None:
+                await frames.aclose()
+            if service is not None and service.is_active:
+                try:
+                    await close_session(service)
+                except Exception as e:
+                    print(f"[WARNING][STREAM] Falha ao encerrar sessão: {e}")
+            writer.close()
+
+
+async def post_and_measure(host, port, event):
+    """
+    Cliente de teste: envia o evento e mede a chegada dos frames.
+
+    Args:
+        host (str): Endereço do servidor.
+        port (int): Porta do servidor.
+        event (dict): Evento Lambda.
+
+    Returns:
+        dict: Tempo até o primeiro byte, a primeira transcrição e o primeiro áudio,
+            tempo total e quantidade de frames.
+    """
+    body = json.dumps(event).encode('utf-8')
+    started_at = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'POST / HTTP/1.1\r\nHost: local\r\nContent-Type: application/json\r\n'
+                 b'Content-Length: %d\r\n\r\n%b' % (len(body), body))
+    await writer.drain()
+
+    while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+
+    timings = {'first_byte': None, FRAME_TRANSCRIPT: None, FRAME_AUDIO: None}
+    frames = 0
+    end = {}
+    while True:
+        size = int((await reader.readline()).strip() or b'0', 16)
+        if size == 0:
+            break
+        frame = json.loads(await reader.readexactly(size))
+        await reader.readexactly(2)
+        now = time.perf_counter() - started_at
+        frames += 1
+        timings['first_byte'] = timings['first_byte'] or now
+        if frame['type'] in timings and timings[frame['type']] is None:
+            timings[frame['type']] = now
+        if frame['type'] == FRAME_END:
+            end = frame
+    writer.close()
+
+    return {
+        'first_chunk_ms': timings['first_byte'] * 1000,
+        'first_transcript_ms': (timings[FRAME_TRANSCRIPT] or 0) * 1000,
+        'first_audio_ms': (timings[FRAME_AUDIO] or 0) * 1000,
+        'total_ms': (time.perf_counter() - started_at) * 1000,
+        'frames': frames,
+        'audio_bytes': end.get('audio_bytes', 0),
+    }
+
+
+async def compare_with_buffered(utterance_ms=2000, response_ms=3000):
+    """
+    Compara o streaming com o modo headless atual (um JSON ao final) contra o stream local.
+
+    Returns:
+        tuple: (medições do streaming, tempo total do modo bufferizado em ms).
+    """
+    from lambda_function import run_headless_session
+    from services.bedrock_sonic_service import AmazonNovaSonicService
+    from services.local_sonic_stub import LocalSonicClient, synthetic_pcm
+
+    client = LocalSonicClient(response_ms=response_ms)
+    pcm = synthetic_pcm(utterance_ms, sample_rate=INPUT_SAMPLE_RATE)
+    event = {'audio_base64': base64.b64encode(wav_header(len(pcm), INPUT_SAMPLE_RATE) + pcm).decode('ascii'),
+             'trailing_silence_ms': 200}
+
+    server = StreamingServer(lambda _: AmazonNovaSonicService(client=client, jitter_target_ms=0), port=0)
+    await server.start()
+    try:
+        streamed = await post_and_measure(server.host, server.port, event)
+    finally:
+        await server.stop()
+
+    started_at = time.perf_counter()
+    await run_headless_session(AmazonNovaSonicService(client=client), event)
+    buffered_ms = (time.perf_counter() - started_at) * 1000
+    return streamed, buffered_ms
+
+
+def main(argv=None):
+    """
+    Servidor local de streaming ou comparação de tempo até o primeiro chunk.
+
+    Exemplos:
+        python -m services.stream_server --benchmark
+        python -m services.stream_server --port 8080 --local
+    """
+    parser = argparse.ArgumentParser(description="Servidor HTTP chunked para o modo de streaming do handler.")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Endereço de escuta (0.0.0.0 expõe o servidor à rede).")
+    parser.add_argument('--port', type=int, default=8080, help="Porta de escuta.")
+    parser.add_argument('--local', action='store_true', help="Usa o stream local em vez do Bedrock.")
+    parser.add_argument('--pool-size', type=int, default=0,
+                        help="Sessões pré-aquecidas por configuração (0 desativa o pool).")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Mede o tempo até o primeiro chunk contra o modo bufferizado e sai.")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        with contextlib.redirect_stdout(io.StringIO()):
+            streamed, buffered_ms = asyncio.run(compare_with_buffered())
+        print("--- Streaming vs. resposta única (stream local) ---")
+        for key, value in streamed.items():
+            print(f"  {key:<22} {value:.1f}" if isinstance(value, float) else f"  {key:<22} {value}")
+        print(f"  {'buffered_total_ms':<22} {buffered_ms:.1f}")
+        return
+
+    from services.bedrock_sonic_service import AmazonNovaSonicService
+
+    client = None
+    if args.local:
+        from services.local_sonic_stub import LocalSonicClient
+        client = LocalSonicClient()
+
+    def service_factory(event):
+        return AmazonNovaSonicService(system_prompt=event.get('system_prompt'), voice_id=event.get('voice_id', 'matthew'),
+                                      client=client, jitter_target_ms=0)
+
+    async def serve():
+        pool = None
+        if args.pool_size:
+            from services.session_pool import SessionPool
+            pool = SessionPool(lambda **kwargs: AmazonNovaSonicService(client=client, jitter_target_ms=0, **kwargs),
+                               size=args.pool_size, configs=[{}])
+        server = StreamingServer(service_factory, host=args.host, port=args.port, pool=pool)
+        await server.start()
+        print(f"[INFO][STREAM] Servindo em http://{server.host}:{server.port} (POST com o evento em JSON)")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
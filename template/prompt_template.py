@@ -1,50 +1,23 @@
 import os
 import json
 
-class PromptTemplate:
-    """
-    Classe para gerar um template de prompt genérico para análise de dados de conversas.
-    Esta versão foi modificada para remover todas as informações sensíveis e de saúde.
-    """
-
-    def __init__(self, conversation_data, expected_output_format_path, session_id):
-        """
-        Inicializa a classe com os dados da conversa.
-        
-        Args:
-            conversation_data (str): Dados da conversa do usuário.
-            expected_output_format_path (str): Caminho para o arquivo de formato de saída esperado.
-            session_id (str): Um identificador único para a sessão ou usuário.
-        """
-        # Armazena os dados da conversa e o ID da sessão.
-        self.conversation_data = conversation_data
-        self.session_id = session_id
-
-        # Lê o arquivo de formato de saída esperado.
-        try:
-            with open(expected_output_format_path, 'r', encoding='utf-8') as file:
-                expected_output_format = file.read()
-        except FileNotFoundError:
-            print(f"[WARNING] Arquivo de formato esperado não encontrado em: {expected_output_format_path}. Usando um placeholder genérico.")
-            expected_output_format = "<!-- O formato de saída deve ser definido aqui. -->"
+from template.template_registry import TEMPLATE_REGISTRY
 
-        # Cria o template do prompt com base nos dados fornecidos.
-        self.create_prompt_template(expected_output_format)
 
-    def create_prompt_template(self, expected_output_format):
-        """
-        Gera o prompt com um contexto e instruções generalizadas.
-
-        Args:
-            expected_output_format (str): O formato HTML esperado para a saída do modelo.
+def build_static_prefix(expected_output_format):
+    """
+    Monta a parte do prompt igual para todas as conversas: contexto, instruções e
+    formato esperado.
 
-        Returns:
-            str: O prompt formatado e pronto para ser enviado ao modelo.
-        """
+    Args:
+        expected_output_format (str): O formato HTML esperado para a saída do modelo.
 
-        # O prompt é construído usando f-strings para injetar os dados dinâmicos.
-        # As tags <context>, <instructions>, etc., ajudam o modelo a entender a estrutura da tarefa.
-        self.prompt = f"""
+    Returns:
+        str: Prefixo estático do prompt.
+    """
+    # O prompt é construído usando f-strings para injetar os dados dinâmicos.
+    # As tags <context>, <instructions>, etc., ajudam o modelo a entender a estrutura da tarefa.
+    return f"""
         <context>
             You are an expert analyst. Your task is to analyze conversation data from one or more interactions
             and produce a comprehensive and well-structured summary.
@@ -75,7 +48,61 @@ class PromptTemplate:
         <expected_output_format>
             {expected_output_format}
         </expected_output_format>
+"""
+
+
+class PromptTemplate:
+    """
+    Classe para gerar um template de prompt genérico para análise de dados de conversas.
+    Esta versão foi modificada para remover todas as informações sensíveis e de saúde.
+    """
+
+    def __init__(self, conversation_data, expected_output_format_path, session_id):
+        """
+        Inicializa a classe com os dados da conversa.
         
+        Args:
+            conversation_data (str | TranscriptStore): Dados da conversa do usuário, ou a
+                transcrição de uma sessão (utils/transcript_store.py), renderizada aqui.
+            expected_output_format_path (str): Caminho para o arquivo de formato de saída esperado.
+            session_id (str): Um identificador único para a sessão ou usuário.
+        """
+        # Armazena os dados da conversa e o ID da sessão.
+        if hasattr(conversation_data, 'render'):
+            conversation_data = conversation_data.render()
+        self.conversation_data = conversation_data
+        self.session_id = session_id
+
+        # Formato esperado e instruções vêm compilados do registro do processo: o arquivo
+        # só é relido quando o mtime muda (template/template_registry.py).
+        self.compiled = TEMPLATE_REGISTRY.get(expected_output_format_path, build_static_prefix)
+        self.static_prefix = self.compiled.static_prefix
+        self.dynamic_text = self.build_dynamic_text()
+        self.prompt = self.static_prefix + self.dynamic_text
+
+    def create_prompt_template(self, expected_output_format):
+        """
+        Gera o prompt com um contexto e instruções generalizadas.
+
+        Args:
+            expected_output_format (str): O formato HTML esperado para a saída do modelo.
+
+        Returns:
+            str: O prompt formatado e pronto para ser enviado ao modelo.
+        """
+        self.static_prefix = build_static_prefix(expected_output_format)
+        self.dynamic_text = self.build_dynamic_text()
+        self.prompt = self.static_prefix + self.dynamic_text
+        return self.prompt
+
+    def build_dynamic_text(self):
+        """
+        Monta a parte do prompt que muda a cada conversa (sessão e dados).
+
+        Returns:
+            str: Sufixo dinâmico do prompt.
+        """
+        return f"""        
         <session_identifier>
             {self.session_id}
         </session_identifier>
@@ -85,8 +112,6 @@ class PromptTemplate:
         </conversation_data>
         """
 
-        return self.prompt
-    
     def get_prompt_text(self):
         """
         Retorna o texto do prompt formatado.
@@ -95,3 +120,15 @@ class PromptTemplate:
             str: O prompt completo como uma string.
         """
         return self.prompt
+
+    def get_prompt_parts(self):
+        """
+        Retorna o prompt dividido em prefixo estático e sufixo dinâmico.
+
+        O prefixo (contexto, instruções e formato esperado) é igual para todas as conversas
+        e pode ser marcado como cache point do Bedrock (ver AmazonNovaPro.from_template).
+
+        Returns:
+            tuple: (prefixo estático, sufixo dinâmico).
+        """
+        return self.static_prefix, self.dynamic_text
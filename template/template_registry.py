@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+
+# Placeholder usado quando o arquivo de formato esperado não existe
+MISSING_FORMAT_PLACEHOLDER = "<!-- O formato de saída deve ser definido aqui. -->"
+
+
+class CompiledTemplate:
+    """
+    Template de prompt compilado: o prefixo estático (contexto, instruções e formato
+    esperado) já montado, igual para todas as conversas.
+    """
+
+    __slots__ = ('path', 'mtime_ns', 'expected_output_format', 'static_prefix', 'compiled_at')
+
+    def __init__(self, path, mtime_ns, expected_output_format, static_prefix):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.expected_output_format = expected_output_format
+        self.static_prefix = static_prefix
+        self.compiled_at = time.time()
+
+
+class TemplateRegistry:
+    """
+    Registro de templates no nível do processo.
+
+    Cada arquivo de formato esperado é lido e compilado uma única vez; as chamadas
+    seguintes só comparam o mtime do arquivo (um `stat`) e recompilam quando ele muda.
+    Em um container do Lambda reaproveitado, ou num lote com milhares de conversas,
+    isso evita reler o arquivo e remontar as instruções a cada PromptTemplate.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._metrics = {'lookups': 0, 'hits': 0, 'compiled': 0, 'recompiled': 0, 'compile_seconds': 0.0}
+
+    def get(self, expected_output_format_path, build_prefix) -> CompiledTemplate:
+        """
+        Retorna o template compilado do arquivo, recompilando se ele mudou.
+
+        Args:
+            expected_output_format_path (str): Caminho do arquivo de formato esperado.
+            build_prefix (callable): Recebe o formato esperado e devolve o prefixo estático.
+
+        Returns:
+            CompiledTemplate: Template compilado.
+        """
+        key = (os.path.abspath(expected_output_format_path), build_prefix)
+        try:
+            mtime_ns = os.stat(expected_output_format_path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        with self._lock:
+            self._metrics['lookups'] += 1
+            entry = self._entries.get(key)
+            if entry and entry.mtime_ns == mtime_ns:
+                self._metrics['hits'] += 1
+                return entry
+
+        start = time.perf_counter()
+        if mtime_ns is None:
+            print(f"[WARNING] Arquivo de formato esperado não encontrado em: {expected_output_format_path}. Usando um placeholder genérico.")
+            expected_output_format = MISSING_FORMAT_PLACEHOLDER
+        else:
+            with open(expected_output_format_path, 'r', encoding='utf-8') as file:
+                expected_output_format = file.read()
+        compiled = CompiledTemplate(expected_output_format_path, mtime_ns, expected_output_format,
+                                    build_prefix(expected_output_format))
+
+        with self._lock:
+            self._metrics['recompiled' if entry else 'compiled'] += 1
+            self._metrics['compile_seconds'] += time.perf_counter() - start
+            self._entries[key] = compiled
+        if entry:
+            print(f"[DEBUG][TEMPLATE] Template recompilado (arquivo alterado): {expected_output_format_path}")
+        return compiled
+
+    def invalidate(self, expected_output_format_path=None):
+        """
+        Descarta templates compilados.
+
+        Args:
+            expected_output_format_path (str): Arquivo a descartar (padrão: todos).
+        """
+        with self._lock:
+            if expected_output_format_path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(expected_output_format_path)
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+    def get_metrics(self) -> dict:
+        """
+        Returns:
+            dict: Consultas, acertos, compilações e taxa de acerto.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['templates'] = len(self._entries)
+        metrics['hit_rate'] = metrics['hits'] / metrics['lookups'] if metrics['lookups'] else 0.0
+        return metrics
+
+
+# Registro único do processo, compartilhado por todos os PromptTemplate
+TEMPLATE_REGISTRY = TemplateRegistry()
+
+
+# Formato esperado de exemplo para o benchmark (estrutura do resumo em HTML)
+_SAMPLE_FORMAT = "<html><head><title>Conversation Summary</title></head><body>\n" + "".join(
+    f"<h2>{section}</h2>\n<ul>\n" + "".join(
+        f"  <li><strong>Item {index}:</strong> short, factual description of the {section.lower()} point, "
+        f"citing the turn where it was mentioned.</li>\n" for index in range(1, 6)) + "</ul>\n"
+    for section in ('Session Information', 'Key Topics Discussed', 'Overall Sentiment',
+                    'Action Items / Follow-ups', 'Data Visualization', 'Conversation References')
+) + "</body></html>\n"
+
+
+async def _benchmark(jobs, concurrency):
+    import tempfile
+
+    from services.local_nova_pro_stub import LocalNovaProClient
+    from services.nova_pro_batch import NovaProBatchExecutor, synthetic_jobs
+    from services.nova_pro_invoker import NovaProInvoker
+    from template.prompt_template import PromptTemplate
+    # Rodando com -m, este módulo é __main__: o registro usado pelo PromptTemplate é o do pacote
+    from template.template_registry import TEMPLATE_REGISTRY as registry
+
+    format_path = os.path.join(tempfile.mkdtemp(), 'expected_output_format.html')
+    with open(format_path, 'w', encoding='utf-8') as file:
+        file.write(_SAMPLE_FORMAT)
+
+    conversations = [text for _, text in synthetic_jobs(jobs, turns=10)]
+    rounds = 10
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in conversations:
+            registry.invalidate()
+            PromptTemplate(text, format_path, 'benchmark')
+    cold = (time.perf_counter() - start) / (jobs * rounds)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in conversations:
+            PromptTemplate(text, format_path, 'benchmark')
+    warm = (time.perf_counter() - start) / (jobs * rounds)
+    templates = [PromptTemplate(text, format_path, f'session-{index}') for index, text in enumerate(conversations)]
+    print(f"PromptTemplate: {cold * 1e6:.1f} µs lendo o arquivo vs {warm * 1e6:.1f} µs com o registro "
+          f"(acertos: {registry.get_metrics()['hit_rate']:.0%})")
+    print(f"Prefixo estático: {len(templates[0].static_prefix)} caracteres, "
+          f"sufixo dinâmico médio: {sum(len(t.dynamic_text) for t in templates) // jobs} caracteres")
+
+    for prompt_cache in (False, True):
+        client = LocalNovaProClient(first_token_latency=0.2, prefill_tokens_per_s=3_000, output_tokens=300)
+        invoker = NovaProInvoker(client=client, max_workers=concurrency)
+        executor = NovaProBatchExecutor(invoker, concurrency=concurrency, max_tokens=2_000,
+                                        prompt_cache=prompt_cache)
+        report = await executor.run((f'job-{index}', template) for index, template in enumerate(templates))
+        invoker.close()
+        print(f"Cache {'ligado ' if prompt_cache else 'desligado'}: "
+              f"tokens de entrada cobrados={report['billed_input_tokens']:.0f} "
+              f"(sem cache={report['input_tokens']}, lidos={report['cache_read_tokens']}, "
+              f"escritos={report['cache_write_tokens']}), "
+              f"latência p50={report['latency_p50_s'] * 1000:.0f} ms p99={report['latency_p99_s'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    # Benchmark contra o stub local: python -m template.template_registry
+    import asyncio
+
+    asyncio.run(_benchmark(jobs=200, concurrency=16))
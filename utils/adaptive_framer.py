@@ -0,0 +1,146 @@
+import time
+
+
+class AdaptiveFramer:
+    """
+    Reagrupa o áudio de entrada em frames de tamanho adaptativo antes do envio.
+
+    O tamanho do frame fica entre dois limites derivados da latência de envio
+    medida (média móvel exponencial):
+
+    - piso de vazão: o envio de um frame não pode ocupar mais que `max_load` da
+      duração do próprio frame; quando a latência sobe, o piso sobe e vários chunks
+      pequenos são agrupados em um único evento audioInput.
+    - teto de latência: a duração do frame somada à latência de envio não deve
+      passar de `target_latency_ms`.
+
+    O frame escolhido é o dobro do piso (folga para picos), limitado pelo teto: com a
+    rede rápida os chunks são divididos em frames pequenos para reduzir a latência.
+    Se o piso passar do teto, o piso vence, pois do contrário o envio acumularia
+    atraso sem limite.
+    """
+
+    def __init__(self, sample_rate=16000, sample_width=2, channels=1, target_latency_ms=100,
+                 min_frame_ms=20, max_frame_ms=250, max_load=0.5, smoothing=0.2, step_ms=10):
+        """
+        Args:
+            sample_rate (int): Taxa de amostragem do PCM em Hz.
+            sample_width (int): Bytes por amostra.
+            channels (int): Número de canais.
+            target_latency_ms (int): Latência alvo (enquadramento + envio), em ms.
+            min_frame_ms (int): Menor frame permitido, em ms.
+            max_frame_ms (int): Maior frame permitido, em ms.
+            max_load (float): Fração máxima da duração do frame gasta no seu envio.
+            smoothing (float): Peso da amostra mais recente na média da latência de envio.
+            step_ms (int): Granularidade do tamanho do frame, em ms.
+        """
+        self.bytes_per_ms = sample_rate * sample_width * channels / 1000
+        self.frame_align = sample_width * channels
+        self.target_latency_ms = target_latency_ms
+        self.min_frame_ms = min_frame_ms
+        self.max_frame_ms = max_frame_ms
+        self.max_load = max_load
+        self.smoothing = smoothing
+        self.step_ms = step_ms
+
+        self.send_latency_ms = None
+        self.frame_ms = self._quantize(min(max_frame_ms, max(min_frame_ms, target_latency_ms / 2)))
+        self._pending = bytearray()
+
+        self.events = 0
+        self.bytes_sent = 0
+        self.adjustments = 0
+        self._first_send_at = None
+        self._last_send_at = None
+
+    def _quantize(self, frame_ms):
+        return max(self.step_ms, round(frame_ms / self.step_ms) * self.step_ms)
+
+    @property
+    def frame_bytes(self) -> int:
+        """Tamanho atual do frame em bytes."""
+        n_bytes = int(self.frame_ms * self.bytes_per_ms)
+        return n_bytes - n_bytes % self.frame_align
+
+    def push(self, pcm_bytes):
+        """
+        Adiciona áudio e retorna os frames completos prontos para envio.
+
+        Args:
+            pcm_bytes (bytes | memoryview): Chunk vindo da fonte de áudio.
+
+        Returns:
+            list: Frames de `frame_bytes` bytes (o restante fica pendente).
+        """
+        frame_bytes = self.frame_bytes
+        # Caminho sem cópia: o chunk já tem o tamanho do frame
+        if not self._pending and len(pcm_bytes) == frame_bytes:
+            return [pcm_bytes]
+
+        self._pending += pcm_bytes
+        frames = []
+        offset = 0
+        while len(self._pending) - offset >= frame_bytes:
+            frames.append(bytes(self._pending[offset:offset + frame_bytes]))
+            offset += frame_bytes
+        del self._pending[:offset]
+        return frames
+
+    def flush(self) -> bytes:
+        """
+        Retorna o áudio pendente (frame parcial), ex.: ao fim da fala.
+
+        Returns:
+            bytes: Restante do áudio, possivelmente vazio.
+        """
+        remainder = bytes(self._pending)
+        self._pending.clear()
+        return remainder
+
+    def record_send(self, seconds, n_bytes):
+        """
+        Registra o envio de um frame e recalcula o tamanho do próximo.
+
+        Args:
+            seconds (float): Tempo gasto para codificar e enviar o evento.
+            n_bytes (int): Tamanho do frame enviado.
+        """
+        now = time.perf_counter()
+        self._first_send_at = self._first_send_at or now
+        self._last_send_at = now
+        self.events += 1
+        self.bytes_sent += n_bytes
+
+        latency_ms = seconds * 1000
+        if self.send_latency_ms is None:
+            self.send_latency_ms = latency_ms
+        else:
+            self.send_latency_ms += self.smoothing * (latency_ms - self.send_latency_ms)
+
+        floor = self.send_latency_ms / self.max_load
+        ceiling = self.target_latency_ms - self.send_latency_ms
+        # Folga de 2x sobre o piso para absorver picos, limitada pelo teto de latência
+        preferred = max(floor, min(ceiling, 2 * floor))
+        frame_ms = self._quantize(min(self.max_frame_ms, max(self.min_frame_ms, preferred)))
+        if frame_ms != self.frame_ms:
+            self.frame_ms = frame_ms
+            self.adjustments += 1
+
+    def stats(self) -> dict:
+        """
+        Retorna o tamanho de frame escolhido e a vazão de envio.
+
+        Returns:
+            dict: Frame atual (ms e bytes), eventos, eventos/s, bytes enviados,
+                latência média de envio e quantidade de ajustes.
+        """
+        elapsed = (self._last_send_at or 0) - (self._first_send_at or 0)
+        return {
+            'frame_ms': self.frame_ms,
+            'frame_bytes': self.frame_bytes,
+            'events': self.events,
+            'events_per_s': self.events / elapsed if elapsed > 0 else 0.0,
+            'bytes_sent': self.bytes_sent,
+            'send_latency_ms': self.send_latency_ms or 0.0,
+            'adjustments': self.adjustments,
+        }
@@ -0,0 +1,404 @@
+import base64
+import collections
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+# Extensões tratadas como texto e como imagem (mesmas do AmazonNovaPro)
+TEXT_EXTENSIONS = ('.csv', '.txt', '.json')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+IMAGE_FORMATS = {'png': 'png', 'jpg': 'jpeg', 'jpeg': 'jpeg', 'gif': 'gif', 'webp': 'webp'}
+# Versão do processamento: muda a chave quando as regras de redução mudam
+PROCESSING_VERSION = 'v2'
+# Limites da recompressão de imagens acima do orçamento de bytes
+MIN_JPEG_QUALITY = 40
+MIN_IMAGE_SIDE = 64
+
+KIND_TEXT = 'text'
+KIND_IMAGE = 'image'
+KIND_BINARY = 'binary'
+
+
+class Attachment:
+    """Anexo pronto para a requisição: texto ou base64, com o formato da imagem."""
+
+    __slots__ = ('kind', 'data', 'format', 'original_bytes', 'note')
+
+    def __init__(self, kind, data, format=None, original_bytes=0, note=None):
+        self.kind = kind
+        self.data = data
+        self.format = format
+        self.original_bytes = original_bytes
+        self.note = note
+
+    @property
+    def size(self) -> int:
+        """Tamanho do conteúdo em caracteres (o que ocupa na memória e na requisição)."""
+        return len(self.data)
+
+    def to_dict(self) -> dict:
+        return {'kind': self.kind, 'data': self.data, 'format': self.format,
+                'original_bytes': self.original_bytes, 'note': self.note}
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(record['kind'], record['data'], record.get('format'), record.get('original_bytes', 0),
+                   record.get('note'))
+
+
+def sample_csv(text, max_rows, max_chars):
+    """
+    Reduz um CSV grande mantendo o cabeçalho, as primeiras linhas e uma amostra
+    sistemática (a cada k linhas) do restante, até caber nos limites.
+
+    Args:
+        text (str): Conteúdo do CSV.
+        max_rows (int): Linhas de dados máximas.
+        max_chars (int): Tamanho máximo do resultado, em caracteres.
+
+    Returns:
+        tuple: (CSV reduzido, nota descrevendo a amostra ou None se não reduziu).
+    """
+    lines = text.splitlines()
+    if len(lines) <= 1 or (len(lines) - 1 <= max_rows and len(text) <= max_chars):
+        return text, None
+
+    header, rows = lines[0], lines[1:]
+    # Tamanho médio das linhas define quantas cabem no orçamento de caracteres
+    average = max(1, (len(text) - len(header)) // len(rows))
+    budget = max(1, min(max_rows, (max_chars - len(header)) // (average + 1)))
+    head = rows[:budget // 4]
+    rest = rows[len(head):]
+    remaining = budget - len(head)
+    step = max(1, -(-len(rest) // remaining)) if remaining else len(rest) + 1
+    kept = head + rest[::step][:remaining]
+
+    # Linhas muito desiguais: corta no limite de caracteres sem quebrar linhas
+    output, size = [header], len(header)
+    for row in kept:
+        if size + len(row) + 1 > max_chars:
+            break
+        output.append(row)
+        size += len(row) + 1
+    note = (f"[amostra: {len(output) - 1} de {len(rows)} linhas; primeiras {min(len(head), len(output) - 1)} "
+            f"e depois 1 a cada {step}]")
+    return '\n'.join(output), note
+
+
+def _csv_is_valid(text):
+    """Confere se o CSV reduzido continua parseável (cabeçalho com as mesmas colunas)."""
+    try:
+        rows = list(csv.reader(io.StringIO(text)))
+    except csv.Error:
+        return False
+    return bool(rows) and all(len(row) == len(rows[0]) for row in rows[:50])
+
+
+class AttachmentCache:
+    """
+    Cache de anexos codificados, endereçado pelo conteúdo.
+
+    - Chave: hash SHA-256 do conteúdo (mais as regras de redução), então o mesmo gráfico
+      ou CSV anexado a várias análises é lido e codificado uma única vez, mesmo vindo de
+      caminhos diferentes. Um índice (caminho, mtime, tamanho) -> hash evita reler
+      arquivos que não mudaram.
+    - LRU em memória limitado por quantidade e por tamanho; nível opcional em disco
+      (um JSON por chave) para reaproveitar entre processos ou invocações frias.
+    - Imagens acima do orçamento de pixels ou bytes são redimensionadas e recomprimidas
+      (Pillow opcional; sem ele a imagem segue original). CSVs grandes são amostrados.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, disk_dir=None,
+                 max_image_pixels=2_000_000, max_image_bytes=1_500_000, jpeg_quality=85,
+                 max_csv_rows=2_000, max_csv_chars=200_000):
+        """
+        Args:
+            max_entries (int): Anexos máximos em memória.
+            max_bytes (int): Tamanho máximo somado dos anexos em memória.
+            disk_dir (str): Diretório do nível em disco (opcional).
+            max_image_pixels (int): Pixels máximos de uma imagem (largura x altura).
+            max_image_bytes (int): Bytes máximos de uma imagem antes do base64.
+            jpeg_quality (int): Qualidade da recompressão em JPEG.
+            max_csv_rows (int): Linhas de dados máximas de um CSV.
+            max_csv_chars (int): Caracteres máximos de um CSV.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_image_pixels = max_image_pixels
+        self.max_image_bytes = max_image_bytes
+        self.jpeg_quality = jpeg_quality
+        self.max_csv_rows = max_csv_rows
+        self.max_csv_chars = max_csv_chars
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._paths = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._warned_pillow = False
+        self._metrics = {'lookups': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0,
+                         'reduced': 0, 'bytes_in': 0, 'bytes_out': 0, 'encode_seconds': 0.0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _key(self, data, extension):
+        digest = hashlib.sha256(data)
+        options = (PROCESSING_VERSION, extension, self.max_image_pixels, self.max_image_bytes, self.jpeg_quality,
+                   self.max_csv_rows, self.max_csv_chars)
+        digest.update(repr(options).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _remember(self, key, attachment):
+        """Insere no LRU e despeja os menos usados além dos limites (com o lock adquirido)."""
+        previous = self._entries.pop(key, None)
+        if previous:
+            self._bytes -= previous.size
+        self._entries[key] = attachment
+        self._bytes += attachment.size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._metrics['evictions'] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.json')
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as file:
+                return Attachment.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key, attachment):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(attachment.to_dict(), file)
+            # Troca atômica: leitores de outros processos nunca veem um arquivo pela metade
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"[WARNING][ATTACHMENT] Falha ao gravar o cache em disco: {e}")
+
+    def _reduce_image(self, data, image_format):
+        """Redimensiona/recomprime a imagem se passar do orçamento: (bytes, formato, nota)."""
+        try:
+            from PIL import Image
+        except ImportError:
+            if not self._warned_pillow:
+                print("[WARNING][ATTACHMENT] Pillow não instalado: imagens acima do orçamento seguem sem redução.")
+                self._warned_pillow = True
+            return data, image_format, None
+
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                return self._reduce_loaded_image(Image, image, data, image_format)
+        except (Image.UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            # Imagem que o Pillow não decodifica: segue original, como sem o Pillow
+            print(f"[WARNING][ATTACHMENT] Imagem não decodificada ({e}); segue sem redução.")
+            return data, image_format, None
+
+    def _reduce_loaded_image(self, Image, image, data, image_format):
+        """
+        Reduz uma imagem aberta até caber em `max_image_pixels` e `max_image_bytes`.
+
+        Depois da escala pelo orçamento de pixels, recomprime baixando a qualidade do JPEG
+        (até MIN_JPEG_QUALITY) e, se ainda não couber, reduz a escala a cada tentativa. Uma
+        imagem que não cabe nem com MIN_IMAGE_SIDE pixels no menor lado segue com a menor
+        versão obtida.
+        """
+        width, height = image.size
+        if width * height <= self.max_image_pixels and len(data) <= self.max_image_bytes:
+            return data, image_format, None
+        if getattr(image, 'is_animated', False):
+            # GIF animado: reduzir exigiria recompor os quadros; segue original
+            return data, image_format, None
+        source = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        # Transparência real: mantém PNG (otimizado); o resto vira JPEG
+        transparent = source.mode == 'RGBA' and source.getextrema()[3][0] < 255
+        if not transparent:
+            source = source.convert('RGB')
+        scale = min(1.0, (self.max_image_pixels / (width * height)) ** 0.5)
+        quality = self.jpeg_quality
+        while True:
+            resized = source
+            if scale < 1.0:
+                resized = source.resize((max(1, int(width * scale)), max(1, int(height * scale))),
+                                        Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            if transparent:
+                resized.save(output, format='PNG', optimize=True)
+            else:
+                resized.save(output, format='JPEG', quality=quality, optimize=True)
+            reduced = output.getvalue()
+            if len(reduced) <= self.max_image_bytes or min(resized.size) <= MIN_IMAGE_SIDE:
+                break
+            if not transparent and quality > MIN_JPEG_QUALITY:
+                quality = max(MIN_JPEG_QUALITY, quality - 15)
+            else:
+                # Escala proporcional ao excesso de bytes (com folga), no mínimo 10% menor por passo
+                scale *= min(0.9, (self.max_image_bytes / len(reduced)) ** 0.5 * 0.95)
+        if len(reduced) >= len(data) and scale == 1.0:
+            return data, image_format, None
+        if len(reduced) > self.max_image_bytes:
+            print(f"[WARNING][ATTACHMENT] Imagem acima de {self.max_image_bytes} bytes mesmo reduzida "
+                  f"({len(reduced)} bytes).")
+        note = f"[imagem reduzida de {width}x{height} ({len(data)} bytes) para {resized.size[0]}x{resized.size[1]} " \
+               f"({len(reduced)} bytes)]"
+        return reduced, 'png' if transparent else 'jpeg', note
+
+    def _encode(self, data, file_name):
+        """Converte o conteúdo bruto no anexo da requisição, aplicando os orçamentos."""
+        lower = file_name.lower()
+        if lower.endswith(TEXT_EXTENSIONS):
+            # Mesmas quebras de linha da leitura em modo texto (newlines universais)
+            text = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+            note = None
+            if lower.endswith('.csv'):
+                sampled, note = sample_csv(text, self.max_csv_rows, self.max_csv_chars)
+                if note and _csv_is_valid(sampled):
+                    text = sampled
+                elif note:
+                    # CSV com campos multilinha: amostrar por linha o corromperia; corta no limite
+                    text, note = text[:self.max_csv_chars], f"[CSV truncado em {self.max_csv_chars} caracteres]"
+            return Attachment(KIND_TEXT, text, original_bytes=len(data), note=note)
+        if lower.endswith(IMAGE_EXTENSIONS):
+            image_format = IMAGE_FORMATS[lower.rsplit('.', 1)[-1]]
+            reduced, image_format, note = self._reduce_image(data, image_format)
+            return Attachment(KIND_IMAGE, base64.b64encode(reduced).decode('utf-8'), image_format,
+                              original_bytes=len(data), note=note)
+        return Attachment(KIND_BINARY, base64.b64encode(data).decode('utf-8'), original_bytes=len(data))
+
+    def load(self, file_path) -> Attachment:
+        """
+        Retorna o anexo codificado de um arquivo, do cache quando possível.
+
+        Args:
+            file_path (str): Caminho do arquivo.
+
+        Returns:
+            Attachment: Conteúdo pronto para a requisição.
+
+        Raises:
+            OSError: Se o arquivo não puder ser lido.
+        """
+        stat = os.stat(file_path)
+        path_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            self._metrics['lookups'] += 1
+            key = self._paths.get(path_key)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._metrics['memory_hits'] += 1
+                return self._entries[key]
+
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        extension = os.path.splitext(file_path)[1].lower()
+        key = self._key(data, extension)
+        with self._lock:
+            self._paths[path_key] = key
+            if len(self._paths) > self.max_entries * 4:
+                # Índice de caminhos limitado: versões antigas de arquivos alterados saem primeiro
+                self._paths.popitem(last=False)
+            attachment = self._entries.get(key)
+            if attachment:
+                # Mesmo conteúdo já carregado por outro caminho
+                self._entries.move_to_end(key)
+                self._metrics['memory_hits'] += 1
+                return attachment
+
+        attachment = self._read_disk(key)
+        if attachment:
+            with self._lock:
+                self._metrics['disk_hits'] += 1
+                self._remember(key, attachment)
+            return attachment
+
+        start = time.perf_counter()
+        attachment = self._encode(data, os.path.basename(file_path))
+        with self._lock:
+            self._metrics['misses'] += 1
+            self._metrics['encode_seconds'] += time.perf_counter() - start
+            self._metrics['bytes_in'] += len(data)
+            self._metrics['bytes_out'] += attachment.size
+            if attachment.note:
+                self._metrics['reduced'] += 1
+            self._remember(key, attachment)
+        self._write_disk(key, attachment)
+        if attachment.note:
+            print(f"[DEBUG][ATTACHMENT] {os.path.basename(file_path)}: {attachment.note}")
+        return attachment
+
+    def clear(self):
+        """Esvazia o nível em memória (o nível em disco é mantido)."""
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
+            self._bytes = 0
+
+    def get_metrics(self) -> dict:
+        """
+        Returns:
+            dict: Acertos (memória/disco), faltas, despejos, reduções e taxa de acerto.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['entries'] = len(self._entries)
+            metrics['memory_bytes'] = self._bytes
+        hits = metrics['memory_hits'] + metrics['disk_hits']
+        metrics['hit_rate'] = hits / metrics['lookups'] if metrics['lookups'] else 0.0
+        return metrics
+
+
+# Cache único do processo, compartilhado por todas as instâncias do AmazonNovaPro
+ATTACHMENT_CACHE = AttachmentCache(disk_dir=os.getenv('NOVA_PRO_ATTACHMENT_CACHE_DIR') or None)
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m utils.attachment_cache (imagens exigem Pillow)
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    csv_path = os.path.join(directory, 'export.csv')
+    with open(csv_path, 'w', encoding='utf-8') as file:
+        file.write('session_id,timestamp,topic,sentiment,duration_s\n')
+        file.writelines(f'session-{index},2025-01-{index % 28 + 1:02d}T10:00:00,topic-{index % 17},'
+                        f'{("positive", "neutral", "negative")[index % 3]},{index % 600}\n' for index in range(200_000))
+    paths = [csv_path]
+    try:
+        from PIL import Image
+
+        image_path = os.path.join(directory, 'chart.png')
+        # Ruído em cada canal: comprime mal, como uma foto (e não como uma cor sólida)
+        channels = [Image.effect_noise((3000, 2000), sigma) for sigma in (20, 40, 60)]
+        Image.merge('RGB', channels).save(image_path)
+        paths.append(image_path)
+    except ImportError:
+        print("Pillow não instalado: benchmark só com CSV.")
+
+    cache = AttachmentCache(disk_dir=os.path.join(directory, 'cache'))
+    for path in paths:
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        attachment = cache.load(path)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.load(path)
+        warm = (time.perf_counter() - start) / 100
+        cache.clear()
+        start = time.perf_counter()
+        cache.load(path)
+        disk = time.perf_counter() - start
+        print(f"{os.path.basename(path)}: {size} bytes -> {attachment.size} caracteres na requisição; "
+              f"frio {cold * 1000:.1f} ms, memória {warm * 1e6:.1f} µs, disco {disk * 1000:.1f} ms")
+    print(cache.get_metrics())
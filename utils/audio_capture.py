@@ -0,0 +1,212 @@
+import asyncio
+import collections
+import threading
+import time
+
+from utils.audio_io import AudioSource, INPUT_SAMPLE_RATE, SAMPLE_WIDTH, CHANNELS
+from utils.metrics import percentile
+
+# Quantidade de frames por leitura do dispositivo (64 ms a 16 kHz)
+CHUNK_FRAMES = 1024
+
+
+class _QueuedCaptureSource(AudioSource):
+    """
+    Base das fontes de captura: o áudio chega por uma thread (callback do PyAudio
+    ou thread leitora dedicada) e é entregue ao loop de eventos por uma fila
+    assíncrona, de modo que o loop nunca bloqueia em I/O de dispositivo.
+    """
+
+    def __init__(self, chunk_frames=CHUNK_FRAMES, max_queued_chunks=32, **kwargs):
+        """
+        Args:
+            chunk_frames (int): Frames por chunk capturado.
+            max_queued_chunks (int): Limite da fila; acima dele o chunk mais antigo é descartado.
+            **kwargs: Parâmetros de formato repassados para `AudioSource`.
+        """
+        super().__init__(**kwargs)
+        self.chunk_frames = chunk_frames
+        self.chunk_bytes = chunk_frames * self.sample_width * self.channels
+        self.max_queued_chunks = max_queued_chunks
+        self.dropped_chunks = 0
+        self.capture_to_send = collections.deque(maxlen=1000)
+        self._loop = None
+        self._queue = None
+        self._stopped = False
+
+    def _enqueue(self, data, captured_at):
+        """Executado no loop de eventos: enfileira o chunk, descartando o mais antigo se cheio."""
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped_chunks += 1
+        self._queue.put_nowait((data, captured_at))
+
+    def _publish(self, data):
+        """Chamado pela thread de captura: entrega o chunk ao loop de forma thread-safe."""
+        if not self._stopped:
+            self._loop.call_soon_threadsafe(self._enqueue, data, time.perf_counter())
+
+    def _open(self):
+        """Abre o dispositivo ou inicia a thread de captura. Deve ser implementado pelas subclasses."""
+        raise NotImplementedError
+
+    def _close(self):
+        """Fecha o dispositivo ou encerra a thread de captura."""
+
+    def stop(self):
+        """Encerra a captura; a iteração termina após o chunk atual."""
+        self._stopped = True
+        if self._queue is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (None, None))
+
+    async def _chunks(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queued_chunks + 1)
+        self._stopped = False
+        self._open()
+        try:
+            while not self._stopped:
+                data, captured_at = await self._queue.get()
+                if data is None:
+                    break
+                yield data
+                # Retomado depois que o consumidor enviou o chunk
+                self.capture_to_send.append(time.perf_counter() - captured_at)
+        finally:
+            self._stopped = True
+            self._close()
+
+    def stats(self) -> dict:
+        """
+        Retorna as estatísticas da captura.
+
+        Returns:
+            dict: Latência captura→envio (p50/p99, ms) e chunks descartados.
+        """
+        latencies = list(self.capture_to_send)
+        return {
+            'capture_to_send_p50_ms': percentile(latencies, 50) * 1000,
+            'capture_to_send_p99_ms': percentile(latencies, 99) * 1000,
+            'dropped_chunks': self.dropped_chunks,
+        }
+
+
+class MicrophoneSource(_QueuedCaptureSource):
+    """
+    Fonte de áudio do microfone usando o modo callback do PyAudio: a biblioteca
+    chama o callback na sua própria thread a cada buffer capturado.
+    """
+
+    def __init__(self, chunk_frames=CHUNK_FRAMES, sample_rate=INPUT_SAMPLE_RATE, channels=CHANNELS, **kwargs):
+        super().__init__(chunk_frames=chunk_frames, sample_rate=sample_rate, sample_width=SAMPLE_WIDTH,
+                         channels=channels, **kwargs)
+        self._pyaudio = None
+        self._stream = None
+
+    def _open(self):
+        import pyaudio
+
+        def callback(in_data, frame_count, time_info, status):
+            self._publish(in_data)
+            return None, pyaudio.paContinue
+
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.sample_rate,
+            input=True,
+            frames_per_buffer=self.chunk_frames,
+            stream_callback=callback,
+        )
+        self._stream.start_stream()
+
+    def _close(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+
+
+class ThreadedCaptureSource(_QueuedCaptureSource):
+    """
+    Fonte que executa uma função de leitura bloqueante em uma thread dedicada
+    (para dispositivos ou APIs sem modo callback).
+    """
+
+    def __init__(self, read_chunk, **kwargs):
+        """
+        Args:
+            read_chunk (callable): Função bloqueante que retorna o próximo chunk de PCM
+                (ou bytes vazios/None para encerrar).
+            **kwargs: Parâmetros repassados para `_QueuedCaptureSource`.
+        """
+        super().__init__(**kwargs)
+        self.read_chunk = read_chunk
+        self._thread = None
+
+    def _open(self):
+        def reader():
+            while not self._stopped:
+                data = self.read_chunk()
+                if not data:
+                    self._loop.call_soon_threadsafe(self.stop)
+                    break
+                self._publish(data)
+
+        self._thread = threading.Thread(target=reader, name='audio-capture', daemon=True)
+        self._thread.start()
+
+
+# --- Bloco de Benchmark ---
+# Compara o loop antigo (leitura bloqueante + sleep dentro do loop de eventos) com a
+# captura em thread, usando um dispositivo simulado que bloqueia pelo tempo de um chunk.
+if __name__ == "__main__":
+    from utils.metrics import LoopLagMonitor
+
+    chunk_seconds = CHUNK_FRAMES / INPUT_SAMPLE_RATE
+    n_chunks = 40
+
+    def fake_device_read():
+        time.sleep(chunk_seconds)
+        return bytes(CHUNK_FRAMES * SAMPLE_WIDTH)
+
+    async def fake_send(chunk):
+        await asyncio.sleep(0)
+
+    async def legacy():
+        latencies = []
+        for _ in range(n_chunks):
+            captured_at = time.perf_counter()
+            data = fake_device_read()
+            await fake_send(data)
+            latencies.append(time.perf_counter() - captured_at - chunk_seconds)
+            await asyncio.sleep(0.01)
+        return {'capture_to_send_p50_ms': percentile(latencies, 50) * 1000,
+                'capture_to_send_p99_ms': percentile(latencies, 99) * 1000}
+
+    async def threaded():
+        reads = iter(range(n_chunks))
+        source = ThreadedCaptureSource(lambda: next(reads, None) is not None and fake_device_read())
+        async for chunk in source:
+            await fake_send(chunk)
+        return source.stats()
+
+    async def measure(name, scenario):
+        monitor = LoopLagMonitor()
+        monitor.start()
+        capture = await scenario()
+        lag = await monitor.stop()
+        print(f"[BENCH] {name:<10} lag do loop p50={lag['lag_p50_ms']:.1f} ms p99={lag['lag_p99_ms']:.1f} ms "
+              f"max={lag['lag_max_ms']:.1f} ms | captura→envio p50={capture['capture_to_send_p50_ms']:.2f} ms "
+              f"p99={capture['capture_to_send_p99_ms']:.2f} ms")
+
+    async def main():
+        print(f"--- Benchmark de captura ({n_chunks} chunks de {chunk_seconds * 1000:.0f} ms) ---")
+        await measure('bloqueante', legacy)
+        await measure('thread', threaded)
+
+    asyncio.run(main())
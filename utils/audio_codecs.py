@@ -0,0 +1,256 @@
+import struct
+
+import numpy as np
+
+from utils.audio_io import wav_header, OUTPUT_SAMPLE_RATE
+
+# Formatos de saída aceitos em `output_format`
+FORMAT_WAV = 'wav'              # PCM 16 bits na taxa original (24 kHz)
+FORMAT_MULAW = 'mulaw'          # G.711 μ-law, 8 bits por amostra
+FORMAT_ALAW = 'alaw'            # G.711 A-law, 8 bits por amostra
+FORMAT_IMA_ADPCM = 'ima_adpcm'  # IMA-ADPCM, 4 bits por amostra
+FORMAT_PCM_16K = 'pcm_16k'      # PCM 16 bits reamostrado para 16 kHz
+FORMAT_PCM_8K = 'pcm_8k'        # PCM 16 bits reamostrado para 8 kHz
+OUTPUT_FORMATS = (FORMAT_WAV, FORMAT_MULAW, FORMAT_ALAW, FORMAT_IMA_ADPCM, FORMAT_PCM_16K, FORMAT_PCM_8K)
+
+_WAV_FORMAT_ALAW = 6
+_WAV_FORMAT_MULAW = 7
+_WAV_FORMAT_IMA_ADPCM = 0x11
+
+# --- G.711 ---
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 8159
+_MULAW_ENCODE_BIAS = 0x21
+_MULAW_SEGMENT_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], dtype=np.int32)
+_ALAW_SEGMENT_END = np.array([0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF, 0x3FFF, 0x7FFF], dtype=np.int32)
+
+# --- IMA-ADPCM ---
+_IMA_STEPS = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45, 50, 55, 60, 66, 73, 80,
+    88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230, 253, 279, 307, 337, 371, 408, 449, 494, 544,
+    598, 658, 724, 796, 876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749,
+    3024, 3327, 3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487, 12635,
+    13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767,
+], dtype=np.int32)
+_IMA_INDEX_ADJUST = np.array([-1, -1, -1, -1, 2, 4, 6, 8] * 2, dtype=np.int32)
+IMA_BLOCK_ALIGN = 512  # bytes por bloco (mono): 4 de cabeçalho + 2 amostras por byte
+
+
+def _samples(pcm_bytes):
+    return np.frombuffer(pcm_bytes, dtype='<i2').astype(np.int32)
+
+
+def encode_mulaw(pcm_bytes) -> bytes:
+    """
+    Codifica PCM de 16 bits em G.711 μ-law.
+
+    Args:
+        pcm_bytes (bytes | memoryview): PCM de 16 bits.
+
+    Returns:
+        bytes: Uma amostra μ-law (8 bits) por amostra de entrada.
+    """
+    # Mesmo algoritmo da referência G.711 (14 bits de magnitude)
+    x = _samples(pcm_bytes) >> 2
+    mask = np.where(x < 0, 0x7F, 0xFF)
+    value = np.minimum(np.abs(x), _MULAW_CLIP) + _MULAW_ENCODE_BIAS
+    segment = np.searchsorted(_MULAW_SEGMENT_END, value)
+    code = (np.minimum(segment, 7) << 4) | ((value >> np.minimum(segment + 1, 15)) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return ((code ^ mask) & 0xFF).astype(np.uint8).tobytes()
+
+
+def decode_mulaw(ulaw_bytes) -> bytes:
+    """Decodifica G.711 μ-law para PCM de 16 bits."""
+    u = ~np.frombuffer(ulaw_bytes, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    magnitude = (((u & 0x0F) << 3) + _MULAW_BIAS) << exponent
+    return np.where(u & 0x80, _MULAW_BIAS - magnitude, magnitude - _MULAW_BIAS).astype('<i2').tobytes()
+
+
+def encode_alaw(pcm_bytes) -> bytes:
+    """
+    Codifica PCM de 16 bits em G.711 A-law.
+
+    Args:
+        pcm_bytes (bytes | memoryview): PCM de 16 bits.
+
+    Returns:
+        bytes: Uma amostra A-law (8 bits) por amostra de entrada.
+    """
+    x = _samples(pcm_bytes)
+    mask = np.where(x >= 0, 0xD5, 0x55)
+    value = np.where(x >= 0, x, -x - 1)
+    segment = np.searchsorted(_ALAW_SEGMENT_END, value)
+    shift = np.where(segment < 2, 4, segment + 3)
+    code = (np.minimum(segment, 7) << 4) | ((value >> np.minimum(shift, 15)) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return ((code ^ mask) & 0xFF).astype(np.uint8).tobytes()
+
+
+def decode_alaw(alaw_bytes) -> bytes:
+    """Decodifica G.711 A-law para PCM de 16 bits."""
+    a = np.frombuffer(alaw_bytes, dtype=np.uint8).astype(np.int32) ^ 0x55
+    segment = (a & 0x70) >> 4
+    t = ((a & 0x0F) << 4) + np.where(segment == 0, 8, 0x108)
+    t = np.where(segment > 1, t << np.maximum(segment - 1, 0), t)
+    return np.where(a & 0x80, t, -t).astype('<i2').tobytes()
+
+
+def encode_ima_adpcm(pcm_bytes, block_align=IMA_BLOCK_ALIGN):
+    """
+    Codifica PCM de 16 bits mono em IMA-ADPCM no layout de blocos do WAV.
+
+    O ADPCM é sequencial dentro de um bloco (cada amostra depende do preditor da
+    anterior), mas os blocos do WAV são independentes: cada um começa com o preditor
+    e o índice de passo no cabeçalho. O laço percorre as posições dentro do bloco e
+    processa todos os blocos de uma vez como vetores, então o custo em Python é fixo
+    (amostras por bloco) e não cresce com a duração do áudio.
+
+    Args:
+        pcm_bytes (bytes | memoryview): PCM de 16 bits mono.
+        block_align (int): Bytes por bloco.
+
+    Returns:
+        tuple: (bytes codificados, amostras por bloco, quantidade real de amostras).
+    """
+    samples_per_block = (block_align - 4) * 2 + 1
+    x = _samples(pcm_bytes)
+    n_samples = len(x)
+    n_blocks = max(1, -(-n_samples // samples_per_block))
+    # O último bloco é completado repetindo a última amostra; o chunk 'fact' guarda o tamanho real
+    padded = np.full(n_blocks * samples_per_block, x[-1] if n_samples else 0, dtype=np.int32)
+    padded[:n_samples] = x
+    blocks = padded.reshape(n_blocks, samples_per_block)
+
+    predictor = blocks[:, 0].copy()
+    # Índice inicial estimado pela variação no começo de cada bloco
+    initial_delta = np.abs(np.diff(blocks[:, :9], axis=1)).mean(axis=1)
+    index = np.clip(np.searchsorted(_IMA_STEPS, initial_delta) - 2, 0, 88).astype(np.int32)
+    header_index = index.copy()
+
+    codes = np.empty((n_blocks, samples_per_block - 1), dtype=np.uint8)
+    for n in range(1, samples_per_block):
+        step = _IMA_STEPS[index]
+        diff = blocks[:, n] - predictor
+        code = np.where(diff < 0, 8, 0)
+        diff = np.abs(diff)
+        delta = step >> 3
+        for bit, scale in ((4, 0), (2, 1), (1, 2)):
+            part = step >> scale
+            hit = diff >= part
+            code |= np.where(hit, bit, 0)
+            diff = np.where(hit, diff - part, diff)
+            delta = np.where(hit, delta + part, delta)
+        predictor = np.clip(np.where(code & 8, predictor - delta, predictor + delta), -32768, 32767)
+        index = np.clip(index + _IMA_INDEX_ADJUST[code], 0, 88)
+        codes[:, n - 1] = code
+
+    headers = np.zeros((n_blocks, 4), dtype=np.uint8)
+    headers[:, :2] = blocks[:, 0].astype('<i2').view(np.uint8).reshape(n_blocks, 2)
+    headers[:, 2] = header_index
+    packed = codes[:, 0::2] | (codes[:, 1::2] << 4)
+    return np.hstack((headers, packed)).tobytes(), samples_per_block, n_samples
+
+
+def decode_ima_adpcm(adpcm_bytes, n_samples, block_align=IMA_BLOCK_ALIGN) -> bytes:
+    """Decodifica IMA-ADPCM mono (layout de blocos do WAV) para PCM de 16 bits."""
+    samples_per_block = (block_align - 4) * 2 + 1
+    raw = np.frombuffer(adpcm_bytes, dtype=np.uint8).reshape(-1, block_align)
+    predictor = raw[:, :2].copy().view('<i2').ravel().astype(np.int32)
+    index = raw[:, 2].astype(np.int32)
+    codes = np.empty((len(raw), samples_per_block - 1), dtype=np.int32)
+    codes[:, 0::2] = raw[:, 4:] & 0x0F
+    codes[:, 1::2] = raw[:, 4:] >> 4
+
+    output = np.empty((len(raw), samples_per_block), dtype=np.int32)
+    output[:, 0] = predictor
+    for n in range(1, samples_per_block):
+        step = _IMA_STEPS[index]
+        code = codes[:, n - 1]
+        delta = (step >> 3) + np.where(code & 4, step, 0) + np.where(code & 2, step >> 1, 0) \
+            + np.where(code & 1, step >> 2, 0)
+        predictor = np.clip(np.where(code & 8, predictor - delta, predictor + delta), -32768, 32767)
+        index = np.clip(index + _IMA_INDEX_ADJUST[code], 0, 88)
+        output[:, n] = predictor
+    return output.ravel()[:n_samples].astype('<i2').tobytes()
+
+
+def encode_response_audio(pcm_bytes, output_format=FORMAT_WAV, sample_rate=OUTPUT_SAMPLE_RATE) -> bytes:
+    """
+    Codifica o PCM de resposta (16 bits mono) como um WAV no formato pedido.
+
+    Args:
+        pcm_bytes (bytes | memoryview): PCM de 16 bits mono.
+        output_format (str): Um dos `OUTPUT_FORMATS`.
+        sample_rate (int): Taxa do PCM de entrada em Hz.
+
+    Returns:
+        bytes: Arquivo WAV completo (cabeçalho + dados).
+
+    Raises:
+        ValueError: Se o formato for desconhecido.
+    """
+    if output_format == FORMAT_WAV:
+        return wav_header(len(pcm_bytes), sample_rate) + bytes(pcm_bytes)
+    if output_format == FORMAT_MULAW:
+        data = encode_mulaw(pcm_bytes)
+        return wav_header(len(data), sample_rate, bits_per_sample=8, format_tag=_WAV_FORMAT_MULAW,
+                          fact_samples=len(data)) + data
+    if output_format == FORMAT_ALAW:
+        data = encode_alaw(pcm_bytes)
+        return wav_header(len(data), sample_rate, bits_per_sample=8, format_tag=_WAV_FORMAT_ALAW,
+                          fact_samples=len(data)) + data
+    if output_format == FORMAT_IMA_ADPCM:
+        data, samples_per_block, n_samples = encode_ima_adpcm(pcm_bytes)
+        return wav_header(len(data), sample_rate, bits_per_sample=4, format_tag=_WAV_FORMAT_IMA_ADPCM,
+                          block_align=IMA_BLOCK_ALIGN, fmt_extra=struct.pack('<H', samples_per_block),
+                          fact_samples=n_samples) + data
+    if output_format in (FORMAT_PCM_16K, FORMAT_PCM_8K):
+        from utils.resampler import PCMNormalizer
+
+        out_rate = 16000 if output_format == FORMAT_PCM_16K else 8000
+        normalizer = PCMNormalizer(sample_rate, 2, 1, out_rate=out_rate)
+        data = normalizer.process(pcm_bytes) + normalizer.flush()
+        return wav_header(len(data), out_rate) + data
+    raise ValueError(f"Formato de saída desconhecido: {output_format} (use um de {OUTPUT_FORMATS}).")
+
+
+# --- Bloco de Benchmark ---
+# Tamanho, tempo de codificação e SNR de cada formato para 10 s de voz sintética a 24 kHz.
+if __name__ == "__main__":
+    import base64
+    import time
+
+    rate = OUTPUT_SAMPLE_RATE
+    t = np.arange(rate * 10) / rate
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 2 * t)
+    voice = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((150, 300, 450, 900, 1800), 1))
+    pcm = (8000 * envelope * voice).astype('<i2').tobytes()
+    reference = np.frombuffer(pcm, dtype='<i2').astype(np.float64)
+
+    def snr(decoded):
+        got = np.frombuffer(decoded, dtype='<i2').astype(np.float64)[:len(reference)]
+        noise = np.mean((got - reference[:len(got)]) ** 2)
+        return 10 * np.log10(np.mean(reference ** 2) / max(noise, 1e-12))
+
+    print(f"--- Benchmark de formatos de saída (10 s a {rate} Hz, {len(pcm) / 1024:.0f} KB de PCM) ---")
+    for output_format in OUTPUT_FORMATS:
+        started_at = time.perf_counter()
+        wav = encode_response_audio(pcm, output_format)
+        elapsed = time.perf_counter() - started_at
+        payload = len(base64.b64encode(wav))
+
+        data = wav[wav.find(b'data') + 8:]
+        if output_format == FORMAT_MULAW:
+            quality = f"SNR {snr(decode_mulaw(data)):.1f} dB"
+        elif output_format == FORMAT_ALAW:
+            quality = f"SNR {snr(decode_alaw(data)):.1f} dB"
+        elif output_format == FORMAT_IMA_ADPCM:
+            quality = f"SNR {snr(decode_ima_adpcm(data, len(reference))):.1f} dB"
+        elif output_format == FORMAT_WAV:
+            quality = "sem perdas"
+        else:
+            quality = "banda limitada"
+        print(f"[BENCH] {output_format:<10} {len(wav) / 1024:>7.0f} KB ({len(wav) / len(pcm):>5.0%}) | "
+              f"base64 {payload / 1024:>7.0f} KB | codificação {elapsed * 1000:>6.1f} ms | {quality}")
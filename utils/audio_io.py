@@ -0,0 +1,292 @@
+import asyncio
+import inspect
+import struct
+import wave
+
+# Configuração padrão do áudio de entrada e saída do Nova Sonic
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+SAMPLE_WIDTH = 2  # 16 bits
+CHANNELS = 1
+CHUNK_BYTES = 1024 * SAMPLE_WIDTH * CHANNELS
+# Cabeçalho RIFF/WAVE mínimo para PCM (RIFF + fmt + data)
+WAV_HEADER_BYTES = 44
+WAV_FORMAT_PCM = 1
+
+
+def wav_header(data_bytes, sample_rate, channels=CHANNELS, bits_per_sample=16, format_tag=WAV_FORMAT_PCM,
+               block_align=None, fmt_extra=b'', fact_samples=None) -> bytes:
+    """
+    Monta o cabeçalho de um arquivo WAV em memória.
+
+    Args:
+        data_bytes (int): Tamanho do chunk de dados em bytes.
+        sample_rate (int): Taxa de amostragem em Hz.
+        channels (int): Número de canais.
+        bits_per_sample (int): Bits por amostra (4 para IMA-ADPCM).
+        format_tag (int): Codec do WAV (1 = PCM, 6 = A-law, 7 = μ-law, 0x11 = IMA-ADPCM).
+        block_align (int): Bytes por bloco; por padrão, bytes por frame.
+        fmt_extra (bytes): Campos extras do chunk 'fmt ' (codecs não-PCM).
+        fact_samples (int): Quantidade de amostras para o chunk 'fact' (codecs comprimidos).
+
+    Returns:
+        bytes: Cabeçalho terminando no início dos dados.
+    """
+    block_align = block_align or channels * bits_per_sample // 8
+    if format_tag == WAV_FORMAT_PCM:
+        byte_rate = sample_rate * block_align
+        fmt = struct.pack('<HHIIHH', format_tag, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+    else:
+        # Codecs comprimidos: taxa derivada das amostras por bloco e cbSize antes dos extras
+        samples_per_block = struct.unpack_from('<H', fmt_extra)[0] if fmt_extra else 1
+        byte_rate = sample_rate * block_align // samples_per_block
+        fmt = struct.pack('<HHIIHHH', format_tag, channels, sample_rate, byte_rate, block_align,
+                          bits_per_sample, len(fmt_extra)) + fmt_extra
+    chunks = b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    if fact_samples is not None:
+        chunks += b'fact' + struct.pack('<II', 4, fact_samples)
+    return (b'RIFF' + struct.pack('<I', 4 + len(chunks) + 8 + data_bytes) + b'WAVE' + chunks
+            + b'data' + struct.pack('<I', data_bytes))
+
+
+class AudioSource:
+    """
+    Fonte assíncrona de áudio PCM, consumida com `async for` pelo AmazonNovaSonicService.
+
+    Em modo `realtime` os chunks são entregues no ritmo da duração do áudio (como
+    um microfone); caso contrário, são entregues tão rápido quanto o stream aceitar.
+    """
+
+    def __init__(self, chunk_bytes=CHUNK_BYTES, sample_rate=INPUT_SAMPLE_RATE,
+                 sample_width=SAMPLE_WIDTH, channels=CHANNELS, realtime=False):
+        """
+        Args:
+            chunk_bytes (int): Tamanho de cada chunk entregue, em bytes.
+            sample_rate (int): Taxa de amostragem do PCM em Hz.
+            sample_width (int): Bytes por amostra.
+            channels (int): Número de canais.
+            realtime (bool): Se True, respeita o ritmo de tempo real do áudio.
+        """
+        self.chunk_bytes = chunk_bytes
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.realtime = realtime
+
+    @property
+    def bytes_per_second(self) -> int:
+        """Quantidade de bytes PCM correspondente a um segundo de áudio."""
+        return self.sample_rate * self.sample_width * self.channels
+
+    def _chunks(self):
+        """Gera os chunks brutos da fonte (gerador assíncrono). Deve ser implementado pelas subclasses."""
+        raise NotImplementedError
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        audio_seconds = 0.0
+
+        async for chunk in self._chunks():
+            if self.realtime:
+                # Agenda pelo relógio do loop para não acumular deriva entre chunks
+                delay = started_at + audio_seconds - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                audio_seconds += len(chunk) / self.bytes_per_second
+            yield chunk
+
+
+class PCMBytesSource(AudioSource):
+    """
+    Fonte a partir de PCM já em memória, como o retorno de `AudioProcessor.prepare_input_audio`
+    (para ingestão em streaming use `AsyncIteratorSource(processor.iter_input_audio(event))`).
+    """
+
+    def __init__(self, pcm_bytes, **kwargs):
+        """
+        Args:
+            pcm_bytes (bytes | bytearray | memoryview): Áudio PCM bruto.
+            **kwargs: Parâmetros de formato e ritmo repassados para `AudioSource`.
+        """
+        super().__init__(**kwargs)
+        self.pcm = memoryview(pcm_bytes)
+
+    async def _chunks(self):
+        for offset in range(0, len(self.pcm), self.chunk_bytes):
+            yield self.pcm[offset:offset + self.chunk_bytes]
+
+
+class WavFileSource(AudioSource):
+    """
+    Fonte a partir de um arquivo .wav, lido chunk a chunk.
+    """
+
+    def __init__(self, file_path, **kwargs):
+        """
+        Args:
+            file_path (str): Caminho do arquivo .wav (PCM mono, 16 bits).
+            **kwargs: Parâmetros de ritmo repassados para `AudioSource`.
+
+        Raises:
+            ValueError: Se o formato do arquivo não corresponder ao esperado pela fonte.
+        """
+        super().__init__(**kwargs)
+        self.file_path = file_path
+
+        with wave.open(file_path, 'rb') as wav_file:
+            file_format = (wav_file.getframerate(), wav_file.getsampwidth(), wav_file.getnchannels())
+        if file_format != (self.sample_rate, self.sample_width, self.channels):
+            raise ValueError(f"Formato do arquivo {file_path} não suportado: {file_format} "
+                             f"(esperado {(self.sample_rate, self.sample_width, self.channels)}).")
+
+    async def _chunks(self):
+        frames_per_chunk = self.chunk_bytes // (self.sample_width * self.channels)
+        with wave.open(self.file_path, 'rb') as wav_file:
+            while True:
+                data = wav_file.readframes(frames_per_chunk)
+                if not data:
+                    break
+                yield data
+
+
+class AsyncIteratorSource(AudioSource):
+    """
+    Fonte a partir de um iterável (síncrono ou assíncrono) que já produz chunks de PCM.
+    """
+
+    def __init__(self, iterable, **kwargs):
+        """
+        Args:
+            iterable: Iterável ou iterável assíncrono de chunks de PCM.
+            **kwargs: Parâmetros de formato e ritmo repassados para `AudioSource`.
+        """
+        super().__init__(**kwargs)
+        self.iterable = iterable
+
+    async def _chunks(self):
+        if hasattr(self.iterable, '__aiter__'):
+            async for chunk in self.iterable:
+                yield chunk
+        else:
+            for chunk in self.iterable:
+                yield chunk
+
+
+class AudioSink:
+    """
+    Destino assíncrono para o áudio PCM de resposta do modelo.
+    """
+
+    async def write(self, pcm_bytes):
+        """Recebe um trecho de PCM de resposta. Deve ser implementado pelas subclasses."""
+        raise NotImplementedError
+
+    async def close(self):
+        """Finaliza o destino. Por padrão não faz nada."""
+
+
+class BufferSink(AudioSink):
+    """
+    Acumula o áudio de resposta em memória.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    async def write(self, pcm_bytes):
+        self.buffer += pcm_bytes
+
+    def getvalue(self) -> bytes:
+        """Retorna o PCM acumulado."""
+        return bytes(self.buffer)
+
+
+class WavBufferSink(AudioSink):
+    """
+    Monta o WAV de resposta em memória: o PCM é copiado para um buffer pré-alocado
+    logo após espaço reservado para o cabeçalho, preenchido só ao final. O resultado
+    é uma view do WAV completo, sem passar pelo disco nem copiar o áudio de novo.
+    """
+
+    def __init__(self, sample_rate=OUTPUT_SAMPLE_RATE, sample_width=SAMPLE_WIDTH, channels=CHANNELS,
+                 initial_seconds=30):
+        """
+        Args:
+            sample_rate (int): Taxa de amostragem do PCM em Hz.
+            sample_width (int): Bytes por amostra.
+            channels (int): Número de canais.
+            initial_seconds (float): Duração pré-alocada; o buffer dobra se for excedida.
+        """
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self._buffer = bytearray(WAV_HEADER_BYTES + int(initial_seconds * sample_rate) * sample_width * channels)
+        self._end = WAV_HEADER_BYTES
+
+    async def write(self, pcm_bytes):
+        end = self._end + len(pcm_bytes)
+        if end > len(self._buffer):
+            self._buffer.extend(bytes(max(end, 2 * len(self._buffer)) - len(self._buffer)))
+        self._buffer[self._end:end] = pcm_bytes
+        self._end = end
+
+    @property
+    def pcm(self) -> memoryview:
+        """PCM acumulado (sem cabeçalho)."""
+        return memoryview(self._buffer)[WAV_HEADER_BYTES:self._end]
+
+    def getvalue(self) -> memoryview:
+        """
+        Retorna o WAV completo, com o cabeçalho preenchido para o áudio acumulado.
+
+        Returns:
+            memoryview: Cabeçalho + PCM, apontando para o buffer interno.
+        """
+        self._buffer[:WAV_HEADER_BYTES] = wav_header(self._end - WAV_HEADER_BYTES, self.sample_rate,
+                                                     self.channels, self.sample_width * 8)
+        return memoryview(self._buffer)[:self._end]
+
+
+class WavFileSink(AudioSink):
+    """
+    Grava o áudio de resposta em um arquivo .wav.
+    """
+
+    def __init__(self, file_path, sample_rate=OUTPUT_SAMPLE_RATE, sample_width=SAMPLE_WIDTH, channels=CHANNELS):
+        """
+        Args:
+            file_path (str): Caminho do arquivo .wav de saída.
+            sample_rate (int): Taxa de amostragem do PCM em Hz.
+            sample_width (int): Bytes por amostra.
+            channels (int): Número de canais.
+        """
+        self.file_path = file_path
+        self._wav_file = wave.open(file_path, 'wb')
+        self._wav_file.setnchannels(channels)
+        self._wav_file.setsampwidth(sample_width)
+        self._wav_file.setframerate(sample_rate)
+
+    async def write(self, pcm_bytes):
+        self._wav_file.writeframes(pcm_bytes)
+
+    async def close(self):
+        self._wav_file.close()
+
+
+class CallbackSink(AudioSink):
+    """
+    Repassa cada trecho de áudio para uma função (síncrona ou assíncrona).
+    """
+
+    def __init__(self, callback):
+        """
+        Args:
+            callback (callable): Função que recebe os bytes de PCM.
+        """
+        self.callback = callback
+
+    async def write(self, pcm_bytes):
+        result = self.callback(pcm_bytes)
+        if inspect.isawaitable(result):
+            await result
@@ -1,9 +1,81 @@
 import base64
+import binascii
+import itertools
 import json
-import wave
-import io
+import mmap
+import os
+import re
+import struct
+import time
+
+# Formato de entrada do Nova Sonic (16 kHz, mono, 16 bits)
+INPUT_SAMPLE_RATE = 16000
+# Frames lidos por vez ao converter WAVs em outros formatos
+NORMALIZE_CHUNK_FRAMES = 16384
+# Tamanho dos chunks de PCM entregues pela ingestão em streaming (64 ms a 16 kHz)
+INGEST_CHUNK_BYTES = 2048
+# Caracteres base64 decodificados por bloco (múltiplo de 4)
+BASE64_BLOCK_CHARS = 64 * 1024
+# Limite de payload de uma resposta síncrona do Lambda
+LAMBDA_PAYLOAD_LIMIT_BYTES = 6 * 1024 * 1024
+
+# Formatos de amostra aceitos no chunk 'fmt ' (PCM e WAVE_FORMAT_EXTENSIBLE)
+_WAV_FORMAT_PCM = 1
+_WAV_FORMAT_EXTENSIBLE = 0xFFFE
+# SubFormat GUID do KSDATAFORMAT_SUBTYPE_PCM (WAVE_FORMAT_EXTENSIBLE)
+_KSDATAFORMAT_SUBTYPE_PCM = bytes.fromhex('0100000000001000800000aa00389b71')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _parse_wav_header(header):
+    """
+    Localiza o formato e o início dos dados de um WAV a partir dos primeiros bytes.
+
+    Args:
+        header (bytes | memoryview): Início do arquivo.
+
+    Returns:
+        tuple | None: ((taxa, bytes_por_amostra, canais), offset_dos_dados, tamanho_dos_dados),
+            ou None se o cabeçalho ainda não estiver completo nos bytes recebidos.
+
+    Raises:
+        ValueError: Se não for um WAV PCM.
+    """
+    if len(header) < 12:
+        return None
+    if bytes(header[:4]) != b'RIFF' or bytes(header[8:12]) != b'WAVE':
+        raise ValueError("O áudio não é um arquivo WAV (RIFF/WAVE).")
+
+    audio_format = None
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = bytes(header[offset:offset + 4])
+        chunk_size, = struct.unpack_from('<I', header, offset + 4)
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            if body + 16 > len(header):
+                return None
+            format_tag, channels, rate, _, _, bits = struct.unpack_from('<HHIIHH', header, body)
+            if format_tag not in (_WAV_FORMAT_PCM, _WAV_FORMAT_EXTENSIBLE):
+                raise ValueError(f"Formato WAV não suportado (codec {format_tag:#x}); use PCM.")
+            if format_tag == _WAV_FORMAT_EXTENSIBLE:
+                # O codec real está no SubFormat (GUID em body + 24); só PCM é aceito
+                if chunk_size < 40:
+                    raise ValueError("Chunk 'fmt ' WAVE_FORMAT_EXTENSIBLE incompleto.")
+                if body + 40 > len(header):
+                    return None
+                sub_format = bytes(header[body + 24:body + 40])
+                if sub_format != _KSDATAFORMAT_SUBTYPE_PCM:
+                    raise ValueError(f"Formato WAV não suportado (subformato {sub_format.hex()}); use PCM.")
+            audio_format = (rate, bits // 8, channels)
+        elif chunk_id == b'data':
+            if audio_format is None:
+                raise ValueError("WAV sem o chunk 'fmt ' antes dos dados.")
+            return audio_format, body, chunk_size
+        # Chunks têm tamanho par (byte de preenchimento)
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
 
-from utils.file_converter import FileConverter
 
 class AudioProcessor:
     """
@@ -19,6 +91,10 @@ class AudioProcessor:
         1. Um caminho de arquivo local ('audio_filepath'), ideal para testes.
         2. Uma string base64 ('audio_base64'), ideal para invocações de API.
 
+        Arquivos em outra taxa, com mais de um canal ou com outra profundidade (8/24/32
+        bits) são convertidos para 16 kHz, mono, 16 bits. Para enviar o áudio sem
+        montá-lo inteiro em memória, use `iter_input_audio`.
+
         Args:
             event_body (dict): O corpo do evento Lambda contendo os dados do áudio.
 
@@ -28,53 +104,212 @@ class AudioProcessor:
         Raises:
             ValueError: Se nenhum dado de áudio válido for encontrado no evento.
         """
+        audio_data_bytes = bytearray()
+        for chunk in self.iter_input_audio(event_body, chunk_bytes=NORMALIZE_CHUNK_FRAMES * 2):
+            audio_data_bytes += chunk
+        print(f"[DEBUG][PROCESSOR] {len(audio_data_bytes)} bytes de dados de áudio extraídos em memória.")
+        return bytes(audio_data_bytes)
+
+    def iter_input_audio(self, event_body: dict, chunk_bytes=INGEST_CHUNK_BYTES):
+        """
+        Prepara o áudio de entrada como um gerador de chunks de PCM 16 kHz mono 16 bits.
+
+        - 'audio_filepath': o arquivo é mapeado em memória (mmap) e os chunks são views
+          diretas dos dados logo após o cabeçalho WAV, sem cópia.
+        - 'audio_base64': o texto é decodificado em blocos alinhados a 4 caracteres,
+          sem decodificar o payload inteiro de uma vez.
+
+        O pico de memória é proporcional ao tamanho do chunk, não ao do arquivo. A
+        validação do evento e do cabeçalho acontece já nesta chamada.
+
+        Args:
+            event_body (dict): O corpo do evento Lambda contendo os dados do áudio.
+            chunk_bytes (int): Tamanho dos chunks de PCM entregues.
+
+        Returns:
+            generator: Chunks de PCM (bytes ou memoryview).
+
+        Raises:
+            ValueError: Se nenhum áudio for fornecido ou se o WAV não for PCM.
+            FileNotFoundError: Se o arquivo informado não existir.
+        """
         print("[DEBUG][PROCESSOR] Iniciando preparação do áudio de entrada.")
         
         audio_base64 = event_body.get('audio_base64')
         audio_filepath = event_body.get('audio_filepath')
 
-        # Se o caminho do arquivo for fornecido (para testes), converte-o para base64.
         if audio_filepath and not audio_base64:
-            print(f"[DEBUG][PROCESSOR] Caminho do arquivo fornecido: {audio_filepath}. Convertendo...")
-            converter = FileConverter()
-            audio_base64 = converter.to_base64(audio_filepath)
-        
-        if not audio_base64:
+            print(f"[DEBUG][PROCESSOR] Caminho do arquivo fornecido: {audio_filepath}. Mapeando em memória...")
+            audio_format, blocks = self._open_wav_file(audio_filepath, chunk_bytes)
+        elif audio_base64:
+            print("[DEBUG][PROCESSOR] Decodificando áudio Base64 em blocos...")
+            audio_format, blocks = self._open_wav_base64(audio_base64, chunk_bytes)
+        else:
             raise ValueError("Nenhum áudio fornecido. É necessário 'audio_base64' ou 'audio_filepath'.")
 
-        # Decodifica a string base64 para bytes.
-        print("[DEBUG][PROCESSOR] Decodificando áudio Base64 para memória...")
-        decoded_wav_bytes = base64.b64decode(audio_base64)
-        
-        # Usa a biblioteca 'wave' para ler os bytes e extrair apenas os dados de áudio (PCM).
-        # Isso é crucial para remover o cabeçalho do arquivo .wav antes de enviá-lo ao modelo.
-        with wave.open(io.BytesIO(decoded_wav_bytes), 'rb') as wav_file:
-            audio_data_bytes = wav_file.readframes(wav_file.getnframes())
-            print(f"[DEBUG][PROCESSOR] {len(audio_data_bytes)} bytes de dados de áudio extraídos em memória.")
+        if audio_format == (INPUT_SAMPLE_RATE, 2, 1):
+            return blocks
+        return self._normalize(audio_format, blocks)
+
+    def _open_wav_file(self, file_path, chunk_bytes):
+        """Mapeia o arquivo em memória e retorna o formato e o gerador de views dos dados."""
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Arquivo não encontrado em '{file_path}'")
+
+        with open(file_path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = _parse_wav_header(mapped)
+            if header is None:
+                raise ValueError(f"Cabeçalho WAV incompleto em '{file_path}'.")
+        except Exception:
+            mapped.close()
+            raise
+        audio_format, data_offset, data_size = header
+        frame_bytes = audio_format[1] * audio_format[2]
+        # Arquivo truncado (ou data_size fora do alinhamento): descarta o frame incompleto do fim
+        data_length = min(len(mapped), data_offset + data_size) - data_offset
+        data_end = data_offset + data_length - data_length % frame_bytes
+        chunk_bytes -= chunk_bytes % frame_bytes
+
+        def views():
+            view = memoryview(mapped)
+            try:
+                for offset in range(data_offset, data_end, chunk_bytes):
+                    yield view[offset:min(offset + chunk_bytes, data_end)]
+            finally:
+                view.release()
+                try:
+                    mapped.close()
+                except BufferError:
+                    # Um consumidor ainda guarda uma view; o mapeamento é liberado pelo GC
+                    pass
+
+        return audio_format, views()
+
+    def _open_wav_base64(self, audio_base64, chunk_bytes):
+        """Decodifica o cabeçalho e retorna o formato e o gerador de chunks dos dados."""
+        if isinstance(audio_base64, bytes):
+            audio_base64 = audio_base64.decode('ascii')
+        # Quebras de linha (base64 MIME) quebrariam o alinhamento dos blocos; a busca cobre a
+        # string inteira (uma passada em C), pois elas podem aparecer só depois do cabeçalho
+        has_whitespace = _WHITESPACE.search(audio_base64) is not None
+
+        def decoded_blocks():
+            carry = ''
+            for start in range(0, len(audio_base64), BASE64_BLOCK_CHARS):
+                block = carry + audio_base64[start:start + BASE64_BLOCK_CHARS]
+                if has_whitespace:
+                    block = _WHITESPACE.sub('', block)
+                cut = len(block) - len(block) % 4
+                carry = block[cut:]
+                if cut:
+                    yield binascii.a2b_base64(block[:cut])
+            if carry:
+                yield binascii.a2b_base64(carry + '=' * (-len(carry) % 4))
 
-        return audio_data_bytes
+        blocks = decoded_blocks()
+        pending = bytearray()
+        header = None
+        for block in blocks:
+            pending += block
+            header = _parse_wav_header(pending)
+            if header:
+                break
+        if header is None:
+            raise ValueError("O áudio base64 não contém um WAV completo.")
+        audio_format, data_offset, data_size = header
+        frame_bytes = audio_format[1] * audio_format[2]
+        chunk_bytes -= chunk_bytes % frame_bytes
+        del pending[:data_offset]
 
-    def prepare_success_response(self, output_filepath: str, transcription: str) -> dict:
+        def chunks():
+            remaining = data_size
+            buffer = pending
+            # O primeiro passo processa o que sobrou do bloco do cabeçalho
+            for block in itertools.chain((b'',), blocks):
+                buffer += block
+                usable = min(len(buffer), remaining)
+                usable -= usable % chunk_bytes
+                for offset in range(0, usable, chunk_bytes):
+                    yield bytes(buffer[offset:offset + chunk_bytes])
+                del buffer[:usable]
+                remaining -= usable
+                if remaining <= 0:
+                    return
+            tail = min(len(buffer), remaining)
+            tail -= tail % frame_bytes
+            if tail:
+                yield bytes(buffer[:tail])
+
+        return audio_format, chunks()
+
+    def _normalize(self, audio_format, blocks):
+        """Converte os chunks de outro formato para 16 kHz, mono, 16 bits."""
+        # NumPy só é carregado quando a conversão é necessária (fora do cold start comum)
+        from utils.resampler import PCMNormalizer
+
+        rate, sample_width, channels = audio_format
+        print(f"[DEBUG][PROCESSOR] Convertendo áudio de {rate} Hz, {channels} canal(is), {sample_width * 8} bits "
+              f"para {INPUT_SAMPLE_RATE} Hz mono 16 bits...")
+        normalizer = PCMNormalizer(rate, sample_width, channels, out_rate=INPUT_SAMPLE_RATE)
+        for block in blocks:
+            converted = normalizer.process(block)
+            if converted:
+                yield converted
+        tail = normalizer.flush()
+        if tail:
+            yield tail
+
+    def prepare_success_response(self, output_filepath: str, transcription: str, response_audio=None,
+                                 output_format: str = 'wav') -> dict:
         """
-        Lê o arquivo de áudio de saída, codifica-o em Base64 e monta o corpo da resposta de sucesso.
+        Codifica o áudio de saída em Base64 e monta o corpo da resposta de sucesso.
+
+        O áudio pode vir do WAV montado em memória (`response_audio`, ex.:
+        `WavBufferSink.getvalue()`), sem escrita e leitura em /tmp, ou do arquivo em
+        `output_filepath`. Com `output_format` diferente de 'wav', o PCM é recodificado
+        em um formato compacto (ver `utils.audio_codecs.OUTPUT_FORMATS`).
 
         Args:
-            output_filepath (str): O caminho para o arquivo .wav gerado pelo serviço Sonic.
+            output_filepath (str): O caminho para o arquivo .wav gerado pelo serviço Sonic (ou None).
             transcription (str): A transcrição em texto da resposta do modelo.
+            response_audio (bytes | memoryview): WAV de resposta já em memória (opcional).
+            output_format (str): Formato do áudio devolvido ('wav', 'mulaw', 'alaw',
+                'ima_adpcm', 'pcm_16k' ou 'pcm_8k').
 
         Returns:
             dict: Um dicionário formatado para ser o corpo da resposta do API Gateway.
         """
-        print(f"[DEBUG][PROCESSOR] Lendo o arquivo de resposta de: {output_filepath}")
-        
-        # Lê o arquivo de áudio de saída e o converte para base64 para o retorno da API.
-        with open(output_filepath, 'rb') as audio_file:
-            response_audio_base64 = base64.b64encode(audio_file.read()).decode('utf-8')
+        if response_audio is None:
+            print(f"[DEBUG][PROCESSOR] Lendo o arquivo de resposta de: {output_filepath}")
+            with open(output_filepath, 'rb') as audio_file:
+                response_audio = audio_file.read()
+
+        if output_format != 'wav':
+            # NumPy só é carregado quando um formato compacto é pedido
+            from utils.audio_codecs import encode_response_audio
+
+            header = _parse_wav_header(response_audio)
+            if header is None:
+                raise ValueError("Cabeçalho WAV incompleto no áudio de resposta.")
+            (sample_rate, _, _), data_offset, data_size = header
+            pcm = memoryview(response_audio)[data_offset:data_offset + data_size]
+            started_at = time.perf_counter()
+            response_audio = encode_response_audio(pcm, output_format, sample_rate=sample_rate)
+            print(f"[DEBUG][PROCESSOR] Áudio recodificado em '{output_format}': {len(pcm)} -> "
+                  f"{len(response_audio)} bytes em {(time.perf_counter() - started_at) * 1000:.1f} ms.")
+
+        response_audio_base64 = base64.b64encode(response_audio).decode('ascii')
+        if len(response_audio_base64) > LAMBDA_PAYLOAD_LIMIT_BYTES:
+            print(f"[WARNING][PROCESSOR] Áudio de resposta com {len(response_audio_base64)} bytes em base64 "
+                  f"excede o limite de payload do Lambda; considere um 'output_format' compacto.")
         
         # Monta o corpo da resposta.
         response_body = {
             'message': 'Áudio processado com sucesso em memória.',
             'response_audio_base64': response_audio_base64,
+            'response_audio_format': output_format,
             'transcription': transcription,
             'output_filepath': output_filepath
         }
@@ -84,4 +319,4 @@ class AudioProcessor:
             'statusCode': 200,
             'headers': { 'Content-Type': 'application/json' },
             'body': json.dumps(response_body)
-        }
\ No newline at end of file
+        }
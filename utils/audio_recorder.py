@@ -7,6 +7,8 @@ import time
 import asyncio
 from dotenv import load_dotenv
 
+from utils.audio_capture import MicrophoneSource
+
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
@@ -43,55 +45,34 @@ class AudioRecorder:
         Returns:
             str: O caminho completo para o arquivo de áudio .wav salvo.
         """
-        # Inicializa o PyAudio
-        p = pyaudio.PyAudio()
-
-        # Abre o stream de áudio para gravação
-        stream = p.open(format=self.format,
-                        channels=self.channels,
-                        rate=self.rate,
-                        input=True,
-                        frames_per_buffer=self.chunk_size)
+        # Captura em modo callback: o PyAudio lê o microfone na sua própria thread e
+        # entrega os chunks por uma fila, sem bloquear o loop de eventos
+        source = MicrophoneSource(chunk_frames=self.chunk_size, sample_rate=self.rate, channels=self.channels)
 
         print("\n🎤 [INFO] Gravando... Pressione a tecla Enter para parar.")
 
         frames = []
-        is_recording = True
 
         # --- Loop de gravação ---
-        # A gravação ocorre em um loop, lendo chunks de áudio do microfone.
-        # A verificação da tecla Enter é feita em uma tarefa separada para não bloquear a gravação.
-        
+        # A verificação da tecla Enter é feita em uma tarefa separada, que encerra a captura.
+
         # Função para aguardar o Enter do usuário de forma assíncrona
         async def wait_for_enter():
-            nonlocal is_recording
             await asyncio.get_event_loop().run_in_executor(None, input)
-            is_recording = False
+            source.stop()
 
         # Inicia a tarefa que espera pelo Enter
         enter_task = asyncio.create_task(wait_for_enter())
 
-        while is_recording:
-            try:
-                # Lê um chunk de dados do microfone
-                data = stream.read(self.chunk_size)
+        try:
+            async for data in source:
                 frames.append(data)
-                # Uma pequena pausa para permitir que outras tarefas (como a verificação do Enter) rodem
-                await asyncio.sleep(0.01)
-            except KeyboardInterrupt:
-                # Permite parar com Ctrl+C também
-                is_recording = False
-
-        await enter_task
+        finally:
+            if not enter_task.done():
+                enter_task.cancel()
 
         print("🔴 [INFO] Gravação finalizada. Salvando arquivo...")
-
-        # --- Finalização e salvamento ---
-        # Para e fecha o stream de áudio
-        stream.stop_stream()
-        stream.close()
-        # Encerra a instância do PyAudio
-        p.terminate()
+        print(f"[DEBUG][RECORDER] Estatísticas da captura: {source.stats()}")
 
         # Gera um nome de arquivo único com timestamp
         timestamp = int(time.time())
@@ -101,7 +82,7 @@ class AudioRecorder:
         # Abre o arquivo .wav no modo de escrita binária
         with wave.open(file_path, 'wb') as wf:
             wf.setnchannels(self.channels)
-            wf.setsampwidth(p.get_sample_size(self.format))
+            wf.setsampwidth(pyaudio.get_sample_size(self.format))
             wf.setframerate(self.rate)
             # Escreve todos os frames gravados no arquivo
             wf.writeframes(b''.join(frames))
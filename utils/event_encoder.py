@@ -0,0 +1,211 @@
+import base64
+import binascii
+import json
+import tracemalloc
+
+# Tamanho padrão do chunk de áudio enviado ao Sonic (1024 frames de 16 bits, mono)
+DEFAULT_CHUNK_BYTES = 1024 * 2
+
+
+def _compact(payload: dict) -> bytes:
+    """
+    Serializa um evento em JSON compacto (sem espaços) já codificado em UTF-8.
+
+    Args:
+        payload (dict): Evento a ser serializado.
+
+    Returns:
+        bytes: JSON compacto pronto para o stream.
+    """
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class SonicEventEncoder:
+    """
+    Codificador de eventos do Amazon Nova Sonic com templates pré-compilados.
+
+    Os templates em bytes são montados uma única vez por sessão, com o `promptName`
+    e os `contentName` já embutidos. O evento `audioInput`, enviado para cada chunk
+    do microfone, é montado juntando o prefixo fixo, o base64 gerado direto em bytes
+    e o sufixo fixo, sem passar por str nem por JSON com espaços.
+    """
+
+    def __init__(self, prompt_name: str, content_name: str, audio_content_name: str):
+        """
+        Inicializa o codificador e pré-compila os templates da sessão.
+
+        Args:
+            prompt_name (str): Identificador do prompt da sessão.
+            content_name (str): Identificador do conteúdo de texto (prompt de sistema).
+            audio_content_name (str): Identificador do conteúdo de áudio do usuário.
+        """
+        self.prompt_name = prompt_name
+        self.content_name = content_name
+        self.audio_content_name = audio_content_name
+
+        # Prefixo e sufixo do evento audioInput, montados uma única vez
+        prompt_json = json.dumps(prompt_name).encode('utf-8')
+        audio_json = json.dumps(audio_content_name).encode('utf-8')
+        self._audio_prefix = (b'{"event":{"audioInput":{"promptName":' + prompt_json +
+                              b',"contentName":' + audio_json + b',"content":"')
+        self._audio_suffix = b'"}}}'
+
+        # Eventos estáticos da sessão
+        self._audio_content_end = _compact({"event": {"contentEnd": {
+            "promptName": prompt_name, "contentName": audio_content_name}}})
+        self._text_content_end = _compact({"event": {"contentEnd": {
+            "promptName": prompt_name, "contentName": content_name}}})
+        self._prompt_end = _compact({"event": {"promptEnd": {"promptName": prompt_name}}})
+        self._session_end = _compact({"event": {"sessionEnd": {}}})
+
+    def encode_audio(self, audio_bytes) -> bytes:
+        """
+        Codifica um chunk de áudio como evento audioInput compacto, em um objeto
+        próprio que pode ser retido pelo stream após a chamada.
+
+        Args:
+            audio_bytes (bytes | bytearray | memoryview): PCM bruto do chunk.
+
+        Returns:
+            bytes: Evento pronto para ser enviado ao stream.
+        """
+        # Uma única junção: base64 direto em bytes, sem passar por str
+        return b''.join((self._audio_prefix,
+                         binascii.b2a_base64(audio_bytes, newline=False),
+                         self._audio_suffix))
+
+    def session_start(self, max_tokens=1024, top_p=0.9, temperature=0.7) -> bytes:
+        """Retorna o evento sessionStart com a configuração de inferência."""
+        return _compact({"event": {"sessionStart": {"inferenceConfiguration": {
+            "maxTokens": max_tokens, "topP": top_p, "temperature": temperature}}}})
+
+    def prompt_start(self, voice_id='matthew', sample_rate=24000) -> bytes:
+        """Retorna o evento promptStart com as configurações de saída de texto e áudio."""
+        return _compact({"event": {"promptStart": {
+            "promptName": self.prompt_name,
+            "textOutputConfiguration": {"mediaType": "text/plain"},
+            "audioOutputConfiguration": {
+                "mediaType": "audio/lpcm",
+                "sampleRateHertz": sample_rate,
+                "sampleSizeBits": 16,
+                "channelCount": 1,
+                "voiceId": voice_id,
+                "encoding": "base64",
+                "audioType": "SPEECH"
+            }
+        }}})
+
+    def text_content_start(self, role='SYSTEM') -> bytes:
+        """Retorna o evento contentStart do conteúdo de texto."""
+        return _compact({"event": {"contentStart": {
+            "promptName": self.prompt_name,
+            "contentName": self.content_name,
+            "type": "TEXT",
+            "interactive": False,
+            "role": role,
+            "textInputConfiguration": {"mediaType": "text/plain"}
+        }}})
+
+    def text_input(self, text: str) -> bytes:
+        """Retorna o evento textInput com o texto devidamente escapado em JSON."""
+        return _compact({"event": {"textInput": {
+            "promptName": self.prompt_name,
+            "contentName": self.content_name,
+            "content": text
+        }}})
+
+    def text_content_end(self) -> bytes:
+        """Retorna o evento contentEnd do conteúdo de texto."""
+        return self._text_content_end
+
+    def audio_content_start(self, sample_rate=16000) -> bytes:
+        """Retorna o evento contentStart do conteúdo de áudio do usuário."""
+        return _compact({"event": {"contentStart": {
+            "promptName": self.prompt_name,
+            "contentName": self.audio_content_name,
+            "type": "AUDIO",
+            "interactive": True,
+            "role": "USER",
+            "audioInputConfiguration": {
+                "mediaType": "audio/lpcm",
+                "sampleRateHertz": sample_rate,
+                "sampleSizeBits": 16,
+                "channelCount": 1,
+                "audioType": "SPEECH",
+                "encoding": "base64"
+            }
+        }}})
+
+    def audio_content_end(self) -> bytes:
+        """Retorna o evento contentEnd do conteúdo de áudio."""
+        return self._audio_content_end
+
+    def prompt_end(self) -> bytes:
+        """Retorna o evento promptEnd."""
+        return self._prompt_end
+
+    def session_end(self) -> bytes:
+        """Retorna o evento sessionEnd."""
+        return self._session_end
+
+
+# --- Bloco de Benchmark ---
+# Compara o caminho antigo (f-string + base64 + decode + encode) com o codificador pré-compilado.
+def _legacy_audio_event(prompt_name, audio_content_name, audio_bytes):
+    """Reproduz o caminho original de `send_audio_chunk` + `send_event`."""
+    blob = base64.b64encode(audio_bytes)
+    audio_event = f'''
+        {{
+            "event": {{
+                "audioInput": {{
+                    "promptName": "{prompt_name}",
+                    "contentName": "{audio_content_name}",
+                    "content": "{blob.decode('utf-8')}"
+                }}
+            }}
+        }}
+        '''
+    return audio_event.encode('utf-8')
+
+
+def _peak_bytes(func, *args):
+    """Mede o pico de memória alocada durante uma chamada de `func`."""
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    result = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    del result
+    return peak - before
+
+
+if __name__ == "__main__":
+    import os
+    import timeit
+    import uuid
+
+    print("--- Benchmark do SonicEventEncoder ---")
+
+    prompt_name, content_name, audio_name = (str(uuid.uuid4()) for _ in range(3))
+    chunk = os.urandom(DEFAULT_CHUNK_BYTES)
+    encoder = SonicEventEncoder(prompt_name, content_name, audio_name)
+
+    # Garante que os dois caminhos produzem o mesmo evento
+    assert json.loads(_legacy_audio_event(prompt_name, audio_name, chunk)) == json.loads(encoder.encode_audio(chunk))
+
+    iterations = 50_000
+    candidates = {
+        'legado (f-string)': lambda: _legacy_audio_event(prompt_name, audio_name, chunk),
+        'encoder': lambda: encoder.encode_audio(chunk),
+    }
+
+    tracemalloc.start()
+    for name, func in candidates.items():
+        func()
+        peak = _peak_bytes(func)
+        payload = len(func())
+        tracemalloc.stop()
+        elapsed = timeit.timeit(func, number=iterations)
+        tracemalloc.start()
+        print(f"[BENCH] {name:<20} {iterations / elapsed:>12,.0f} eventos/s | "
+              f"{peak:>6} bytes alocados/chunk | {payload} bytes no fio")
+    tracemalloc.stop()
@@ -0,0 +1,112 @@
+import argparse
+import os
+import subprocess
+import sys
+
+
+def profile_imports(modules, python=sys.executable, env=None):
+    """
+    Importa os módulos em um interpretador novo com `-X importtime` e coleta o custo
+    de cada import, como aconteceria em um cold start do Lambda.
+
+    Args:
+        modules (list[str]): Módulos a importar, na ordem.
+        python (str): Interpretador usado no subprocesso.
+        env (dict): Variáveis de ambiente do subprocesso (opcional).
+
+    Returns:
+        list[dict]: Uma entrada por módulo importado com 'module', 'self_us',
+            'cumulative_us' e 'depth' (profundidade na árvore de imports).
+
+    Raises:
+        RuntimeError: Se algum dos módulos não puder ser importado.
+    """
+    code = '; '.join(f'import {module}' for module in modules)
+    result = subprocess.run([python, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        error = '\n'.join(line for line in result.stderr.splitlines() if not line.startswith('import time:'))
+        raise RuntimeError(f"Falha ao importar {modules}:\n{error}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, values = line.split(':', 1)
+        self_us, cumulative_us, name = values.split('|', 2)
+        stripped = name.lstrip(' ')
+        entries.append({
+            'module': stripped.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': (len(name) - len(stripped) - 1) // 2,
+        })
+    return entries
+
+
+def summarize(entries, requested, top=15):
+    """
+    Monta o relatório de custo de import.
+
+    Args:
+        entries (list[dict]): Saída de `profile_imports`.
+        requested (list[str]): Módulos solicitados pelo usuário.
+        top (int): Quantidade de módulos mais caros a listar.
+
+    Returns:
+        dict: 'total_ms' (custo total dos imports de topo), 'requested' (custo
+            cumulativo de cada módulo solicitado) e 'top_self' (módulos com maior
+            custo próprio).
+    """
+    total_us = sum(entry['cumulative_us'] for entry in entries if entry['depth'] == 0)
+    by_name = {entry['module']: entry for entry in entries}
+    return {
+        'total_ms': total_us / 1000,
+        'requested': {
+            module: by_name[module]['cumulative_us'] / 1000 if module in by_name else 0.0
+            for module in requested
+        },
+        'top_self': sorted(entries, key=lambda entry: entry['self_us'], reverse=True)[:top],
+    }
+
+
+def main(argv=None):
+    """
+    Comando de profiling de startup.
+
+    Exemplo:
+        python -m utils.import_profiler lambda_function --lambda-env --budget-ms 300
+        python -m utils.import_profiler lambda_function services.bedrock_sonic_service
+    """
+    parser = argparse.ArgumentParser(description="Mede o custo de import por módulo (cold start).")
+    parser.add_argument('modules', nargs='+', help="Módulos a importar, na ordem.")
+    parser.add_argument('--top', type=int, default=15, help="Quantidade de módulos mais caros a listar.")
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="Orçamento total de import em ms; acima dele o comando retorna erro.")
+    parser.add_argument('--lambda-env', action='store_true',
+                        help="Simula o ambiente do Lambda (define AWS_LAMBDA_FUNCTION_NAME).")
+    args = parser.parse_args(argv)
+
+    env = None
+    if args.lambda_env:
+        env = dict(os.environ, AWS_LAMBDA_FUNCTION_NAME=os.getenv('AWS_LAMBDA_FUNCTION_NAME', 'import-profiler'))
+
+    report = summarize(profile_imports(args.modules, env=env), args.modules, top=args.top)
+
+    print("--- Custo de import (cold start) ---")
+    for module, cost_ms in report['requested'].items():
+        print(f"  {module:<45} {cost_ms:>9.1f} ms (cumulativo)")
+    print(f"\n--- Top {args.top} módulos por custo próprio ---")
+    for entry in report['top_self']:
+        print(f"  {entry['module']:<45} {entry['self_us'] / 1000:>9.1f} ms | "
+              f"{entry['cumulative_us'] / 1000:>9.1f} ms cumulativo")
+    print(f"\nTotal: {report['total_ms']:.1f} ms")
+
+    if args.budget_ms is not None and report['total_ms'] > args.budget_ms:
+        print(f"[ERROR] Orçamento de cold start excedido: {report['total_ms']:.1f} ms > {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+import asyncio
+import collections
+import time
+
+# Políticas quando o buffer está cheio
+OVERFLOW_BLOCK = 'block'              # backpressure: o produtor espera espaço
+OVERFLOW_DROP_OLDEST = 'drop_oldest'  # descarta o áudio mais antigo
+OVERFLOW_DROP_NEWEST = 'drop_newest'  # descarta o áudio que chegou
+
+
+class JitterBuffer:
+    """
+    Buffer circular de PCM com profundidade alvo e limite de memória.
+
+    O anel começa pequeno e dobra de tamanho conforme a demanda, até a capacidade
+    máxima, de modo que a memória acompanha a profundidade realmente usada.
+
+    O leitor só começa (ou recomeça, após um underrun) a consumir quando o buffer
+    atinge a profundidade alvo, o que suaviza a chegada em rajadas da rede. O espaço
+    total é fixo; quando ele acaba, a política de overflow decide entre aplicar
+    backpressure ao produtor ou descartar áudio.
+
+    `read` devolve bytes de áudio, `b''` ao fim de um turno (depois de entregar o
+    que restava) e `None` quando o buffer foi fechado e esvaziado.
+
+    `flush` inicia uma nova geração: um `put` que estava esperando espaço (backpressure)
+    descarta o restante do seu áudio em vez de escrevê-lo depois da interrupção.
+    """
+
+    def __init__(self, sample_rate=24000, sample_width=2, channels=1, target_ms=120, max_ms=10_000,
+                 overflow=OVERFLOW_BLOCK, history_size=1000):
+        """
+        Args:
+            sample_rate (int): Taxa de amostragem do PCM em Hz.
+            sample_width (int): Bytes por amostra.
+            channels (int): Número de canais.
+            target_ms (int): Profundidade alvo antes de liberar a leitura, em ms.
+            max_ms (int): Capacidade máxima do buffer (limite de memória), em ms.
+            overflow (str): Política de overflow ('block', 'drop_oldest' ou 'drop_newest').
+            history_size (int): Quantidade de amostras de profundidade guardadas.
+
+        Raises:
+            ValueError: Se a política de overflow for desconhecida ou a capacidade for menor que o alvo.
+        """
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST):
+            raise ValueError(f"Política de overflow desconhecida: {overflow}")
+        if max_ms < target_ms:
+            raise ValueError("A capacidade máxima deve ser maior ou igual à profundidade alvo.")
+
+        self.frame_bytes = sample_width * channels
+        self.bytes_per_ms = sample_rate * self.frame_bytes / 1000
+        self.target_bytes = self._align(int(target_ms * self.bytes_per_ms))
+        self.capacity = self._align(int(max_ms * self.bytes_per_ms))
+        self.overflow = overflow
+
+        self._buffer = bytearray(min(self.capacity, max(self.target_bytes * 2, self.frame_bytes)))
+        self._read_pos = 0
+        self._size = 0
+        self._buffering = True
+        self._turn_ended = False
+        self._closed = False
+        self._changed = asyncio.Event()
+        self.generation = 0
+
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped_bytes = 0
+        self.peak_bytes = 0
+        self._history = collections.deque(maxlen=history_size)
+
+    def _align(self, n_bytes):
+        """Arredonda para baixo até um múltiplo do tamanho do frame."""
+        return n_bytes - n_bytes % self.frame_bytes
+
+    @property
+    def depth_ms(self) -> float:
+        """Profundidade atual do buffer em milissegundos."""
+        return self._size / self.bytes_per_ms
+
+    def _record_depth(self):
+        self.peak_bytes = max(self.peak_bytes, self._size)
+        self._history.append((time.monotonic(), self.depth_ms))
+
+    def _grow(self, needed):
+        """Aumenta o anel para comportar `needed` bytes, linearizando o conteúdo."""
+        size = len(self._buffer)
+        while size < needed:
+            size *= 2
+        grown = bytearray(min(size, self.capacity))
+        first = min(self._size, len(self._buffer) - self._read_pos)
+        grown[:first] = self._buffer[self._read_pos:self._read_pos + first]
+        grown[first:self._size] = self._buffer[:self._size - first]
+        self._buffer = grown
+        self._read_pos = 0
+
+    def _write(self, data):
+        """Copia `data` para o anel (o chamador garante que há espaço)."""
+        if self._size + len(data) > len(self._buffer):
+            self._grow(self._size + len(data))
+        ring = len(self._buffer)
+        write_pos = (self._read_pos + self._size) % ring
+        first = min(len(data), ring - write_pos)
+        self._buffer[write_pos:write_pos + first] = data[:first]
+        self._buffer[:len(data) - first] = data[first:]
+        self._size += len(data)
+
+    def _take(self, n_bytes):
+        """Remove e retorna até `n_bytes` do início do anel."""
+        n_bytes = min(n_bytes, self._size)
+        ring = len(self._buffer)
+        first = min(n_bytes, ring - self._read_pos)
+        chunk = self._buffer[self._read_pos:self._read_pos + first]
+        if first < n_bytes:
+            chunk += self._buffer[:n_bytes - first]
+        self._read_pos = (self._read_pos + n_bytes) % ring
+        self._size -= n_bytes
+        return bytes(chunk)
+
+    async def _wait_change(self):
+        """Espera até que o estado do buffer mude (escrita, leitura, flush ou fechamento)."""
+        self._changed.clear()
+        await self._changed.wait()
+
+    async def put(self, pcm_bytes):
+        """
+        Adiciona áudio ao buffer, aplicando a política de overflow quando cheio.
+
+        Args:
+            pcm_bytes (bytes | bytearray | memoryview): PCM recebido do modelo.
+        """
+        if self._closed:
+            return
+        data = memoryview(pcm_bytes).cast('B')
+        generation = self.generation
+        self._turn_ended = False
+
+        free = self.capacity - self._size
+        if len(data) > free and self.overflow != OVERFLOW_BLOCK:
+            self.overruns += 1
+            if self.overflow == OVERFLOW_DROP_NEWEST:
+                keep = self._align(free)
+                self.dropped_bytes += len(data) - keep
+                data = data[:keep]
+            else:
+                if len(data) > self.capacity:
+                    self.dropped_bytes += len(data) - self.capacity
+                    data = data[-self.capacity:]
+                excess = len(data) - (self.capacity - self._size)
+                if excess > 0:
+                    self._take(excess)
+                    self.dropped_bytes += excess
+
+        while len(data):
+            free = self.capacity - self._size
+            if free == 0:
+                # Backpressure: o produtor espera o leitor liberar espaço
+                self.overruns += 1
+                while self._size == self.capacity and not self._closed:
+                    await self._wait_change()
+                if self._closed:
+                    return
+                if generation != self.generation:
+                    # Houve um flush enquanto esperava: o restante é áudio obsoleto
+                    self.dropped_bytes += len(data)
+                    return
+                continue
+            piece = data[:free]
+            self._write(piece)
+            data = data[len(piece):]
+            self._record_depth()
+            self._changed.set()
+
+    async def read(self, n_bytes):
+        """
+        Lê até `n_bytes` de áudio, esperando a profundidade alvo quando necessário.
+
+        Args:
+            n_bytes (int): Tamanho desejado da leitura (ex.: um frame de reprodução).
+
+        Returns:
+            bytes | None: Áudio lido; `b''` ao fim de um turno; `None` quando fechado e vazio.
+        """
+        n_bytes = self._align(min(n_bytes, self.capacity))
+        while True:
+            if not self._buffering and self._size >= n_bytes:
+                break
+            if self._turn_ended or self._closed:
+                if self._size:
+                    break
+                if self._closed:
+                    return None
+                # Fim do turno entregue: o próximo turno recomeça com pré-buffer
+                self._turn_ended = False
+                self._buffering = True
+                return b''
+            if self._buffering and self._size >= max(self.target_bytes, n_bytes):
+                self._buffering = False
+                break
+            if not self._buffering:
+                # O leitor alcançou o produtor no meio do turno
+                self.underruns += 1
+                self._buffering = True
+            await self._wait_change()
+
+        chunk = self._take(n_bytes)
+        self._record_depth()
+        self._changed.set()
+        return chunk
+
+    def end_turn(self):
+        """Sinaliza o fim do turno: o leitor recebe o restante sem esperar o pré-buffer."""
+        self._turn_ended = True
+        self._changed.set()
+
+    def flush(self) -> int:
+        """
+        Descarta todo o áudio pendente imediatamente (ex.: interrupção do usuário).
+
+        Returns:
+            int: Quantidade de bytes descartados.
+        """
+        discarded = self._size
+        self._read_pos = 0
+        self._size = 0
+        self._buffering = True
+        self.generation += 1
+        self._record_depth()
+        self._changed.set()
+        return discarded
+
+    def close(self):
+        """Fecha o buffer: o leitor recebe o restante e depois `None`."""
+        self._closed = True
+        self._changed.set()
+
+    def depth_history(self):
+        """
+        Retorna as amostras de profundidade ao longo do tempo.
+
+        Returns:
+            list[tuple]: Pares (timestamp monotônico, profundidade em ms).
+        """
+        return list(self._history)
+
+    def stats(self) -> dict:
+        """
+        Retorna os contadores do buffer.
+
+        Returns:
+            dict: Profundidade atual e de pico, memória alocada, underruns, overruns e
+                bytes descartados.
+        """
+        return {
+            'depth_ms': self.depth_ms,
+            'peak_depth_ms': self.peak_bytes / self.bytes_per_ms,
+            'capacity_ms': self.capacity / self.bytes_per_ms,
+            'allocated_bytes': len(self._buffer),
+            'underruns': self.underruns,
+            'overruns': self.overruns,
+            'dropped_bytes': self.dropped_bytes,
+        }
@@ -0,0 +1,311 @@
+import asyncio
+import json
+import math
+import time
+
+
+def percentile(values, pct):
+    """
+    Percentil pelo método do posto mais próximo.
+
+    Args:
+        values (list[float]): Amostras.
+        pct (float): Percentil desejado (0-100).
+
+    Returns:
+        float: Valor do percentil, ou 0.0 sem amostras.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    """
+    Mede o atraso do loop de eventos: uma tarefa dorme em intervalos fixos e registra
+    quanto acordou depois do previsto. Qualquer chamada bloqueante no loop (ex.: leitura
+    síncrona do microfone) aparece diretamente como lag.
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        Args:
+            interval (float): Intervalo entre amostras, em segundos.
+        """
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started_at - self.interval))
+
+    def start(self):
+        """Inicia a amostragem no loop atual."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> dict:
+        """
+        Encerra a amostragem.
+
+        Returns:
+            dict: Lag p50/p99/máximo em milissegundos e a quantidade de amostras.
+        """
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        return {
+            'lag_p50_ms': percentile(self.samples, 50) * 1000,
+            'lag_p99_ms': percentile(self.samples, 99) * 1000,
+            'lag_max_ms': max(self.samples, default=0.0) * 1000,
+            'samples': len(self.samples),
+        }
+
+
+class Histogram:
+    """
+    Histograma de latências com buckets logarítmicos (erro relativo ~2%).
+
+    Memória constante e registro O(1), independente do número de amostras, para
+    acumular métricas de todas as sessões do processo.
+    """
+
+    def __init__(self, growth=1.02):
+        """
+        Args:
+            growth (float): Razão entre os limites de buckets consecutivos.
+        """
+        self._log_growth = math.log(growth)
+        self.growth = growth
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        """Registra uma amostra (valores <= 0 caem no bucket zero)."""
+        index = math.ceil(math.log(value) / self._log_growth) if value > 0 else None
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct) -> float:
+        """Limite superior do bucket que contém o percentil (posto mais próximo)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = self.buckets.get(None, 0)
+        if seen >= rank:
+            return 0.0
+        for index in sorted(key for key in self.buckets if key is not None):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.growth ** index, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """Resumo com contagem, média e p50/p90/p99."""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+# Intervalos exportados por sessão: (métrica, marco inicial, marco final)
+TIMELINE_PHASES = (
+    ('ClientInit', 'start', 'client_init'),
+    ('StreamOpen', 'client_init', 'stream_open'),
+    ('Prelude', 'stream_open', 'prelude_sent'),
+    ('FirstTextOutput', 'first_audio_sent', 'first_text_output'),
+    ('FirstAudioOutput', 'first_audio_sent', 'first_audio_output'),
+    ('AudioInputEndToFirstAudio', 'audio_input_end', 'first_audio_output'),
+    ('ResponseEnd', 'first_audio_sent', 'response_end'),
+    ('SessionTotal', 'start', 'session_close'),
+)
+
+
+class SessionTimeline:
+    """
+    Linha do tempo de uma conversa: o instante da primeira ocorrência de cada marco
+    (client_init, stream_open, prelude_sent, first_audio_sent, first_text_output,
+    first_audio_output, response_end, session_close...) e contadores de eventos e
+    bytes em cada direção.
+
+    No caminho do áudio o custo é um acesso a dicionário por marco e duas somas por
+    evento, sem alocações nem I/O; a exportação acontece só no fechamento.
+    """
+
+    def __init__(self, session_id=None, dimensions=None):
+        """
+        Args:
+            session_id (str): Identificador incluído nas métricas exportadas.
+            dimensions (dict): Dimensões do CloudWatch (ex.: {'Mode': 'headless'}).
+        """
+        self.session_id = session_id
+        self.dimensions = dict(dimensions or {})
+        self.marks = {'start': time.perf_counter()}
+        self.events_in = 0
+        self.events_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # Medições que podem se repetir na sessão (ex.: latência de cada interrupção), em ms
+        self.values = {}
+        self.recorded = False
+
+    def mark(self, name):
+        """Registra o instante de um marco (só a primeira ocorrência conta)."""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter()
+
+    def record_value(self, name, value_ms):
+        """Registra uma medição repetível da sessão, em milissegundos."""
+        self.values.setdefault(name, []).append(value_ms)
+
+    def sent(self, n_bytes):
+        """Contabiliza um evento enviado ao modelo."""
+        self.events_out += 1
+        self.bytes_out += n_bytes
+
+    def received(self, n_bytes):
+        """Contabiliza um evento recebido do modelo."""
+        self.events_in += 1
+        self.bytes_in += n_bytes
+
+    def durations(self) -> dict:
+        """
+        Returns:
+            dict: Intervalos de TIMELINE_PHASES em milissegundos (só os que ocorreram).
+        """
+        marks = self.marks
+        return {
+            name: (marks[end] - marks[begin]) * 1000
+            for name, begin, end in TIMELINE_PHASES
+            if begin in marks and end in marks
+        }
+
+    def offsets(self) -> dict:
+        """Instante de cada marco em milissegundos desde o início."""
+        start = self.marks['start']
+        return {name: round((at - start) * 1000, 2) for name, at in self.marks.items()}
+
+    def to_emf(self, namespace='NovaSonic') -> dict:
+        """
+        Documento no Embedded Metric Format do CloudWatch: impresso como uma linha JSON
+        nos logs do Lambda, vira métricas sem chamadas à API do CloudWatch.
+
+        Args:
+            namespace (str): Namespace das métricas.
+
+        Returns:
+            dict: Documento EMF com os intervalos (ms), os contadores e a linha do tempo.
+        """
+        values = {name: round(value, 2) for name, value in self.durations().items()}
+        # Métricas com várias amostras vão como lista, que o EMF aceita
+        values.update({name: [round(value, 2) for value in samples] if len(samples) > 1 else round(samples[0], 2)
+                       for name, samples in self.values.items() if samples})
+        counters = {'EventsIn': self.events_in, 'EventsOut': self.events_out,
+                    'BytesIn': self.bytes_in, 'BytesOut': self.bytes_out}
+        definitions = [{'Name': name, 'Unit': 'Milliseconds'} for name in values]
+        definitions += [{'Name': name, 'Unit': 'Bytes' if name.startswith('Bytes') else 'Count'} for name in counters]
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': namespace,
+                    'Dimensions': [sorted(self.dimensions)],
+                    'Metrics': definitions,
+                }],
+            },
+            **self.dimensions,
+            **values,
+            **counters,
+            'session_id': self.session_id,
+            'timeline_ms': self.offsets(),
+        }
+
+
+def print_emf(document):
+    """Exportador EMF padrão: uma linha JSON no stdout (no Lambda, vai para o CloudWatch Logs)."""
+    print(json.dumps(document, separators=(',', ':')))
+
+
+class MetricsRegistry:
+    """
+    Métricas de sessão no nível do processo: acumula os intervalos de cada linha do
+    tempo em histogramas (p50/p90/p99) e repassa o documento EMF aos exportadores
+    registrados (ex.: `print_emf`, ou um exportador próprio para outro backend).
+    """
+
+    def __init__(self, namespace='NovaSonic'):
+        """
+        Args:
+            namespace (str): Namespace das métricas EMF.
+        """
+        self.namespace = namespace
+        self.histograms = {}
+        self.exporters = []
+        self.sessions = 0
+
+    def add_exporter(self, exporter):
+        """Registra um exportador (callable que recebe o documento EMF); ignora duplicados."""
+        if exporter not in self.exporters:
+            self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter):
+        """Remove um exportador registrado."""
+        if exporter in self.exporters:
+            self.exporters.remove(exporter)
+
+    def record(self, timeline):
+        """
+        Registra uma sessão encerrada (uma única vez por linha do tempo).
+
+        Args:
+            timeline (SessionTimeline): Linha do tempo da sessão.
+        """
+        if timeline.recorded:
+            return
+        timeline.recorded = True
+        self.sessions += 1
+        for name, value in timeline.durations().items():
+            self._histogram(name).record(value)
+        for name, samples in timeline.values.items():
+            for value in samples:
+                self._histogram(name).record(value)
+        for name, value in (('BytesIn', timeline.bytes_in), ('BytesOut', timeline.bytes_out),
+                            ('EventsIn', timeline.events_in), ('EventsOut', timeline.events_out)):
+            self._histogram(name).record(value)
+
+        if self.exporters:
+            document = timeline.to_emf(self.namespace)
+            for exporter in self.exporters:
+                try:
+                    exporter(document)
+                except Exception as e:
+                    print(f"[WARNING][METRICS] Falha no exportador {exporter!r}: {e}")
+
+    def _histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: Resumo (contagem, média, p50/p90/p99, máximo) de cada métrica.
+        """
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+
+# Registro compartilhado pelo processo (reaproveitado entre invocações quentes do Lambda)
+METRICS = MetricsRegistry()
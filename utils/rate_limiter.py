@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket para limitar a vazão a uma cota (ex.: requisições ou tokens por minuto
+    do Bedrock).
+
+    O balde enche a `rate` unidades por segundo até `capacity`; cada chamada consome
+    unidades e espera quando não há saldo. O saldo pode ficar negativo com `adjust`,
+    quando o custo real (ex.: tokens usados) só é conhecido depois da chamada.
+    `try_acquire` é seguro entre threads, para uso em código síncrono.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): Unidades repostas por segundo.
+            capacity (float): Saldo máximo (rajada permitida); padrão: um segundo de vazão.
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    @classmethod
+    def per_minute(cls, quota, burst_seconds=1.0):
+        """
+        Cria um balde a partir de uma cota por minuto.
+
+        Args:
+            quota (float): Unidades por minuto (ex.: RPM ou TPM da conta).
+            burst_seconds (float): Rajada permitida, em segundos de cota.
+
+        Returns:
+            TokenBucket: Balde com rate = quota / 60.
+        """
+        rate = quota / 60
+        return cls(rate, capacity=max(rate * burst_seconds, 1))
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, amount=1) -> bool:
+        """
+        Consome `amount` se houver saldo, sem esperar.
+
+        Returns:
+            bool: True se consumiu.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= min(amount, self.capacity):
+                self._tokens -= amount
+                return True
+            return False
+
+    async def acquire(self, amount=1):
+        """
+        Consome `amount`, esperando o balde encher quando necessário.
+
+        Um pedido maior que a capacidade espera o balde cheio e deixa o saldo negativo,
+        em vez de esperar para sempre.
+
+        Args:
+            amount (float): Unidades a consumir.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return
+                wait = (needed - self._tokens) / self.rate
+            self.waited_seconds += wait
+            await asyncio.sleep(wait)
+
+    def adjust(self, delta):
+        """
+        Corrige o saldo depois que o custo real é conhecido.
+
+        Args:
+            delta (float): Unidades a cobrar (positivo) ou devolver (negativo).
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+    @property
+    def available(self) -> float:
+        """Saldo atual do balde."""
+        with self._lock:
+            self._refill()
+            return self._tokens
@@ -0,0 +1,222 @@
+import math
+
+import numpy as np
+
+# Formato esperado pelo Nova Sonic na entrada
+TARGET_SAMPLE_RATE = 16000
+
+
+def pcm_to_float(raw_bytes, sample_width, channels):
+    """
+    Converte PCM intercalado de 8/16/24/32 bits em amostras float32 mono em [-1, 1).
+
+    Args:
+        raw_bytes (bytes | memoryview): Frames completos de PCM (little-endian, como no WAV).
+        sample_width (int): Bytes por amostra (1 = unsigned 8 bits, 2, 3 ou 4 = signed).
+        channels (int): Número de canais intercalados; a saída é a média deles.
+
+    Returns:
+        np.ndarray: Amostras float32 mono.
+
+    Raises:
+        ValueError: Se a largura de amostra não for suportada.
+    """
+    if sample_width == 1:
+        samples = (np.frombuffer(raw_bytes, dtype=np.uint8).astype(np.float32) - 128) * (1 / 128)
+    elif sample_width == 2:
+        samples = np.frombuffer(raw_bytes, dtype='<i2').astype(np.float32) * (1 / 32768)
+    elif sample_width == 3:
+        # 24 bits: os três bytes vão para os bytes altos de um int32, preservando o sinal
+        packed = np.frombuffer(raw_bytes, dtype=np.uint8).reshape(-1, 3)
+        widened = np.zeros((packed.shape[0], 4), dtype=np.uint8)
+        widened[:, 1:] = packed
+        samples = widened.view('<i4').ravel().astype(np.float32) * (1 / 2 ** 31)
+    elif sample_width == 4:
+        samples = np.frombuffer(raw_bytes, dtype='<i4').astype(np.float32) * (1 / 2 ** 31)
+    else:
+        raise ValueError(f"Largura de amostra não suportada: {sample_width * 8} bits")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return samples
+
+
+def float_to_pcm16(samples):
+    """
+    Converte amostras float em PCM de 16 bits com arredondamento e saturação.
+
+    Args:
+        samples (np.ndarray): Amostras em [-1, 1].
+
+    Returns:
+        bytes: PCM de 16 bits little-endian.
+    """
+    scaled = np.rint(samples * 32767)
+    return np.clip(scaled, -32768, 32767).astype('<i2').tobytes()
+
+
+class PolyphaseResampler:
+    """
+    Reamostrador racional (L/M) por banco de filtros polifásico, processado em chunks.
+
+    O filtro protótipo é um sinc janelado (Kaiser) projetado na taxa intermediária
+    L * taxa_de_entrada e dividido em L fases de K coeficientes. Cada amostra de saída
+    usa só a fase correspondente à sua posição, então o custo é K multiplicações por
+    amostra de saída, sem materializar o sinal sobreamostrado. Entre chunks são
+    guardadas apenas as últimas K - 1 amostras de entrada.
+    """
+
+    def __init__(self, in_rate, out_rate=TARGET_SAMPLE_RATE, half_width=16, beta=8.0):
+        """
+        Args:
+            in_rate (int): Taxa de entrada em Hz.
+            out_rate (int): Taxa de saída em Hz.
+            half_width (int): Cruzamentos por zero do sinc de cada lado (qualidade x custo).
+            beta (float): Parâmetro da janela de Kaiser.
+        """
+        divisor = math.gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.taps = 2 * half_width * max(1, math.ceil(self.down / self.up))
+
+        length = self.taps * self.up
+        cutoff = 0.5 / max(self.up, self.down)
+        # Centro inteiro: a saída n lê a posição n * M + centro e fica alinhada à entrada
+        self._center = length // 2
+        n = np.arange(length) - self._center
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta) * self.up
+        # bank[p, j] multiplica a janela de entrada x[i - K + 1 + j] na fase p
+        self.bank = np.ascontiguousarray(prototype.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._base = -(self.taps - 1)  # índice absoluto da primeira amostra de _history
+        self._next_output = 0
+        self._inputs = 0
+        self._outputs = 0
+
+    def process(self, samples):
+        """
+        Reamostra um chunk.
+
+        Args:
+            samples (np.ndarray): Amostras float32 mono.
+
+        Returns:
+            np.ndarray: Amostras reamostradas disponíveis até agora.
+        """
+        self._inputs += len(samples)
+        return self._run(samples)
+
+    def flush(self):
+        """
+        Esvazia o filtro ao fim do sinal.
+
+        Returns:
+            np.ndarray: Amostras finais, completando ceil(entrada * L / M) no total.
+        """
+        tail = self._run(np.zeros(self.taps, dtype=np.float32))
+        expected = -(-self._inputs * self.up // self.down)
+        return tail[:max(0, expected - self._outputs + len(tail))]
+
+    def _run(self, samples):
+        buffer = np.concatenate((self._history, samples.astype(np.float32, copy=False)))
+        last_input = self._base + len(buffer) - 1
+        last_output = ((last_input + 1) * self.up - 1 - self._center) // self.down
+        outputs = np.arange(self._next_output, last_output + 1)
+        self._next_output = max(self._next_output, last_output + 1)
+
+        positions = outputs * self.down + self._center
+        local = positions // self.up - self._base
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps)[local - (self.taps - 1)]
+        result = np.einsum('nk,nk->n', windows, self.bank[positions % self.up])
+
+        self._history = buffer[len(buffer) - (self.taps - 1):].copy()
+        self._base += len(buffer) - (self.taps - 1)
+        self._outputs += len(result)
+        return result
+
+
+class PCMNormalizer:
+    """
+    Normaliza PCM de qualquer taxa, número de canais e profundidade para 16 kHz, mono,
+    16 bits, chunk a chunk: cada chunk é convertido para float, mixado para mono,
+    reamostrado e convertido de volta sem buffers intermediários do tamanho do arquivo.
+    """
+
+    def __init__(self, in_rate, sample_width, channels, out_rate=TARGET_SAMPLE_RATE):
+        """
+        Args:
+            in_rate (int): Taxa de entrada em Hz.
+            sample_width (int): Bytes por amostra na entrada.
+            channels (int): Canais na entrada.
+            out_rate (int): Taxa de saída em Hz.
+        """
+        self.sample_width = sample_width
+        self.channels = channels
+        self.resampler = PolyphaseResampler(in_rate, out_rate) if in_rate != out_rate else None
+
+    def process(self, raw_bytes) -> bytes:
+        """
+        Converte um chunk de frames completos.
+
+        Args:
+            raw_bytes (bytes | memoryview): PCM no formato de entrada.
+
+        Returns:
+            bytes: PCM de 16 bits mono na taxa de saída.
+        """
+        samples = pcm_to_float(raw_bytes, self.sample_width, self.channels)
+        if self.resampler:
+            samples = self.resampler.process(samples)
+        return float_to_pcm16(samples)
+
+    def flush(self) -> bytes:
+        """
+        Retorna as amostras retidas pelo filtro ao fim do sinal.
+
+        Returns:
+            bytes: PCM final (vazio se não há reamostragem).
+        """
+        return float_to_pcm16(self.resampler.flush()) if self.resampler else b''
+
+
+# --- Bloco de Benchmark ---
+# Vazão em múltiplos do tempo real (RTF) para formatos comuns de upload.
+if __name__ == "__main__":
+    import time
+
+    seconds = 30
+    chunk_frames = 8192
+    formats = [
+        (8000, 1, 2), (22050, 1, 2), (44100, 1, 2), (44100, 2, 2),
+        (48000, 2, 2), (48000, 2, 3), (48000, 1, 4), (16000, 2, 2),
+    ]
+    print(f"--- Benchmark do PCMNormalizer ({seconds} s de áudio, chunks de {chunk_frames} frames) ---")
+    for rate, channels, width in formats:
+        t = np.arange(rate * seconds) / rate
+        tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+        interleaved = np.repeat(tone, channels)
+        if width == 3:
+            ints = (interleaved * (2 ** 23 - 1)).astype('<i4')
+            raw = ints.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+        elif width == 4:
+            raw = (interleaved * (2 ** 31 - 1)).astype('<i4').tobytes()
+        else:
+            raw = (interleaved * 32767).astype('<i2').tobytes()
+
+        frame_bytes = channels * width
+        normalizer = PCMNormalizer(rate, width, channels)
+        started_at = time.perf_counter()
+        output = bytearray()
+        for offset in range(0, len(raw), chunk_frames * frame_bytes):
+            output += normalizer.process(raw[offset:offset + chunk_frames * frame_bytes])
+        output += normalizer.flush()
+        elapsed = time.perf_counter() - started_at
+
+        # Erro em relação ao tom ideal em 16 kHz (ignora as bordas do filtro)
+        ideal = 0.5 * np.sin(2 * np.pi * 440 * np.arange(len(output) // 2) / TARGET_SAMPLE_RATE)
+        got = np.frombuffer(bytes(output), dtype='<i2') / 32768
+        error = got[200:-200] - ideal[200:-200]
+        snr = 10 * np.log10(np.mean(ideal[200:-200] ** 2) / max(np.mean(error ** 2), 1e-20))
+        print(f"[BENCH] {rate:>5} Hz {channels} canal(is) {width * 8:>2} bits -> 16 kHz mono: "
+              f"{seconds / elapsed:>7.0f}x tempo real | {len(output) // 2} amostras | SNR {snr:.1f} dB")
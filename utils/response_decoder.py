@@ -0,0 +1,182 @@
+import binascii
+import inspect
+import json
+import re
+
+# Tipo do evento: primeira chave dentro de "event" (o Nova Sonic envia um evento por payload)
+_EVENT_TYPE = re.compile(rb'\{\s*"event"\s*:\s*\{\s*"(\w+)"')
+# Início do valor base64 do campo "content" e o contentId do evento audioOutput
+_CONTENT_VALUE = re.compile(rb'"content"\s*:\s*"')
+_CONTENT_ID = re.compile(rb'"contentId"\s*:\s*"([^"\\]*)"')
+
+
+class SonicResponseDecoder:
+    """
+    Decodificador de eventos de saída do Nova Sonic baseado em tabela de despacho.
+
+    Os eventos audioOutput (quase todo o tráfego) passam por um caminho rápido que
+    localiza o base64 direto nos bytes recebidos e o decodifica sem montar o dict
+    do JSON nem passar por str. Os demais tipos de evento são decodificados com
+    `json.loads` e entregues ao handler registrado para o tipo.
+    """
+
+    def __init__(self, record_path=None):
+        """
+        Args:
+            record_path (str): Arquivo onde os payloads recebidos são gravados, um por
+                linha, para reprodução em benchmarks (opcional).
+        """
+        self._handlers = {}
+        self._audio_handler = None
+        self._record_file = open(record_path, 'ab') if record_path else None
+        self.stats = {'audio_fast_path': 0, 'audio_slow_path': 0, 'json_events': 0, 'unhandled': 0}
+
+    def register(self, event_type, handler):
+        """
+        Registra o handler de um tipo de evento (ex.: 'contentStart', 'textOutput').
+
+        Args:
+            event_type (str): Nome do evento dentro de "event".
+            handler (callable): Função (síncrona ou assíncrona) que recebe o dict do evento.
+        """
+        self._handlers[event_type] = handler
+
+    def register_audio(self, handler):
+        """
+        Registra o handler dos eventos audioOutput.
+
+        Args:
+            handler (callable): Função (síncrona ou assíncrona) que recebe os bytes de
+                PCM decodificados e o contentId do evento.
+        """
+        self._audio_handler = handler
+
+    def decode(self, payload):
+        """
+        Decodifica um payload recebido do stream.
+
+        Args:
+            payload (bytes): JSON do evento em UTF-8.
+
+        Returns:
+            tuple: ('audioOutput', (pcm_bytes, content_id)) para áudio, ou
+                (tipo_do_evento, dict_do_evento) para os demais; (None, None) se o
+                payload não contiver um evento.
+        """
+        match = _EVENT_TYPE.match(payload)
+        if match and match.group(1) == b'audioOutput':
+            audio = self._decode_audio_fast(payload, match.end())
+            if audio is not None:
+                self.stats['audio_fast_path'] += 1
+                return 'audioOutput', audio
+
+        self.stats['json_events'] += 1
+        event = json.loads(payload).get('event')
+        if not event:
+            return None, None
+        event_type, body = next(iter(event.items()))
+        if event_type == 'audioOutput':
+            self.stats['audio_slow_path'] += 1
+            return event_type, (binascii.a2b_base64(body['content']), body.get('contentId'))
+        return event_type, body
+
+    def _decode_audio_fast(self, payload, offset):
+        """Extrai e decodifica o base64 do audioOutput sem desserializar o JSON."""
+        match = _CONTENT_VALUE.search(payload, offset)
+        if not match:
+            return None
+        start = match.end()
+        end = payload.find(b'"', start)
+        # Escapes JSON no valor (ex.: "\/") exigem o caminho completo
+        if end < 0 or payload.find(b'\\', start, end) >= 0:
+            return None
+
+        # Procura o contentId fora do base64, que é a maior parte do payload
+        content_id = _CONTENT_ID.search(payload, end) or _CONTENT_ID.search(payload, offset, start)
+        with memoryview(payload) as view:
+            pcm_bytes = binascii.a2b_base64(view[start:end])
+        return pcm_bytes, content_id.group(1).decode('ascii') if content_id else None
+
+    async def dispatch(self, payload):
+        """
+        Decodifica um payload e o entrega ao handler registrado para o seu tipo.
+
+        Args:
+            payload (bytes): JSON do evento em UTF-8.
+        """
+        if self._record_file:
+            self._record_file.write(payload + b'\n')
+
+        event_type, value = self.decode(payload)
+        if event_type == 'audioOutput' and self._audio_handler:
+            result = self._audio_handler(*value)
+        elif event_type in self._handlers:
+            result = self._handlers[event_type](value)
+        else:
+            self.stats['unhandled'] += 1
+            return
+        if inspect.isawaitable(result):
+            await result
+
+    def close(self):
+        """Fecha o arquivo de gravação, se houver."""
+        if self._record_file:
+            self._record_file.close()
+            self._record_file = None
+
+
+# --- Bloco de Benchmark ---
+# Uso: python utils/response_decoder.py [arquivo_gravado.jsonl]
+# Sem arquivo, gera um stream sintético com a mesma proporção de eventos de uma resposta típica.
+def _synthetic_stream(n_audio=2000, chunk_bytes=1920):
+    import base64
+    import os
+
+    def event(body):
+        return json.dumps({'event': body}).encode('utf-8')
+
+    content_id = 'b6d2c1a0-0000-4000-8000-000000000000'
+    stream = [
+        event({'contentStart': {'role': 'ASSISTANT', 'type': 'TEXT', 'contentId': content_id,
+                                'additionalModelFields': json.dumps({'generationStage': 'SPECULATIVE'})}}),
+        event({'textOutput': {'role': 'ASSISTANT', 'contentId': content_id, 'content': 'Hi! How can I help?'}}),
+        event({'contentEnd': {'type': 'TEXT', 'contentId': content_id, 'stopReason': 'PARTIAL_TURN'}}),
+    ]
+    audio = base64.b64encode(os.urandom(chunk_bytes)).decode('ascii')
+    stream += [event({'audioOutput': {'content': audio, 'contentId': content_id, 'role': 'ASSISTANT'}})
+               for _ in range(n_audio)]
+    stream.append(event({'contentEnd': {'type': 'AUDIO', 'contentId': content_id, 'stopReason': 'END_TURN'}}))
+    return stream
+
+
+def _legacy_decode(payload):
+    """Reproduz o caminho original de `_process_responses`."""
+    import base64
+    json_data = json.loads(payload.decode('utf-8'))
+    if 'event' in json_data and 'audioOutput' in json_data['event']:
+        return base64.b64decode(json_data['event']['audioOutput']['content'])
+    return json_data
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as recorded:
+            stream = [line.rstrip(b'\n') for line in recorded if line.strip()]
+    else:
+        stream = _synthetic_stream()
+
+    decoder = SonicResponseDecoder()
+    total_bytes = sum(len(payload) for payload in stream)
+    print(f"--- Benchmark do SonicResponseDecoder ({len(stream)} eventos, {total_bytes / 1e6:.1f} MB) ---")
+
+    for name, decode in (('legado (json.loads)', _legacy_decode), ('decoder', decoder.decode)):
+        started_at = time.perf_counter()
+        for _ in range(5):
+            for payload in stream:
+                decode(payload)
+        elapsed = (time.perf_counter() - started_at) / 5
+        print(f"[BENCH] {name:<20} {len(stream) / elapsed:>12,.0f} eventos/s | {total_bytes / elapsed / 1e6:>8.1f} MB/s")
+    print(f"[BENCH] estatísticas do decoder: {decoder.stats}")
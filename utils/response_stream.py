@@ -0,0 +1,112 @@
+import asyncio
+import binascii
+import json
+import time
+
+from utils.audio_io import CallbackSink, OUTPUT_SAMPLE_RATE
+
+# Tipos de frame do stream de resposta (um objeto JSON por linha, NDJSON)
+FRAME_START = 'start'
+FRAME_TRANSCRIPT = 'transcript'
+FRAME_AUDIO = 'audio'
+FRAME_END = 'end'
+FRAME_ERROR = 'error'
+CONTENT_TYPE = 'application/x-ndjson'
+# Marca de fila vazia ao agrupar frames de áudio (None é o fim do turno)
+_EMPTY = object()
+
+
+def encode_frame(frame_type, **fields) -> bytes:
+    """
+    Serializa um frame do stream de resposta como uma linha JSON compacta.
+
+    Args:
+        frame_type (str): Tipo do frame ('start', 'transcript', 'audio', 'end' ou 'error').
+        **fields: Campos do frame.
+
+    Returns:
+        bytes: JSON em UTF-8 terminado por '\\n'.
+    """
+    return json.dumps({'type': frame_type, **fields}, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+async def stream_turn(sonic_service, source, trailing_silence_ms=0, response_timeout=30):
+    """
+    Executa um turno e entrega a resposta incrementalmente, à medida que
+    `_process_responses` recebe os eventos do modelo.
+
+    Frames produzidos, na ordem:
+        - start: formato do áudio que virá nos frames de áudio.
+        - transcript: cada linha da transcrição (role, text).
+        - audio: PCM em base64; o áudio já disponível é agrupado em um único frame.
+        - end: transcrição completa e métricas do turno (ou error, em caso de falha).
+
+    Args:
+        sonic_service (AmazonNovaSonicService): Sessão já iniciada.
+        source (AudioSource): Fonte do áudio do usuário.
+        trailing_silence_ms (int): Silêncio anexado ao fim da fala.
+        response_timeout (float): Tempo máximo de espera pela resposta, em segundos.
+
+    Yields:
+        bytes: Frames NDJSON prontos para um adaptador de streaming ou um servidor chunked.
+    """
+    queue = asyncio.Queue()
+    started_at = time.perf_counter()
+    first_audio_at = None
+    audio_bytes = 0
+
+    def on_text(role, text):
+        queue.put_nowait((FRAME_TRANSCRIPT, {'role': role, 'text': text}))
+
+    def on_audio(pcm_bytes):
+        queue.put_nowait((FRAME_AUDIO, pcm_bytes))
+
+    sonic_service.text_listeners.append(on_text)
+    turn = asyncio.create_task(sonic_service.run_turn(
+        source, CallbackSink(on_audio), trailing_silence_ms=trailing_silence_ms, response_timeout=response_timeout,
+    ))
+    turn.add_done_callback(lambda _: queue.put_nowait(None))
+
+    yield encode_frame(FRAME_START, format='pcm_s16le', sample_rate=OUTPUT_SAMPLE_RATE, channels=1)
+    seq = 0
+    try:
+        item = await queue.get()
+        while item is not None:
+            frame_type, payload = item
+            if frame_type != FRAME_AUDIO:
+                yield encode_frame(frame_type, **payload)
+                item = await queue.get()
+                continue
+
+            # Agrupa o áudio que já está na fila em um único frame
+            pending = [payload]
+            item = _EMPTY
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is None or item[0] != FRAME_AUDIO:
+                    break
+                pending.append(item[1])
+                item = _EMPTY
+            pcm = b''.join(pending)
+            first_audio_at = first_audio_at or time.perf_counter()
+            audio_bytes += len(pcm)
+            yield encode_frame(FRAME_AUDIO, seq=seq, data=binascii.b2a_base64(pcm, newline=False).decode('ascii'))
+            seq += 1
+            if item is _EMPTY:
+                item = await queue.get()
+
+        await turn
+        yield encode_frame(
+            FRAME_END,
+            transcription=sonic_service.transcript.render(),
+            audio_bytes=audio_bytes,
+            first_audio_ms=round((first_audio_at - started_at) * 1000, 1) if first_audio_at else None,
+            total_ms=round((time.perf_counter() - started_at) * 1000, 1),
+        )
+    except Exception as e:
+        yield encode_frame(FRAME_ERROR, message=str(e))
+    finally:
+        sonic_service.text_listeners.remove(on_text)
+        if not turn.done():
+            turn.cancel()
+            await asyncio.gather(turn, return_exceptions=True)
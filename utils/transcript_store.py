@@ -0,0 +1,301 @@
+import bisect
+import collections
+
+# Estágios de geração do texto do Nova Sonic (additionalModelFields.generationStage)
+STAGE_SPECULATIVE = 'SPECULATIVE'
+STAGE_FINAL = 'FINAL'
+
+# Efeito de um textOutput na transcrição (retornado por TranscriptStore.add)
+CHANGE_CREATED = 'created'
+CHANGE_APPENDED = 'appended'
+CHANGE_REPLACED = 'replaced'
+
+# Rótulo de cada papel nas linhas renderizadas
+ROLE_LABELS = {'USER': 'User', 'ASSISTANT': 'Assistant'}
+
+
+class TranscriptSegment:
+    """Um trecho da conversa: o texto de um contentId, com papel e estágio de geração."""
+
+    __slots__ = ('seq', 'version', 'content_id', 'role', 'stage', 'text', '_line')
+
+    def __init__(self, seq, version, content_id, role, stage, text):
+        self.seq = seq
+        self.version = version
+        self.content_id = content_id
+        self.role = role
+        self.stage = stage
+        self.text = text
+        self._line = None
+
+    @property
+    def line(self) -> str:
+        """Linha no formato da conversa ("User: ..." / "Assistant: ..."), montada uma vez por texto."""
+        if self._line is None:
+            self._line = f"{ROLE_LABELS.get(self.role, self.role.title())}: {self.text}"
+        return self._line
+
+    def as_dict(self) -> dict:
+        return {'seq': self.seq, 'version': self.version, 'content_id': self.content_id,
+                'role': self.role, 'stage': self.stage, 'text': self.text}
+
+
+class TranscriptStore:
+    """
+    Transcrição incremental de uma sessão Nova Sonic.
+
+    Cada contentId vira um segmento (vários textOutput do mesmo contentId são
+    concatenados). O assistente envia primeiro o texto especulativo e, depois do
+    áudio, o texto final com outro contentId: o final substitui, na mesma posição, o
+    especulativo mais antigo ainda pendente do mesmo papel, então a transcrição
+    nunca mostra as duas versões.
+
+    Toda mudança (segmento novo, texto anexado ou substituição) recebe uma versão
+    crescente: `since(versão)` devolve só o que mudou desde então, para consumidores
+    incrementais. `render()` gera o `conversation_data` do PromptTemplate e reaproveita
+    o texto já renderizado quando só houve segmentos novos.
+
+    A memória é limitada por `max_segments` e `max_chars`: os segmentos mais antigos
+    são descartados primeiro.
+    """
+
+    def __init__(self, max_segments=2000, max_chars=200_000):
+        """
+        Args:
+            max_segments (int): Quantidade máxima de segmentos guardados.
+            max_chars (int): Total máximo de caracteres de texto guardados.
+        """
+        self.max_segments = max_segments
+        self.max_chars = max_chars
+        self.version = 0
+        self.chars = 0
+        self.evicted = 0
+        self.replaced = 0
+
+        self._segments = collections.deque()
+        self._by_id = {}
+        self._pending = collections.defaultdict(collections.deque)  # papel -> especulativos sem final
+        self._next_seq = 0
+        # Registro de mudanças (versão, segmento), em ordem de versão, para `since`
+        self._log_versions = []
+        self._log_segments = []
+        # Cache do render: texto, versão, posição (seq, início, fim) de cada linha no texto
+        # (deslocada por `_shift` quando o início é cortado) e o primeiro segmento alterado
+        self._rendered = ''
+        self._rendered_version = 0
+        self._offsets = collections.deque()
+        self._shift = 0
+        self._dirty_seq = None
+
+    def __len__(self):
+        return len(self._segments)
+
+    def __iter__(self):
+        """Itera as linhas renderizadas, como a antiga lista de strings da transcrição."""
+        return (segment.line for segment in self._segments)
+
+    def add(self, content_id, role, stage, text):
+        """
+        Registra um textOutput.
+
+        Args:
+            content_id (str): contentId do evento (None cria um segmento avulso).
+            role (str): 'USER' ou 'ASSISTANT'.
+            stage (str): STAGE_SPECULATIVE ou STAGE_FINAL.
+            text (str): Texto recebido.
+
+        Returns:
+            tuple: (segmento, mudança) — CHANGE_CREATED para um segmento novo,
+                CHANGE_APPENDED para a continuação de um contentId e CHANGE_REPLACED quando
+                o texto final substituiu um especulativo.
+        """
+        segment = self._by_id.get(content_id) if content_id is not None else None
+        if segment is not None:
+            # Continuação do mesmo contentId
+            self._set_text(segment, segment.text + text)
+            return segment, CHANGE_APPENDED
+
+        pending = self._pending.get(role)
+        if stage == STAGE_FINAL and pending:
+            segment = pending.popleft()
+            self._by_id.pop(segment.content_id, None)
+            segment.content_id = content_id
+            segment.stage = STAGE_FINAL
+            if content_id is not None:
+                self._by_id[content_id] = segment
+            self.replaced += 1
+            self._set_text(segment, text)
+            return segment, CHANGE_REPLACED
+
+        self.version += 1
+        segment = TranscriptSegment(self._next_seq, self.version, content_id, role, stage, text)
+        self._next_seq += 1
+        self._segments.append(segment)
+        if content_id is not None:
+            self._by_id[content_id] = segment
+        if stage == STAGE_SPECULATIVE:
+            self._pending[role].append(segment)
+        self.chars += len(text)
+        self._log(segment)
+        self._evict()
+        return segment, CHANGE_CREATED
+
+    def _set_text(self, segment, text):
+        self.chars += len(text) - len(segment.text)
+        segment.text = text
+        segment._line = None
+        self.version += 1
+        segment.version = self.version
+        if self._offsets and segment.seq <= self._offsets[-1][0]:
+            self._dirty_seq = segment.seq if self._dirty_seq is None else min(self._dirty_seq, segment.seq)
+        self._log(segment)
+        self._evict()
+
+    def _log(self, segment):
+        self._log_versions.append(segment.version)
+        self._log_segments.append(segment)
+        # O registro guarda no máximo ~2x os segmentos vivos; entradas antigas são compactadas
+        if len(self._log_versions) > 2 * self.max_segments:
+            cut = len(self._log_versions) - self.max_segments
+            del self._log_versions[:cut]
+            del self._log_segments[:cut]
+
+    def _evict(self):
+        while self._segments and (len(self._segments) > self.max_segments or self.chars > self.max_chars):
+            segment = self._segments.popleft()
+            self.chars -= len(segment.text)
+            self._by_id.pop(segment.content_id, None)
+            pending = self._pending.get(segment.role)
+            if pending and pending[0] is segment:
+                pending.popleft()
+            self.evicted += 1
+
+    def since(self, version):
+        """
+        Segmentos criados ou alterados depois de uma versão (consulta incremental).
+
+        Args:
+            version (int): Última versão vista pelo consumidor (0 para tudo).
+
+        Returns:
+            tuple: (versão atual, lista de dicts dos segmentos, em ordem de conversa).
+                Se o registro já não cobre a versão pedida, devolve todos os segmentos.
+        """
+        if self._log_versions and version + 1 < self._log_versions[0] and self.version > version:
+            changed = list(self._segments)
+        else:
+            start = bisect.bisect_right(self._log_versions, version)
+            latest = {}
+            for segment in self._log_segments[start:]:
+                latest[id(segment)] = segment
+            first_live = self._segments[0].seq if self._segments else self._next_seq
+            changed = sorted((segment for segment in latest.values() if segment.seq >= first_live),
+                             key=lambda segment: segment.seq)
+        return self.version, [segment.as_dict() for segment in changed]
+
+    def snapshot(self, include_speculative=True):
+        """
+        Cópia imutável da transcrição atual.
+
+        Args:
+            include_speculative (bool): Inclui o texto especulativo ainda sem versão final.
+
+        Returns:
+            tuple: Tuplas (papel, estágio, texto) em ordem de conversa.
+        """
+        return tuple((segment.role, segment.stage, segment.text) for segment in self._segments
+                     if include_speculative or segment.stage != STAGE_SPECULATIVE)
+
+    def render(self, include_speculative=True) -> str:
+        """
+        Renderiza a transcrição como o `conversation_data` esperado pelo PromptTemplate.
+
+        Args:
+            include_speculative (bool): Inclui o texto especulativo ainda sem versão final.
+
+        Returns:
+            str: Uma linha "User: ..." / "Assistant: ..." por segmento.
+        """
+        if not include_speculative:
+            return '\n'.join(segment.line for segment in self._segments if segment.stage != STAGE_SPECULATIVE)
+        if self._rendered_version == self.version:
+            return self._rendered
+
+        # O texto anterior é reaproveitado: corta as linhas descartadas do início e as
+        # alteradas do fim, e só monta as linhas dos segmentos novos ou alterados
+        offsets = self._offsets
+        first_live = self._segments[0].seq if self._segments else self._next_seq
+        while offsets and offsets[0][0] < first_live:
+            offsets.popleft()
+        if self._dirty_seq is not None:
+            while offsets and offsets[-1][0] >= self._dirty_seq:
+                offsets.pop()
+            self._dirty_seq = None
+
+        if offsets:
+            start = offsets[0][1] - self._shift
+            kept = self._rendered[start:offsets[-1][2] - self._shift]
+            self._shift += start
+            last_seq = offsets[-1][0]
+        else:
+            kept = ''
+            self._shift = 0
+            last_seq = -1
+
+        new_segments = []
+        for segment in reversed(self._segments):
+            if segment.seq <= last_seq:
+                break
+            new_segments.append(segment)
+        new_segments.reverse()
+
+        parts = [kept] if kept else []
+        position = len(kept) + self._shift
+        for segment in new_segments:
+            line = segment.line
+            if parts:
+                position += 1
+            offsets.append((segment.seq, position, position + len(line)))
+            position += len(line)
+            parts.append(line)
+
+        self._rendered = '\n'.join(parts)
+        self._rendered_version = self.version
+        return self._rendered
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Segmentos e caracteres guardados, versão atual, substituições
+                especulativo → final, especulativos pendentes e descartes por limite.
+        """
+        return {
+            'segments': len(self._segments),
+            'chars': self.chars,
+            'version': self.version,
+            'replaced': self.replaced,
+            'pending_speculative': sum(len(pending) for pending in self._pending.values()),
+            'evicted': self.evicted,
+        }
+
+
+# --- Bloco de Benchmark ---
+# Sessão longa: especulativo + final por turno, renders frequentes e memória limitada.
+if __name__ == "__main__":
+    import time
+
+    store = TranscriptStore(max_segments=500)
+    turns = 20_000
+    started_at = time.perf_counter()
+    for turn in range(turns):
+        store.add(f'u{turn}', 'USER', STAGE_FINAL, f"user sentence number {turn}")
+        store.add(f's{turn}', 'ASSISTANT', STAGE_SPECULATIVE, f"assistant draft {turn}")
+        store.render()
+        store.add(f'f{turn}', 'ASSISTANT', STAGE_FINAL, f"assistant answer {turn}")
+        store.render()
+    elapsed = time.perf_counter() - started_at
+
+    print(f"--- TranscriptStore: {turns} turnos ---")
+    print(f"  {elapsed / turns * 1e6:.1f} us por turno (3 eventos + 2 renders)")
+    print(f"  {store.stats()}")
+    print(f"  últimas linhas: {store.render().splitlines()[-2:]}")
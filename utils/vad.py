@@ -0,0 +1,229 @@
+import collections
+import math
+
+import numpy as np
+
+# O que fazer com os frames de silêncio
+MODE_DROP = 'drop'            # não envia nada durante o silêncio
+MODE_KEEPALIVE = 'keepalive'  # envia um frame curto de silêncio digital a cada intervalo
+
+
+class VoiceActivityDetector:
+    """
+    Detector de atividade de voz (VAD) vetorizado com NumPy, entre a fonte de áudio e
+    o envio ao Nova Sonic.
+
+    Cada chunk é dividido em frames de `frame_ms` e as features (energia em dBFS e
+    taxa de cruzamentos por zero) são calculadas para todos os frames de uma vez. Um
+    frame é fala quando a energia passa do limiar com ZCR baixa (voz sonora) ou quando
+    a energia passa bem do limiar (fricativas). O limiar acompanha o ruído de fundo.
+
+    - hangover: depois da última fala, o áudio continua sendo enviado por
+      `hangover_ms`, o que preserva finais de palavra e o silêncio que o modelo usa
+      para detectar o fim do turno.
+    - pré-roll: os últimos `preroll_ms` de silêncio ficam guardados e são enviados
+      antes do início da fala, para não cortar o ataque da primeira sílaba.
+
+    Durante o silêncio os frames são descartados ou, no modo keep-alive, trocados por
+    um frame curto de silêncio digital a cada `keepalive_ms`, mantendo o stream ativo.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, threshold_db=-45.0, noise_margin_db=10.0,
+                 loud_margin_db=15.0, zcr_max=0.25, hangover_ms=600, preroll_ms=200,
+                 mode=MODE_KEEPALIVE, keepalive_ms=500, keepalive_frame_ms=20):
+        """
+        Args:
+            sample_rate (int): Taxa de amostragem do PCM (16 bits, mono) em Hz.
+            frame_ms (int): Duração de cada frame analisado, em ms.
+            threshold_db (float): Limiar mínimo de energia para fala, em dBFS.
+            noise_margin_db (float): Margem sobre o ruído de fundo estimado, em dB.
+            loud_margin_db (float): Margem acima do limiar que dispensa o teste de ZCR, em dB.
+            zcr_max (float): Taxa máxima de cruzamentos por zero da voz sonora.
+            hangover_ms (int): Tempo enviado após a última fala, em ms.
+            preroll_ms (int): Silêncio guardado e enviado antes do início da fala, em ms.
+            mode (str): 'drop' ou 'keepalive'.
+            keepalive_ms (int): Intervalo entre keep-alives durante o silêncio, em ms.
+            keepalive_frame_ms (int): Duração de cada keep-alive, em ms.
+
+        Raises:
+            ValueError: Se o modo for desconhecido.
+        """
+        if mode not in (MODE_DROP, MODE_KEEPALIVE):
+            raise ValueError(f"Modo de VAD desconhecido: {mode}")
+
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_len * 2
+        self.threshold_db = threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.loud_margin_db = loud_margin_db
+        self.zcr_max = zcr_max
+        self.hangover_frames = math.ceil(hangover_ms / frame_ms)
+        self.mode = mode
+        self.keepalive_frames = max(1, keepalive_ms // frame_ms)
+        self._keepalive = bytes(sample_rate * keepalive_frame_ms // 1000 * 2)
+
+        self.noise_floor_db = threshold_db - noise_margin_db
+        self._preroll = collections.deque(maxlen=math.ceil(preroll_ms / frame_ms))
+        self._pending = bytearray()
+        self._frame_index = 0
+        self._last_speech = -self.hangover_frames - 1
+        self._silent_frames = 0
+        self.active = False
+
+        self.frames_in = 0
+        self.frames_sent = 0
+        self.keepalives = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.speech_onsets = 0
+
+    def features(self, frames):
+        """
+        Calcula as features de todos os frames de uma vez.
+
+        Args:
+            frames (np.ndarray): Matriz int16 (n_frames, frame_len).
+
+        Returns:
+            tuple: (energia em dBFS, taxa de cruzamentos por zero), um valor por frame.
+        """
+        samples = frames.astype(np.float32) * (1 / 32768)
+        energy_db = 10 * np.log10(np.einsum('ij,ij->i', samples, samples) / self.frame_len + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_len - 1)
+        return energy_db, zcr
+
+    def classify(self, energy_db, zcr):
+        """
+        Classifica os frames como fala e atualiza a estimativa do ruído de fundo.
+
+        Returns:
+            np.ndarray: Máscara booleana de fala, um valor por frame.
+        """
+        threshold = max(self.threshold_db, self.noise_floor_db + self.noise_margin_db)
+        speech = ((energy_db > threshold) & (zcr < self.zcr_max)) | (energy_db > threshold + self.loud_margin_db)
+        quiet = energy_db[~speech]
+        if quiet.size:
+            self.noise_floor_db += 0.05 * (float(np.median(quiet)) - self.noise_floor_db)
+        return speech
+
+    def process(self, pcm_bytes):
+        """
+        Filtra um chunk de áudio.
+
+        Args:
+            pcm_bytes (bytes | memoryview): PCM de 16 bits vindo da fonte.
+
+        Returns:
+            list: Trechos a enviar (fala, pré-roll, hangover e keep-alives), na ordem.
+        """
+        self._pending += pcm_bytes
+        n_frames = len(self._pending) // self.frame_bytes
+        if not n_frames:
+            return []
+        data = bytes(self._pending[:n_frames * self.frame_bytes])
+        del self._pending[:n_frames * self.frame_bytes]
+        self.frames_in += n_frames
+        self.bytes_in += len(data)
+
+        frames = np.frombuffer(data, dtype='<i2').reshape(n_frames, self.frame_len)
+        speech = self.classify(*self.features(frames))
+
+        # Hangover vetorizado: distância de cada frame até a última fala (inclusive de chunks anteriores)
+        index = np.arange(self._frame_index, self._frame_index + n_frames)
+        last_speech = np.maximum.accumulate(np.where(speech, index, self._last_speech))
+        active = index - last_speech <= self.hangover_frames
+        self._frame_index += n_frames
+        self._last_speech = int(last_speech[-1])
+
+        output = []
+        view = memoryview(data)
+        bounds = np.flatnonzero(np.diff(active.view(np.int8))) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, n_frames]):
+            start, end = int(start), int(end)
+            if active[start]:
+                if not self.active:
+                    self.speech_onsets += 1
+                    self.frames_sent += len(self._preroll)
+                    output.extend(self._preroll)
+                    self._preroll.clear()
+                self.frames_sent += end - start
+                output.append(view[start * self.frame_bytes:end * self.frame_bytes])
+                self._silent_frames = 0
+            else:
+                for i in range(max(start, end - self._preroll.maxlen), end):
+                    self._preroll.append(view[i * self.frame_bytes:(i + 1) * self.frame_bytes])
+                if self.mode == MODE_KEEPALIVE:
+                    self._silent_frames += end - start
+                    while self._silent_frames >= self.keepalive_frames:
+                        self._silent_frames -= self.keepalive_frames
+                        self.keepalives += 1
+                        output.append(self._keepalive)
+            self.active = bool(active[start])
+
+        self.bytes_out += sum(len(part) for part in output)
+        return output
+
+    def flush(self):
+        """
+        Retorna o frame parcial pendente se a fala estiver ativa (ex.: ao fim da fonte).
+
+        Returns:
+            list: Trecho final a enviar, possivelmente vazio.
+        """
+        remainder = bytes(self._pending)
+        self._pending.clear()
+        if not (self.active and remainder):
+            return []
+        self.bytes_in += len(remainder)
+        self.bytes_out += len(remainder)
+        return [remainder]
+
+    def stats(self) -> dict:
+        """
+        Retorna as estatísticas de supressão da sessão.
+
+        Returns:
+            dict: Frames analisados, fração do áudio suprimida, bytes economizados,
+                keep-alives enviados, inícios de fala e ruído de fundo estimado.
+        """
+        return {
+            'frames': self.frames_in,
+            'suppressed_fraction': 1 - self.frames_sent / self.frames_in if self.frames_in else 0.0,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'bytes_saved': self.bytes_in - self.bytes_out,
+            'keepalives': self.keepalives,
+            'speech_onsets': self.speech_onsets,
+            'noise_floor_db': self.noise_floor_db,
+        }
+
+
+# --- Bloco de Benchmark ---
+# Fala sintética (rajadas de tom modulado) intercalada com ruído de fundo.
+if __name__ == "__main__":
+    import time
+
+    sample_rate = 16000
+    rng = np.random.default_rng(0)
+    segments = []
+    for _ in range(30):
+        silence = rng.normal(0, 60, sample_rate * 2)
+        t = np.arange(sample_rate) / sample_rate
+        voiced = 6000 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+        segments += [silence, voiced + rng.normal(0, 60, t.size)]
+    pcm = np.concatenate(segments).astype('<i2').tobytes()
+    duration = len(pcm) / 2 / sample_rate
+
+    for mode in (MODE_DROP, MODE_KEEPALIVE):
+        vad = VoiceActivityDetector(sample_rate=sample_rate, mode=mode)
+        started_at = time.perf_counter()
+        for offset in range(0, len(pcm), 2048):
+            vad.process(pcm[offset:offset + 2048])
+        vad.flush()
+        elapsed = time.perf_counter() - started_at
+        stats = vad.stats()
+        print(f"[BENCH] modo={mode:<9} {duration / elapsed:>6.0f}x tempo real | suprimido "
+              f"{stats['suppressed_fraction']:.0%} | economizado {stats['bytes_saved'] / 1024:.0f} KB "
+              f"de {stats['bytes_in'] / 1024:.0f} KB | keep-alives {stats['keepalives']} | "
+              f"inícios de fala {stats['speech_onsets']}")